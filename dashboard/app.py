@@ -11,11 +11,8 @@ st.set_page_config(
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from pages.overview import show_overview
-from pages.approval_analysis import show_approval_analysis
-from pages.dropout_analysis import show_dropout_analysis
-from pages.economic_impact import show_economic_impact
-from pages.policy_comparision import show_policy_comparision
+from dashboard.page_loader import load_page, IMPORT_TIMES
+from dashboard.precompute import start_background_warmup
 
 st.markdown("""
 <style>
@@ -43,7 +40,10 @@ st.markdown("""
 
 
 DB_PATH = "data/loan_funnel.db"
-ALERT_LOG_PATH = "data/alerts_log.txt"
+ALERT_DB_PATH = "data/alerts.db"
+
+# Warm the precomputed artifacts for the current data version in the background
+start_background_warmup(DB_PATH)
 
 st.title("📊 Loan Funnel Analytics")
 
@@ -99,16 +99,16 @@ if economic_btn:
 if policy_btn:
     st.session_state.current_page = "policy"
 
+# Page modules (and their analysis dependencies) are imported on first selection
+show_page = load_page(st.session_state.current_page)
 if st.session_state.current_page == "overview":
-    show_overview(DB_PATH, ALERT_LOG_PATH)
-elif st.session_state.current_page == "approval":
-    show_approval_analysis(DB_PATH)
-elif st.session_state.current_page == "dropout":
-    show_dropout_analysis(DB_PATH)
-elif st.session_state.current_page == "economic":
-    show_economic_impact(DB_PATH)
-elif st.session_state.current_page == "policy":
-    show_policy_comparision(DB_PATH)
+    show_page(DB_PATH, ALERT_DB_PATH)
+else:
+    show_page(DB_PATH)
+
+with st.sidebar.expander("⏱️ Page Import Profile"):
+    for page_key, seconds in IMPORT_TIMES.items():
+        st.write(f"{page_key}: {seconds:.2f}s")
 
 st.markdown("---")
 st.caption("Built by Aishwarya Gade | Data Analytics Project Demo")
\ No newline at end of file
@@ -0,0 +1,67 @@
+import importlib
+import os
+import subprocess
+import sys
+import time
+
+# Page key -> (module, render function). Modules are imported on first use so
+# the heavy analysis dependencies of one page are never paid for by another.
+PAGES = {
+    "overview": ("pages.overview", "show_overview"),
+    "approval": ("pages.approval_analysis", "show_approval_analysis"),
+    "dropout": ("pages.dropout_analysis", "show_dropout_analysis"),
+    "economic": ("pages.economic_impact", "show_economic_impact"),
+    "policy": ("pages.policy_comparision", "show_policy_comparision"),
+}
+
+# Seconds spent importing each page module in this process
+IMPORT_TIMES = {}
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def load_page(page_key):
+    """Import a page module on first selection and return its render function"""
+    module_name, func_name = PAGES[page_key]
+    if module_name not in sys.modules:
+        start = time.perf_counter()
+        importlib.import_module(module_name)
+        IMPORT_TIMES[page_key] = time.perf_counter() - start
+    return getattr(sys.modules[module_name], func_name)
+
+
+def profile_page_import(page_key, top_n=10):
+    """Import a page in a fresh interpreter and return its slowest imports"""
+    module_name, _ = PAGES[page_key]
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module_name}"],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True
+    )
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+
+    total_us = max((row[2] for row in rows), default=0)
+    slowest = sorted(rows, key=lambda row: row[2], reverse=True)[:top_n]
+    return total_us / 1e6, slowest
+
+
+def import_profile_report(top_n=10):
+    """Cold-import time of every page with its heaviest dependencies"""
+    lines = ["🔹 Page Import Profile (cold interpreter):"]
+    for page_key in PAGES:
+        total, slowest = profile_page_import(page_key, top_n)
+        lines.append(f"\n{page_key}: {total:.2f}s")
+        for name, _, cumulative_us in slowest:
+            lines.append(f"    {cumulative_us / 1e6:8.3f}s  {name}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    print(import_profile_report())
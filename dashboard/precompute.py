@@ -0,0 +1,343 @@
+import argparse
+import multiprocessing
+import os
+import pickle
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.compute_metrics import (
+    load_data_to_sqlite,
+    get_data_version,
+    get_total_applications,
+    get_approval_denial_dropout_rates,
+    get_total_applicants_passing_each_stage,
+    conversion_rate_at_each_stage,
+    dropout_rate_at_each_stage,
+    average_time_for_loan_approval,
+    get_decision_to_close_time,
+    get_weekly_trend
+)
+from src.dataset import load_loan_data
+
+ARTIFACT_DIR = "data/artifacts"
+KEEP_VERSIONS = 2
+
+WARMUP_MESSAGE = "⏳ Analytics for the latest data are being precomputed. Refresh in a moment."
+
+
+def compute_overview_snapshot(db_path):
+    """KPIs, trends, stage counts, stage timings and current alerts for the Overview page"""
+    from src.report_alerts import get_current_metrics, check_alerts
+    from src.event_log import build_funnel_from_events
+    from src.alert_rules import evaluate_rules, format_alerts
+    from src.latency_sketch import latency_summary
+
+    metrics = get_current_metrics(db_path)
+    return {
+        'total': get_total_applications(db_path),
+        'kpi': get_approval_denial_dropout_rates(db_path),
+        'weekly_trend': get_weekly_trend(db_path),
+        'stage_counts': get_total_applicants_passing_each_stage(db_path),
+        'conversion': conversion_rate_at_each_stage(db_path),
+        'dropout': dropout_rate_at_each_stage(db_path),
+        'avg_approval_time': average_time_for_loan_approval(db_path),
+        'decision_to_close': get_decision_to_close_time(db_path),
+        'latency_quantiles': latency_summary(db_path),
+        'stage_timing': build_funnel_from_events(db_path),
+        'alerts': check_alerts(metrics) if metrics is not None else [],
+        'segment_alerts': format_alerts(evaluate_rules(db_path=db_path))
+    }
+
+
+def compute_cohort_tables(db_path):
+    """Feature averages and single-dimension cohort tables"""
+    from src.advanced_analysis import cohort_analysis, get_features_vs_approval
+
+    return {
+        'features': get_features_vs_approval(db_path),
+        'cohorts': cohort_analysis(db_path)
+    }
+
+
+def compute_interaction_cube(db_path):
+    """All key two-way interaction tables"""
+    from src.two_way_analysis import get_all_key_interactions
+
+    return get_all_key_interactions(db_path)
+
+
+def compute_economic_impact(db_path):
+    """Economic impact by cohort"""
+    from src.economic_impact import run_economic_impact_analysis, ECONOMIC_COLUMNS
+
+    return run_economic_impact_analysis(load_loan_data(ECONOMIC_COLUMNS, db_path))
+
+
+def compute_economic_bands(db_path):
+    """Monte Carlo uncertainty bands of economic impact by cohort"""
+    from src.economic_impact import ECONOMIC_COLUMNS
+    from src.economic_uncertainty import economic_uncertainty
+
+    return economic_uncertainty(load_loan_data(ECONOMIC_COLUMNS, db_path))
+
+
+def compute_economic_cohorts(db_path):
+    """Flat-margin and risk-adjusted economic impact of every fine-grained cohort (all band dimensions x experiment group)"""
+    from src.cohort_economics import fine_grained_impact
+    from src.risk_adjusted_value import RISK_COLUMNS, RISK_VALUE_COLUMNS, risk_adjusted_impact
+
+    df = load_loan_data(RISK_COLUMNS, db_path)
+    risk = risk_adjusted_impact(df)
+    return fine_grained_impact(df).merge(risk[['cohort_key'] + RISK_VALUE_COLUMNS], on='cohort_key', how='left')
+
+
+def compute_risk_scores(db_path):
+    """Drop-off models, abandonment risk scores, risk cohorts and their bitmap index"""
+    from src.cohort_index import COHORT_DIMENSIONS, COHORT_MEASURES, build_cohort_index
+    from src.predictive_analysis import run_predictive_analysis, PREDICTIVE_COLUMNS
+
+    results = run_predictive_analysis(load_loan_data(PREDICTIVE_COLUMNS, db_path))
+    # Built once per data version; the page only filters it
+    results['cohort_index'] = build_cohort_index(results['cohort_analysis'], COHORT_DIMENSIONS, COHORT_MEASURES)
+    return results
+
+
+def compute_survival(db_path):
+    """Kaplan-Meier curves per cohort and the discrete-time dropout hazard model"""
+    from src.cohorts import COHORT_BANDS
+    from src.survival_analysis import run_survival_analysis
+
+    columns = ['applicant_id'] + [band['column'] for band in COHORT_BANDS.values()]
+    return run_survival_analysis(load_loan_data(columns, db_path), db_path)
+
+
+def compute_experiment_engine(db_path):
+    """A/B tests of every experiment metric, overall and per segment, with multiple-testing correction"""
+    from src.experiment_engine import analyze_experiment
+
+    return analyze_experiment(db_path)
+
+
+def compute_experiment_uncertainty(db_path):
+    """Bayesian posterior and stratified bootstrap summary of the experiment metrics, with the business impact built on it"""
+    from src.experiment_uncertainty import business_impact, experiment_uncertainty, load_arm_totals
+
+    summary = experiment_uncertainty(db_path)
+    return {'summary': summary, 'impact': business_impact(summary, load_arm_totals(db_path))}
+
+
+def compute_variance_reduction(db_path):
+    """Stratified and CUPED variance-reduced experiment estimates"""
+    from src.variance_reduction import analyze_with_variance_reduction
+
+    return analyze_with_variance_reduction(db_path)
+
+
+def compute_policy_frontier(db_path):
+    """Counterfactual underwriting policy sweep with its efficient frontier"""
+    from src.policy_simulator import run_policy_sweep
+
+    return run_policy_sweep(db_path)
+
+
+def compute_sequential(db_path):
+    """Day-by-day always-valid p-values and current stop decisions of the A/B experiment"""
+    from src.sequential_testing import sequential_path
+
+    return sequential_path(db_path)
+
+
+ARTIFACT_TASKS = {
+    'overview': compute_overview_snapshot,
+    'cohorts': compute_cohort_tables,
+    'interactions': compute_interaction_cube,
+    'economic': compute_economic_impact,
+    'economic_bands': compute_economic_bands,
+    'economic_cohorts': compute_economic_cohorts,
+    'risk': compute_risk_scores,
+    'survival': compute_survival,
+    'experiment_engine': compute_experiment_engine,
+    'experiment_uncertainty': compute_experiment_uncertainty,
+    'variance_reduction': compute_variance_reduction,
+    'sequential': compute_sequential,
+    'policy_frontier': compute_policy_frontier,
+}
+
+
+def _run_task(name, db_path, out_dir):
+    start = time.perf_counter()
+    artifact = ARTIFACT_TASKS[name](db_path)
+    with open(os.path.join(out_dir, f"{name}.pkl"), "wb") as f:
+        pickle.dump(artifact, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return name, time.perf_counter() - start
+
+
+def artifact_version_dir(version, artifact_dir=ARTIFACT_DIR):
+    return os.path.join(artifact_dir, version)
+
+
+def missing_artifacts(version_dir):
+    """Tasks without a published artifact in a version directory (all of them if it does not exist)"""
+    return [name for name in ARTIFACT_TASKS if not os.path.exists(os.path.join(version_dir, f"{name}.pkl"))]
+
+
+def _compute_tasks(names, db_path, out_dir, max_workers=None):
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as pool:
+        futures = [pool.submit(_run_task, name, db_path, out_dir) for name in names]
+        return dict(future.result() for future in futures)
+
+
+def precompute_all(db_path="data/loan_funnel.db", artifact_dir=ARTIFACT_DIR, max_workers=None):
+    """Compute every dashboard artifact in a worker pool and publish them as one version
+
+    A version published before a task existed only gets the missing artifacts.
+    """
+    from src.compute_metrics import prepare_append
+
+    # Build any missing derived tables first, so the tasks building them cannot move the version
+    prepare_append(db_path)
+    version = get_data_version(db_path)
+    final_dir = artifact_version_dir(version, artifact_dir)
+    missing = missing_artifacts(final_dir)
+    if not missing:
+        print(f"✅ Artifacts already current ({version})")
+        return version
+
+    tmp_dir = f"{final_dir}.tmp-{os.getpid()}"
+    os.makedirs(tmp_dir, exist_ok=True)
+
+    start = time.perf_counter()
+    try:
+        timings = _compute_tasks(missing, db_path, tmp_dir, max_workers)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    # Publish atomically so readers never see a partial version (or a partial file)
+    if os.path.isdir(final_dir):
+        for name in missing:
+            os.replace(os.path.join(tmp_dir, f"{name}.pkl"), os.path.join(final_dir, f"{name}.pkl"))
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    else:
+        try:
+            os.replace(tmp_dir, final_dir)
+        except OSError:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    prune_versions(artifact_dir, keep=KEEP_VERSIONS)
+
+    print(f"✅ Precomputed artifacts for version {version} in {time.perf_counter() - start:.1f}s")
+    for name, seconds in timings.items():
+        print(f"   {name}: {seconds:.1f}s")
+    return version
+
+
+def prune_versions(artifact_dir=ARTIFACT_DIR, keep=KEEP_VERSIONS):
+    """Remove all but the newest artifact versions"""
+    if not os.path.isdir(artifact_dir):
+        return
+    versions = [
+        os.path.join(artifact_dir, name) for name in os.listdir(artifact_dir)
+        if os.path.isdir(os.path.join(artifact_dir, name)) and '.tmp-' not in name
+    ]
+    versions.sort(key=os.path.getmtime, reverse=True)
+    for path in versions[keep:]:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+# Unpickled artifacts of the current data version only, keyed by file path
+_loaded_artifacts = {}
+_loaded_version_dirs = {}
+
+
+def load_artifact(name, db_path="data/loan_funnel.db", artifact_dir=ARTIFACT_DIR):
+    """Artifact for the current data version, or None if it has not been computed yet"""
+    version_dir = artifact_version_dir(get_data_version(db_path), artifact_dir)
+    path = os.path.join(version_dir, f"{name}.pkl")
+    previous_dir = _loaded_version_dirs.get((db_path, artifact_dir))
+    if previous_dir != version_dir:
+        # A new data version makes the old artifacts unreachable; drop them instead of keeping every version
+        if previous_dir is not None:
+            for stale in [key for key in _loaded_artifacts if os.path.dirname(key) == previous_dir]:
+                del _loaded_artifacts[stale]
+        _loaded_version_dirs[(db_path, artifact_dir)] = version_dir
+    if path not in _loaded_artifacts:
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            _loaded_artifacts[path] = pickle.load(f)
+    return _loaded_artifacts[path]
+
+
+def artifacts_current(db_path="data/loan_funnel.db", artifact_dir=ARTIFACT_DIR):
+    """Whether every task has an artifact for the current data version"""
+    return not missing_artifacts(artifact_version_dir(get_data_version(db_path), artifact_dir))
+
+
+_warmup_lock = threading.Lock()
+_warmup_process = None
+
+
+def start_background_warmup(db_path="data/loan_funnel.db", artifact_dir=ARTIFACT_DIR):
+    """Precompute artifacts in a background process unless they are current or already running"""
+    global _warmup_process
+    with _warmup_lock:
+        if _warmup_process is not None and _warmup_process.poll() is None:
+            return _warmup_process
+        if artifacts_current(db_path, artifact_dir):
+            return None
+        # A separate interpreter keeps model fits and the worker pool out of the server process
+        _warmup_process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--db-path", db_path, "--artifact-dir", artifact_dir],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+        return _warmup_process
+
+
+def artifact_or_warmup(name, db_path="data/loan_funnel.db", artifact_dir=ARTIFACT_DIR):
+    """Artifact for page rendering; kicks off a warm-up instead of computing inline"""
+    artifact = load_artifact(name, db_path, artifact_dir)
+    if artifact is None:
+        start_background_warmup(db_path, artifact_dir)
+    return artifact
+
+
+def load_and_precompute(csv_path="data/loan_funnel_data.csv", db_path="data/loan_funnel.db",
+                        artifact_dir=ARTIFACT_DIR, max_workers=None):
+    """Load the CSV into SQLite, then warm every dashboard artifact"""
+    load_data_to_sqlite(csv_path, db_path)
+    return precompute_all(db_path, artifact_dir, max_workers)
+
+
+def run_schedule(db_path="data/loan_funnel.db", interval_seconds=3600,
+                 artifact_dir=ARTIFACT_DIR, max_workers=None):
+    """Re-check the data version on a fixed interval and precompute when it changes"""
+    while True:
+        if not artifacts_current(db_path, artifact_dir):
+            precompute_all(db_path, artifact_dir, max_workers)
+        time.sleep(interval_seconds)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute dashboard artifacts")
+    parser.add_argument("--db-path", default="data/loan_funnel.db")
+    parser.add_argument("--csv-path", default="data/loan_funnel_data.csv")
+    parser.add_argument("--artifact-dir", default=ARTIFACT_DIR)
+    parser.add_argument("--load", action="store_true", help="reload the CSV into SQLite first")
+    parser.add_argument("--interval", type=int, default=None, help="keep running, re-checking every N seconds")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.load:
+        load_and_precompute(args.csv_path, args.db_path, args.artifact_dir, args.workers)
+    if args.interval:
+        run_schedule(args.db_path, args.interval, args.artifact_dir, args.workers)
+    elif not args.load:
+        precompute_all(args.db_path, args.artifact_dir, args.workers)
@@ -1,31 +1,25 @@
 import streamlit as st
-import matplotlib.pyplot as plt
-import plotly.express as px
-import plotly.graph_objects as go
 import pandas as pd
 import sqlite3
 import os
 import sys
 
-from src.advanced_analysis import (
-    cohort_analysis,
-    get_features_vs_approval,
-    risk_metric,
-    interaction_analysis
-)
+from src.two_way_analysis import visualize_interaction
 
-from src.two_way_analysis import (
-    two_interaction,
-    get_all_key_interactions,
-    visualize_interaction
-)
+from dashboard.precompute import artifact_or_warmup, WARMUP_MESSAGE
 
 def show_approval_analysis(DB_PATH):
     if os.path.exists(DB_PATH):
         st.header("✅ Approval Analysis")
+
+        cohort_tables = artifact_or_warmup('cohorts', DB_PATH)
+        all_interactions = artifact_or_warmup('interactions', DB_PATH)
+        if cohort_tables is None or all_interactions is None:
+            st.info(WARMUP_MESSAGE)
+            return
         
         st.subheader("Average Values for Approvals")
-        feat_df = get_features_vs_approval(DB_PATH)
+        feat_df = cohort_tables['features']
         st.dataframe(
             feat_df.style.format({
                 'avg_income': '${:,.0f}',
@@ -37,7 +31,7 @@ def show_approval_analysis(DB_PATH):
         # ========================= Cohort Analysis =========================
         st.subheader("👥 Approval Rate by Feature")
         
-        credit_df, income_df, emp_df, loan_amo_df, age_df = cohort_analysis(DB_PATH)
+        credit_df, income_df, emp_df, loan_amo_df, age_df = cohort_tables['cohorts']
 
         # Create tabs for different cohort analyses
         tab1, tab2, tab3, tab4, tab5 = st.tabs(["Income", "Credit Score", "Employment", "Loan Amount", "Age"])
@@ -91,7 +85,6 @@ def show_approval_analysis(DB_PATH):
         st.subheader("🧩 Multi-Factor Loan Approval Explorer")
 
         # Interactive feature selection
-        all_interactions = get_all_key_interactions(DB_PATH)
         col1, col2 = st.columns(2)
         with col1:
             primary_factor = st.selectbox(
@@ -1,24 +1,25 @@
 import streamlit as st
-import matplotlib.pyplot as plt
-import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
 import sqlite3
 import os
 import sys
 
-from src.predictive_analysis import run_predictive_analysis
+from dashboard.precompute import artifact_or_warmup, WARMUP_MESSAGE
 
 def show_dropout_analysis(DB_PATH):
     if os.path.exists(DB_PATH):
         st.header("❌ Risk Analysis")
         
-        loan_data = pd.read_csv('./data/loan_funnel_data.csv')
-        results = run_predictive_analysis(loan_data)
+        results = artifact_or_warmup('risk', DB_PATH)
+        if results is None:
+            st.info(WARMUP_MESSAGE)
+            return
 
         cohort_analysis = results['cohort_analysis']
         feature_importance = results['feature_importance']
         analyzed_df = results['dataframe']
+        cohort_index = results['cohort_index']
 
         # Key Metrics
         col2, col3, col4 = st.columns(3)
@@ -39,50 +40,51 @@ def show_dropout_analysis(DB_PATH):
         with col1:
             selected_age = st.multiselect(
                 "Select Age Groups",
-                options=cohort_analysis['age_group'].unique(),
-                default=cohort_analysis['age_group'].unique()
+                options=cohort_index.options('age_group'),
+                default=cohort_index.options('age_group')
             )
             
             selected_income = st.multiselect(
                 "Select Income Bands",
-                options=cohort_analysis['income_band'].unique(),
-                default=cohort_analysis['income_band'].unique()[2]
+                options=cohort_index.options('income_band'),
+                default=cohort_index.options('income_band')[2]
             )
             
             selected_employment = st.multiselect(
                 "Select Employment Status",
-                options=cohort_analysis['employment_status'].unique(),
-                default=cohort_analysis['employment_status'].unique()[0]
+                options=cohort_index.options('employment_status'),
+                default=cohort_index.options('employment_status')[0]
             )
 
         with col2:
             selected_dti = st.multiselect(
                 "Select DTI Groups",
-                options=cohort_analysis['dti_group'].unique(),
-                default=cohort_analysis['dti_group'].unique()[0]
+                options=cohort_index.options('dti_group'),
+                default=cohort_index.options('dti_group')[0]
             )
             
             selected_credit = st.multiselect(
                 "Select Credit Groups",
-                options=cohort_analysis['credit_group'].unique(),
-                default=cohort_analysis['credit_group'].unique()[4]
+                options=cohort_index.options('credit_group'),
+                default=cohort_index.options('credit_group')[4]
             )
             
             selected_loan_amount = st.multiselect(
                 "Select Loan Amount Groups",
-                options=cohort_analysis['loan_amount_group'].unique(),
-                default=cohort_analysis['loan_amount_group'].unique()[0]
+                options=cohort_index.options('loan_amount_group'),
+                default=cohort_index.options('loan_amount_group')[0]
             )
 
-        # Filter cohort data - update to include new filters
-        filtered_cohort = cohort_analysis[
-            (cohort_analysis['age_group'].isin(selected_age)) &
-            (cohort_analysis['dti_group'].isin(selected_dti)) &
-            (cohort_analysis['credit_group'].isin(selected_credit)) &
-            (cohort_analysis['income_band'].isin(selected_income)) &
-            (cohort_analysis['loan_amount_group'].isin(selected_loan_amount)) &
-            (cohort_analysis['employment_status'].isin(selected_employment))
-        ]
+        # Filter cohort data - resolved through the bitmap index
+        cohort_mask = cohort_index.filter({
+            'age_group': selected_age,
+            'dti_group': selected_dti,
+            'credit_group': selected_credit,
+            'income_band': selected_income,
+            'loan_amount_group': selected_loan_amount,
+            'employment_status': selected_employment
+        })
+        filtered_cohort = cohort_index.filtered_frame(cohort_mask)
 
         # Display cohort table
         st.markdown("#### Risk Performance Metrics")
@@ -140,12 +142,7 @@ def show_dropout_analysis(DB_PATH):
             
             # Create pivot table for the heatmap
             if primary_col in filtered_cohort.columns and secondary_col in filtered_cohort.columns:
-                pivot_data = cohort_analysis.pivot_table(
-                    values='abandonment_risk',
-                    index=primary_col,
-                    columns=secondary_col,
-                    aggfunc='mean'
-                )
+                pivot_data = cohort_index.pivot('abandonment_risk', primary_col, secondary_col)
                 
                 # Create heatmap
                 fig = go.Figure(data=go.Heatmap(
@@ -185,7 +182,7 @@ def show_dropout_analysis(DB_PATH):
                         st.write(f"- {row[primary_col]} × {row[secondary_col]}: {row['abandonment_risk']:.1%}")
                     
                     # Calculate average risk
-                    avg_risk = filtered_cohort['abandonment_risk'].mean()
+                    avg_risk = cohort_index.aggregate(cohort_mask)['abandonment_risk']
                     st.write(f"*Average abandonment risk: {avg_risk:.1%}*")
                 
                 with col2:
@@ -202,3 +199,50 @@ def show_dropout_analysis(DB_PATH):
         else:
             st.warning(f"Interaction data not available for {primary_factor_risk} vs {secondary_factor_risk}.")
 
+        # Time-to-event view of progression and dropout
+        survival = artifact_or_warmup('survival', DB_PATH)
+        if survival is not None:
+            st.subheader("⏳ Time in Funnel (Survival Analysis)")
+            survival_factor = st.selectbox("Cohort Dimension", options=list(factor_map), index=2,
+                                           key="survival_factor")
+            curves = survival['km'][factor_map[survival_factor]]
+
+            col1, col2 = st.columns(2)
+            with col1:
+                fig = go.Figure()
+                for cohort, curve in curves.groupby('cohort', sort=False):
+                    fig.add_trace(go.Scatter(x=curve['day'], y=curve['survival'], mode='lines', line_shape='hv',
+                                             name=str(cohort)))
+                fig.update_layout(title=f'Still in Funnel by {survival_factor} (Kaplan-Meier)',
+                                  xaxis_title='Days Since Application', yaxis_title='Share Still in Funnel',
+                                  yaxis_tickformat='.0%')
+                st.plotly_chart(fig, use_container_width=True)
+            with col2:
+                fig = go.Figure()
+                for cohort, curve in curves.groupby('cohort', sort=False):
+                    fig.add_trace(go.Scatter(x=curve['day'], y=curve['cif_dropped'], mode='lines', line_shape='hv',
+                                             name=str(cohort)))
+                fig.update_layout(title=f'Cumulative Dropout by {survival_factor}',
+                                  xaxis_title='Days Since Application', yaxis_title='Share Dropped Out',
+                                  yaxis_tickformat='.0%')
+                st.plotly_chart(fig, use_container_width=True)
+
+            final = curves.groupby('cohort', sort=False).last()
+            summary = pd.DataFrame({
+                'Median Days in Funnel': survival['median_days'][factor_map[survival_factor]],
+                'Funded': final['cif_funded'],
+                'Dropped Out': final['cif_dropped'],
+                'Rejected': final['cif_rejected'],
+            })
+            st.dataframe(summary.style.format({'Median Days in Funnel': '{:.0f}', 'Funded': '{:.1%}',
+                                               'Dropped Out': '{:.1%}', 'Rejected': '{:.1%}'}, na_rep='—'))
+
+            st.markdown("**Dropout Hazard Model** (daily odds of dropping out vs the reference band)")
+            hazard = survival['hazard_model']
+            hazard = hazard[~hazard['term'].str.startswith('day_')]
+            st.dataframe(
+                hazard[['term', 'odds_ratio', 'p_value']].style
+                .background_gradient(subset=['odds_ratio'], cmap='RdYlGn_r')
+                .format({'odds_ratio': '{:.2f}', 'p_value': '{:.3f}'}),
+                hide_index=True
+            )
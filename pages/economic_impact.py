@@ -1,27 +1,37 @@
 import streamlit as st
-import matplotlib.pyplot as plt
 import plotly.express as px
-import plotly.graph_objects as go
 import pandas as pd
 import sqlite3
 import os
 import sys
 
 from src.economic_impact import (
-    run_economic_impact_analysis, 
     get_priority_cohorts, 
     create_cohort_labels
 )
 
+from src.cohort_economics import cohort_report_page
+from src.risk_adjusted_value import stage_value_summary
+
+from dashboard.precompute import artifact_or_warmup, WARMUP_MESSAGE
+
 def show_economic_impact(DB_PATH):
     if os.path.exists(DB_PATH):
         st.header("💰 Economic Impact Analysis")
         
         # Run economic impact analysis
-        loan_data = pd.read_csv('./data/loan_funnel_data.csv')
-        economic_impact_df = run_economic_impact_analysis(loan_data)
+        economic_impact_df = artifact_or_warmup('economic', DB_PATH)
+        if economic_impact_df is None:
+            st.info(WARMUP_MESSAGE)
+            return
         top_10_cohorts = get_priority_cohorts(economic_impact_df, top_n=10)
         top_10_cohorts = create_cohort_labels(top_10_cohorts)
+        bands_df = artifact_or_warmup('economic_bands', DB_PATH)
+        if bands_df is not None:
+            band_columns = ['age_group', 'dti_group', 'credit_group', 'total_lost_revenue_p5',
+                            'total_lost_revenue_p95', 'priority_score_p5', 'priority_score_p95', 'prob_top_10']
+            top_10_cohorts = top_10_cohorts.merge(bands_df[band_columns], on=['age_group', 'dti_group', 'credit_group'],
+                                                  how='left')
         
         # Display key economic metrics
         col1, col2, col3, col4 = st.columns(4)
@@ -49,9 +59,14 @@ def show_economic_impact(DB_PATH):
         display_columns = ['cohort', 'total_applications', 'total_lost_revenue', 
                           'improvement_potential', 'roi_ratio', 'priority_score']
         
+        display_names = ['Cohort', 'Total Applications', 'Lost Revenue', 
+                         'Improvement Potential', 'ROI Ratio', 'Priority Score']
+        if 'prob_top_10' in top_10_cohorts.columns:
+            display_columns += ['total_lost_revenue_p5', 'total_lost_revenue_p95', 'prob_top_10']
+            display_names += ['Lost Revenue P5', 'Lost Revenue P95', 'P(Top 10)']
+        
         formatted_top_10 = top_10_cohorts[display_columns].copy()
-        formatted_top_10.columns = ['Cohort', 'Total Applications', 'Lost Revenue', 
-                                  'Improvement Potential', 'ROI Ratio', 'Priority Score']
+        formatted_top_10.columns = display_names
         
         st.dataframe(
             formatted_top_10.style.format({
@@ -59,9 +74,15 @@ def show_economic_impact(DB_PATH):
                 'Improvement Potential': '${:,.0f}',
                 'Total Applications': '{:,.0f}',
                 'ROI Ratio': '{:.2f}',
-                'Priority Score': '{:.2f}'
+                'Priority Score': '{:.2f}',
+                'Lost Revenue P5': '${:,.0f}',
+                'Lost Revenue P95': '${:,.0f}',
+                'P(Top 10)': '{:.0%}'
             }).background_gradient(subset=['Priority Score'], cmap='Greens')
         )
+        if 'prob_top_10' in top_10_cohorts.columns:
+            st.caption("P5-P95: 90% Monte Carlo band from resampling each cohort's stage counts and loan amounts. "
+                       "P(Top 10): share of draws in which the cohort ranks among the ten highest priorities.")
         
         # Visualizations
         #st.subheader("Economic Impact Visualizations")
@@ -70,6 +91,12 @@ def show_economic_impact(DB_PATH):
         
         with tab1:
             # Lost Revenue Chart
+            error_bars = {}
+            if 'total_lost_revenue_p95' in top_10_cohorts.columns:
+                error_bars = {
+                    'error_x': top_10_cohorts['total_lost_revenue_p95'] - top_10_cohorts['total_lost_revenue'],
+                    'error_x_minus': top_10_cohorts['total_lost_revenue'] - top_10_cohorts['total_lost_revenue_p5']
+                }
             fig = px.bar(
                 top_10_cohorts, 
                 y='cohort', 
@@ -77,7 +104,8 @@ def show_economic_impact(DB_PATH):
                 orientation='h',
                 title='Total Lost Revenue by Cohort',
                 color='total_lost_revenue',
-                color_continuous_scale='Reds'
+                color_continuous_scale='Reds',
+                **error_bars
             )
             fig.update_layout(
                 xaxis_title='Total Lost Revenue ($)',
@@ -140,6 +168,51 @@ def show_economic_impact(DB_PATH):
             )
             st.plotly_chart(fig, use_container_width=True)
         
+        # Every fine-grained cohort, one page at a time
+        cohorts_df = artifact_or_warmup('economic_cohorts', DB_PATH)
+        if cohorts_df is not None:
+            st.subheader("All Cohorts")
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                sort_by = st.selectbox("Rank by", ['priority_score', 'risk_adjusted_value', 'total_lost_revenue',
+                                                   'roi_ratio', 'conversion_improvement_value'])
+            with col2:
+                page_size = st.selectbox("Rows per page", [25, 50, 100])
+            n_pages = max(1, -(-len(cohorts_df) // page_size))
+            with col3:
+                page = st.number_input(f"Page (of {n_pages})", min_value=1, max_value=n_pages, value=1)
+            page_df, _ = cohort_report_page(cohorts_df, int(page), page_size, sort_by)
+            st.caption(f"{len(cohorts_df):,} cohorts across age, DTI, credit, income, loan amount, "
+                       f"employment and experiment group.")
+            st.dataframe(
+                page_df[['rank', 'cohort', 'total_applications', 'total_lost_revenue', 'risk_adjusted_value',
+                         'expected_default_rate', 'roi_ratio', 'priority_score']].style.format({
+                    'total_applications': '{:,.0f}',
+                    'total_lost_revenue': '${:,.0f}',
+                    'risk_adjusted_value': '${:,.0f}',
+                    'expected_default_rate': '{:.1%}',
+                    'roi_ratio': '{:.2f}',
+                    'priority_score': '{:.2f}'
+                }),
+                hide_index=True
+            )
+
+            # Net of expected default losses, improving a stage can destroy value
+            st.subheader("Risk-Adjusted Value of Improving Each Stage")
+            stage_summary = stage_value_summary(cohorts_df)
+            fig = px.bar(
+                stage_summary,
+                x='stage',
+                y=['net_value', 'positive_value'],
+                barmode='group',
+                title='Net Expected Profit Recovered by Stage (after expected default losses)'
+            )
+            fig.update_layout(xaxis_title='Funnel Stage', yaxis_title='Net Expected Profit ($)', legend_title='')
+            st.plotly_chart(fig, use_container_width=True)
+            st.caption("Recovered applicants convert to funding at their cohort's downstream rate and default with the "
+                       "simulator's credit/DTI probability. 'positive_value' counts only cohorts where the stage "
+                       "improvement is worth more than its expected default loss.")
+
         # Economic Insights
         st.subheader("📊 Economic Insights")
         
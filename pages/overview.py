@@ -1,34 +1,24 @@
 import streamlit as st
-import matplotlib.pyplot as plt
 import plotly.express as px
-import plotly.graph_objects as go
 import pandas as pd
 import sqlite3
 import os
 import sys
 
-from src.compute_metrics import (
-        get_total_applications,
-        get_approval_denial_dropout_rates,
-        get_total_applicants_passing_each_stage,
-        conversion_rate_at_each_stage,
-        dropout_rate_at_each_stage,
-        average_time_for_loan_approval,
-        get_decision_to_close_time,
-        get_weekly_trend
-    )
-
-from src.report_alerts import (
-        get_current_metrics,
-        check_alerts
-    )
-
-def show_overview(DB_PATH, ALERT_LOG_PATH):
+from dashboard.precompute import artifact_or_warmup, WARMUP_MESSAGE
+from src.alert_store import recent_alerts
+
+def show_overview(DB_PATH, ALERT_DB_PATH):
     if os.path.exists(DB_PATH):
+        snapshot = artifact_or_warmup('overview', DB_PATH)
+        if snapshot is None:
+            st.info(WARMUP_MESSAGE)
+            return
+
         col1, col2, col3, col4 = st.columns(4)
         
-        total = get_total_applications(DB_PATH)
-        kpi_df = get_approval_denial_dropout_rates(DB_PATH)
+        total = snapshot['total']
+        kpi_df = snapshot['kpi']
         
         with col1:
             st.metric("Total Applications", f"{total.iloc[0, 0]:,}")
@@ -41,7 +31,7 @@ def show_overview(DB_PATH, ALERT_LOG_PATH):
 
         # Weekly Trend
         st.subheader("Weekly Application Volume Trend")
-        trend_df = get_weekly_trend(DB_PATH)
+        trend_df = snapshot['weekly_trend']
         fig = px.line(
             trend_df, 
             x='week', 
@@ -58,7 +48,7 @@ def show_overview(DB_PATH, ALERT_LOG_PATH):
         # Applicants at each stage
         #st.subheader("Number of Applicants at Each Stage")
         funnel_order = ["Application Started", "Documents Uploaded", "Underwriting Review", "Approved", "Funded"]
-        conversion_df = get_total_applicants_passing_each_stage(DB_PATH)
+        conversion_df = snapshot['stage_counts'].copy()
         conversion_df['funnel_stage'] = pd.Categorical(conversion_df['funnel_stage'], categories=funnel_order, ordered=True)
         conversion_df = conversion_df.sort_values('funnel_stage')
         
@@ -77,7 +67,7 @@ def show_overview(DB_PATH, ALERT_LOG_PATH):
         col1, col2 = st.columns(2)
         with col1:
             st.subheader("Conversion Rate at Each Stage")
-            conversion_df = conversion_rate_at_each_stage()
+            conversion_df = snapshot['conversion']
             st.dataframe(
                 conversion_df.style.background_gradient(
                     subset=['Conversion Rate (%)'],
@@ -87,7 +77,7 @@ def show_overview(DB_PATH, ALERT_LOG_PATH):
 
         with col2:
             st.subheader("Dropout Rate at Each Stage")
-            dropout_df = dropout_rate_at_each_stage()
+            dropout_df = snapshot['dropout']
             st.dataframe(
                 dropout_df.style.background_gradient(
                     subset=['Dropout Rate (%)'],
@@ -114,19 +104,35 @@ def show_overview(DB_PATH, ALERT_LOG_PATH):
         col1, col2 = st.columns(2)
 
         with col1:
-            avg_time_df = average_time_for_loan_approval(DB_PATH)
+            avg_time_df = snapshot['avg_approval_time']
             st.metric("Average Approval Time", f"{int(avg_time_df.iloc[0, 0])} days")
 
         with col2:
-            result = get_decision_to_close_time(DB_PATH)
+            result = snapshot['decision_to_close']
             st.metric("Average Decision to Close Time", f"{int(result.iloc[0, 0])} days" if result is not None else "N/A")
 
+        latency = snapshot.get('latency_quantiles')
+        if latency is not None:
+            st.markdown("**Approval and Funding Delay Percentiles (days)**")
+            latency = latency.rename(index={'approval_delay': 'Application to Approval',
+                                            'funding_delay': 'Approval to Funding'})
+            st.dataframe(latency.style.format({'count': '{:,.0f}', 'p50': '{:.1f}', 'p90': '{:.1f}', 'p99': '{:.1f}'}))
+
+        stage_timing = snapshot.get('stage_timing')
+        if stage_timing is not None:
+            st.markdown("**Time in Stage (from the stage event log)**")
+            st.dataframe(
+                stage_timing.style.format({
+                    'Conversion Rate (%)': '{:.1f}%',
+                    'Avg Hours in Stage': '{:.1f} h'
+                }, na_rep='—')
+            )
+
         
 
         # System Monitoring
         st.subheader("🚨 System Monitoring")
-        metrics = get_current_metrics(DB_PATH)
-        alerts = check_alerts(metrics)
+        alerts = snapshot['alerts']
 
         if alerts:
             st.error("Recent Alerts Triggered:")
@@ -135,12 +141,20 @@ def show_overview(DB_PATH, ALERT_LOG_PATH):
         else:
             st.success("✅ All metrics are currently within normal ranges")
 
-        if os.path.exists(ALERT_LOG_PATH):
-            with open(ALERT_LOG_PATH, "r", encoding='utf-8') as file:
-                logs = file.readlines()
-                if logs:
-                    st.subheader("Alert History")
-                    st.text("".join(logs[-10:]))
+        segment_alerts = snapshot.get('segment_alerts', [])
+        if segment_alerts:
+            with st.expander(f"Segment Alerts ({len(segment_alerts)})"):
+                for alert in segment_alerts:
+                    st.warning(alert)
+
+        history = recent_alerts(ALERT_DB_PATH, limit=10)
+        if not history.empty:
+            st.subheader("Alert History")
+            st.dataframe(
+                history[['alert_time', 'severity', 'metric', 'segment', 'value', 'threshold', 'occurrences', 'source']]
+                .style.format({'value': '{:.2%}', 'threshold': '{:.2%}'}, na_rep='—'),
+                hide_index=True
+            )
     else:
         st.error("Database not found. Please check the path.")
 
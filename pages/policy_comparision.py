@@ -1,6 +1,4 @@
 import streamlit as st
-import matplotlib.pyplot as plt
-import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
 import sqlite3
@@ -8,36 +6,43 @@ import os
 import sys
 
 
-from src.ab_testing import (
-    load_experiment_data,
-    run_ab_test_approval,
-    run_ab_test_default
-)
+from src.ab_testing import load_experiment_data
+from src.experiment_engine import overall_results, EXPERIMENT_METRICS
+from src.sequential_testing import format_decisions
+from src.experiment_uncertainty import executive_summary, recommendation
+from src.policy_simulator import CURRENT_POLICIES
+from dashboard.precompute import artifact_or_warmup, WARMUP_MESSAGE
 
 
 def show_policy_comparision(DB_PATH):
     if os.path.exists(DB_PATH):
         st.header("🧪 Policy Comparison")
         
-        # Executive summary
-        st.info("📋 **Executive Summary**: Testing shows Strategy B approves 23.6% more loans with no increase in defaults. We recommend implementing Strategy B across all channels.")
+        results = artifact_or_warmup('experiment_engine', DB_PATH)
+        experiment = artifact_or_warmup('experiment_uncertainty', DB_PATH)
+        if results is None or experiment is None:
+            st.info(WARMUP_MESSAGE)
+            return
+        uncertainty, impact = experiment['summary'], experiment['impact']
+
+        exp_df = load_experiment_data(DB_PATH)
+        overall = overall_results(results)
+        
+        # Executive summary, generated from the posterior and bootstrap results
+        st.info(f"📋 **Executive Summary**: {executive_summary(uncertainty)}")
         
         # Create key metrics at the top for quick insights
-        exp_df = load_experiment_data(DB_PATH)
-        z_stat1, p_val1 = run_ab_test_approval(exp_df)
-        z_stat2, p_val2 = run_ab_test_default(exp_df)
+        p_val1 = overall.at['approval_rate', 'p_value']
+        p_val2 = overall.at['default_rate', 'p_value']
         
-        # Calculate rates for display
-        approval_rate_a = exp_df.loc[0, 'approvals'] / exp_df.loc[0, 'total_applicants'] * 100
-        approval_rate_b = exp_df.loc[1, 'approvals'] / exp_df.loc[1, 'total_applicants'] * 100
+        # Rates for display, Strategy A (control) vs B
+        approval_rate_a, approval_rate_b = overall.loc['approval_rate', ['control_rate', 'treatment_rate']] * 100
         approval_diff = approval_rate_b - approval_rate_a
         
-        funding_rate_a = exp_df.loc[0, 'fundings'] / exp_df.loc[0, 'approvals'] * 100
-        funding_rate_b = exp_df.loc[1, 'fundings'] / exp_df.loc[1, 'approvals'] * 100
+        funding_rate_a, funding_rate_b = overall.loc['funded_given_approved', ['control_rate', 'treatment_rate']] * 100
         funding_diff = funding_rate_b - funding_rate_a
         
-        default_rate_a = exp_df.loc[0, 'defaults'] / exp_df.loc[0, 'fundings'] * 100
-        default_rate_b = exp_df.loc[1, 'defaults'] / exp_df.loc[1, 'fundings'] * 100
+        default_rate_a, default_rate_b = overall.loc['default_rate', ['control_rate', 'treatment_rate']] * 100
         default_diff = default_rate_b - default_rate_a
         
         # Display metrics with context
@@ -48,7 +53,7 @@ def show_policy_comparision(DB_PATH):
         
         with col2:
             funding_diff_display = 0.0 if abs(funding_diff) < 0.05 else funding_diff
-            st.metric("Funding Rate Change", f"{funding_diff_display:+.1f}%", 
+            st.metric("Funded Given Approved Change", f"{funding_diff_display:+.1f}%", 
           delta_color="normal" if funding_diff > 0 else "inverse")
         
         with col3:
@@ -63,14 +68,14 @@ def show_policy_comparision(DB_PATH):
         
         # Add bars for each metric
         fig.add_trace(go.Bar(
-            x=['Approval Rate', 'Funding Rate', 'Default Rate'],
+            x=['Approval Rate', 'Funded Given Approved', 'Default Rate'],
             y=[approval_rate_a, funding_rate_a, default_rate_a],
             name='Strategy A',
             marker_color='#1E88E5'
         ))
         
         fig.add_trace(go.Bar(
-           x=['Approval Rate', 'Funding Rate', 'Default Rate'],
+           x=['Approval Rate', 'Funded Given Approved', 'Default Rate'],
            y=[approval_rate_b, funding_rate_b, default_rate_b],
            name='Strategy B',
            marker_color='#26A69A'
@@ -90,14 +95,14 @@ def show_policy_comparision(DB_PATH):
        
        # Create a formatted comparison table
         comparison_df = exp_df.copy()
-        comparison_df['approval_rate'] = [approval_rate_a, approval_rate_b]
-        comparison_df['funding_rate'] = [funding_rate_a, funding_rate_b]
-        comparison_df['default_rate'] = [default_rate_a, default_rate_b]
+        comparison_df['approval_rate'] = comparison_df['approvals'] / comparison_df['total_applicants'] * 100
+        comparison_df['funded_given_approved'] = comparison_df['fundings'] / comparison_df['approvals'] * 100
+        comparison_df['default_rate'] = comparison_df['defaults'] / comparison_df['fundings'] * 100
        
        # Format for display
         display_df = comparison_df.copy()
         display_df.columns = ['Strategy', 'Approvals', 'Fundings', 'Defaults', 'Total Applicants', 
-                            'Approval Rate', 'Funding Rate', 'Default Rate']
+                            'Approval Rate', 'Funded Given Approved', 'Default Rate']
        
         st.dataframe(
            display_df.style.format({
@@ -106,11 +111,31 @@ def show_policy_comparision(DB_PATH):
                'Defaults': '{:,}',
                'Total Applicants': '{:,}',
                'Approval Rate': '{:.1f}%',
-               'Funding Rate': '{:.1f}%',
+               'Funded Given Approved': '{:.1f}%',
                'Default Rate': '{:.1f}%'
            })
        )
        
+       # Uncertainty around each difference
+        st.subheader("Uncertainty")
+        uncertainty_df = uncertainty[['difference', 'bootstrap_lower', 'bootstrap_upper',
+                                      'credible_lower', 'credible_upper', 'prob_superior']].copy()
+        uncertainty_df.index = uncertainty_df.index.str.replace('_', ' ').str.title()
+        uncertainty_df.columns = ['Difference (B - A)', 'Bootstrap CI Low', 'Bootstrap CI High',
+                                  'Credible Low', 'Credible High', 'P(B Better)']
+        st.dataframe(
+            uncertainty_df.style.format({
+                'Difference (B - A)': '{:+.2%}',
+                'Bootstrap CI Low': '{:+.2%}',
+                'Bootstrap CI High': '{:+.2%}',
+                'Credible Low': '{:+.2%}',
+                'Credible High': '{:+.2%}',
+                'P(B Better)': '{:.1%}'
+            })
+        )
+        st.caption("95% intervals: stratified bootstrap over credit and DTI bands, and Beta-Binomial posterior "
+                   "(uniform prior). For default rate, B is better when it is lower.")
+       
        # Statistical significance section
         st.subheader("Statistical Confidence")
        
@@ -129,35 +154,157 @@ def show_policy_comparision(DB_PATH):
            else:
                st.success("✅ We are **confident** that Strategy B does **not increase risk** of defaults.")
        
+        # Variance-reduced estimates using credit score and DTI
+        st.markdown("**Variance-Reduced Estimates**")
+        vr_df = artifact_or_warmup('variance_reduction', DB_PATH)
+        if vr_df is None:
+            st.info(WARMUP_MESSAGE)
+        else:
+            vr_df = vr_df.copy()
+            vr_df['metric'] = vr_df['metric'].str.replace('_', ' ').str.title()
+            vr_df['method'] = vr_df['method'].map({'unadjusted': 'Unadjusted', 'stratified': 'Stratified (credit x DTI)',
+                                                   'cuped': 'CUPED (credit score, DTI)'})
+            st.dataframe(
+                vr_df[['metric', 'method', 'difference', 'ci_lower', 'ci_upper', 'p_value', 'sample_size_factor']]
+                .rename(columns={
+                    'metric': 'Metric', 'method': 'Method', 'difference': 'Difference (B - A)', 'ci_lower': 'CI Low',
+                    'ci_upper': 'CI High', 'p_value': 'p-value', 'sample_size_factor': 'Applicants Needed vs Unadjusted'
+                })
+                .style.format({
+                    'Difference (B - A)': '{:+.2%}', 'CI Low': '{:+.2%}', 'CI High': '{:+.2%}',
+                    'p-value': '{:.4f}', 'Applicants Needed vs Unadjusted': '{:.0%}'
+                }),
+                hide_index=True
+            )
+            st.caption("Defaults are adjusted per decided applicant: the funded population depends on each "
+                       "strategy's policy, so adjusting the per-funded default rate would remove the policy effect.")
+       
+       # Sequential monitoring: always-valid p-values, safe to check every day
+        st.subheader("Sequential Monitoring")
+        sequential = artifact_or_warmup('sequential', DB_PATH)
+        if sequential is None:
+            st.info(WARMUP_MESSAGE)
+        elif sequential[0] is not None:
+            seq_state, seq_path = sequential
+            for line in format_decisions(seq_state):
+                st.markdown(line)
+            seq_fig = go.Figure()
+            for metric, metric_path in seq_path.groupby('metric', sort=False):
+                seq_fig.add_trace(go.Scatter(
+                    x=metric_path['date'], y=metric_path['p_value'], mode='lines',
+                    name=metric.replace('_', ' ').title()
+                ))
+            seq_fig.add_hline(y=0.05, line_dash="dash", annotation_text="Stop boundary (α = 0.05)")
+            seq_fig.update_layout(
+                title="Always-Valid p-value by Day (mSPRT)",
+                yaxis_title="p-value",
+                yaxis_type="log",
+                height=400
+            )
+            st.plotly_chart(seq_fig, use_container_width=True)
+
+       # Segment-level tests
+        st.subheader("Segment-Level Results")
+        metric = st.selectbox(
+            "Metric",
+            list(EXPERIMENT_METRICS),
+            format_func=lambda name: name.replace('_', ' ').title()
+        )
+        segment_df = results[(results['metric'] == metric) & results['p_adjusted'].notna()]
+        st.caption(f"{int(results['p_adjusted'].notna().sum())} tests across all metrics and segments; "
+                   "p-values adjusted with Benjamini-Hochberg.")
+        st.dataframe(
+            segment_df[['dimension', 'segment', 'control_rate', 'treatment_rate', 'lift',
+                        'lift_ci_lower', 'lift_ci_upper', 'p_adjusted', 'significant']]
+            .rename(columns={
+                'dimension': 'Dimension', 'segment': 'Segment', 'control_rate': 'Strategy A',
+                'treatment_rate': 'Strategy B', 'lift': 'Lift', 'lift_ci_lower': 'Lift CI Low',
+                'lift_ci_upper': 'Lift CI High', 'p_adjusted': 'Adjusted p-value', 'significant': 'Significant'
+            })
+            .style.format({
+                'Strategy A': '{:.1%}', 'Strategy B': '{:.1%}', 'Lift': '{:+.1%}',
+                'Lift CI Low': '{:+.1%}', 'Lift CI High': '{:+.1%}', 'Adjusted p-value': '{:.4f}'
+            }),
+            hide_index=True
+        )
+       
+       # Counterfactual policy sweep
+        st.subheader("Policy Frontier")
+        sweep = artifact_or_warmup('policy_frontier', DB_PATH)
+        if sweep is None:
+            st.info(WARMUP_MESSAGE)
+        else:
+            frontier = sweep[sweep['efficient']].sort_values('expected_approvals')
+            frontier_fig = go.Figure()
+            frontier_fig.add_trace(go.Scatter(
+                x=sweep['expected_approvals'], y=sweep['expected_default_loss'], mode='markers',
+                name='Policy variants', marker=dict(color=sweep['penalty_scale'], colorscale='Viridis', size=6,
+                                                    colorbar=dict(title='Penalty scale')),
+                text=[f"threshold {t:.2f}, penalty x{p:.1f}" for t, p in zip(sweep['threshold'], sweep['penalty_scale'])]
+            ))
+            frontier_fig.add_trace(go.Scatter(
+                x=frontier['expected_approvals'], y=frontier['expected_default_loss'], mode='lines',
+                name='Efficient frontier', line=dict(color='#E53935')
+            ))
+            current = sweep[(sweep['penalty_scale'] == 1.0) & sweep['threshold'].isin(list(CURRENT_POLICIES.values()))]
+            frontier_fig.add_trace(go.Scatter(
+                x=current['expected_approvals'], y=current['expected_default_loss'], mode='markers+text',
+                name='Current strategies', marker=dict(color='black', size=12, symbol='x'),
+                text=[f"Strategy {group}" for threshold in current['threshold']
+                      for group, policy_threshold in CURRENT_POLICIES.items() if policy_threshold == threshold],
+                textposition='top center'
+            ))
+            frontier_fig.update_layout(
+                title="Expected Approvals vs Expected Default Loss",
+                xaxis_title="Expected approvals",
+                yaxis_title="Expected default loss ($)",
+                height=450
+            )
+            st.plotly_chart(frontier_fig, use_container_width=True)
+            st.caption("Every applicant who reached underwriting is re-scored under each approval threshold and "
+                       "penalty scale; the frontier holds the variants no other variant beats on both volume and loss.")
+       
        # Business impact section
         st.subheader("💹 Business Impact")
        
-       # Calculate projected impact
-        additional_approvals = exp_df.loc[1, 'approvals'] - exp_df.loc[0, 'approvals']
-        additional_fundings = exp_df.loc[1, 'fundings'] - exp_df.loc[0, 'fundings']
-        average_loan = 15000  # Assumed average loan amount
-        revenue_impact = additional_fundings * average_loan * 0.03  # Assuming 3% revenue on loans
-       
+       # Projected impact at Strategy B's volume, from the observed arm rates and the uncertainty results
+        decision, decision_text = recommendation(uncertainty)
+        money = lambda value: f"{'-' if value < 0 else ''}${abs(value):,.0f}"
+        default_worse = 1 - uncertainty.at['default_rate', 'prob_superior']
         st.markdown(f"""
-       **Projected Annual Impact of Strategy B:**
+       **Projected Impact of Strategy B** (over its {impact['decided']:,.0f} decided applicants):
        
-       - **Additional Approvals:** {additional_approvals:,} (+{approval_diff:.1f}%)
-       - **Additional Funded Loans:** {additional_fundings:,}
-       - **Estimated Revenue Increase:** ${revenue_impact:,.0f}
+       - **Additional Approvals:** {impact['extra_approvals']:,.0f} (95% CI {impact['extra_approvals_lower']:,.0f} to {impact['extra_approvals_upper']:,.0f})
+       - **Additional Funded Loans:** {impact['extra_fundings']:,.0f} (average funded loan ${impact['average_loan']:,.0f})
+       - **Expected Profit Change:** {money(impact['profit_change'])} ({money(impact['profit_lower'])} to {money(impact['profit_upper'])} across the default-rate 95% CI)
+       - **Chance Defaults Are Higher:** {default_worse:.1%}
        
-       Strategy B shows a significant improvement in approval rates without increasing default risk, 
-       representing a clear operational improvement. Implementation across all channels is recommended.
+       {decision_text}
        """)
+        st.caption(f"Profit assumes a {impact['margin']:.0%} lifetime margin on repaid loans and a "
+                   f"{impact['lgd']:.0%} loss on defaulted ones.")
        
        # Implementation recommendations
         st.subheader("🚀 Implementation Recommendations")
        
-        st.markdown("""
+        if decision == 'implement':
+            st.markdown("""
+       1. **Full Rollout**: Implement Strategy B across all channels
+       2. **Monitor Default Rates**: Continue monitoring default rates during implementation
+       3. **Staff Training**: Ensure underwriting staff are trained on the new approval criteria
+       4. **System Updates**: Update automated decision systems with new approval parameters
+       5. **Follow-up Analysis**: Conduct a follow-up analysis after 3 months to confirm results in production
+       """)
+        elif decision == 'gradual':
+            st.markdown("""
        1. **Phased Rollout**: Implement Strategy B in phases, starting with lower-risk segments
-       2. **Monitor Default Rates**: Continue monitoring default rates closely during implementation
+       2. **Monitor Default Rates**: Track default rates against Strategy A before each expansion
        3. **Staff Training**: Ensure underwriting staff are trained on the new approval criteria
        4. **System Updates**: Update automated decision systems with new approval parameters
        5. **Follow-up Analysis**: Conduct a follow-up analysis after 3 months to confirm results in production
        """)
-        
-
+        else:
+            st.markdown("""
+       1. **Keep Testing**: Continue the experiment until the sequential tests reach a decision
+       2. **Follow-up Analysis**: Revisit these results as more applications are decided
+       """)
@@ -1,24 +1,24 @@
 import pandas as pd
-import sqlite3
 import os
 from statsmodels.stats.proportion import proportions_ztest
+from src.sql_backend import read_sql
+from src.daily_agg import ensure_daily_agg
 
 def load_experiment_data(db_path="data/loan_funnel.db"):
-    conn = sqlite3.connect(db_path)
+    ensure_daily_agg(db_path)
     query = """
         Select
         experiment_group,
-        Sum(Case when decision_outcome = 'Approved' Then 1 else 0 end) as approvals,
-        Sum(Case when funding_status = 'Funded' Then 1 else 0 end) as fundings,
-        Sum(Case when defaulted = 1 Then 1 else 0 end) as defaults,
-        Count(*) as total_applicants
-        From loan_applications
-        Where funnel_stage In ('Approved','Funded','Underwriting Review')
+        Sum(approvals) as approvals,
+        Sum(fundings) as fundings,
+        Sum(defaults) as defaults,
+        Sum(stage_underwriting_review + stage_approved + stage_funded) as total_applicants
+        From daily_funnel_agg
         Group By experiment_group
+        Order By experiment_group
     """
 
-    df = pd.read_sql(query,conn)
-    conn.close()
+    df = read_sql(query, db_path)
 
     print("🔹 Experiment Group Summary:")
     print(df)
@@ -1,9 +1,9 @@
 import pandas as pd
-import sqlite3
 import os
 
+from src.sql_backend import read_sql
+
 def get_features_vs_approval(db_path="data/loan_funnel.db"):
-    conn = sqlite3.connect(db_path)
 
     query = """
     Select 
@@ -15,15 +15,13 @@ def get_features_vs_approval(db_path="data/loan_funnel.db"):
     Where funnel_stage In('Approved','Funded')
 
     """
-    df = pd.read_sql(query,conn)
-    conn.close()
+    df = read_sql(query, db_path)
 
     print("🔹 Feature Averages and Overall Approval Rate:")
     print(df)
     return df
 
 def cohort_analysis(db_path="data/loan_funnel.db"):
-    conn = sqlite3.connect(db_path)
 
     query_credit = """
     Select 
@@ -37,13 +35,13 @@ def cohort_analysis(db_path="data/loan_funnel.db"):
     round(avg(Case when decision_outcome = 'Approved' Then 1 else 0 end)*100,2) As approval_rate,
     count(*) as applicant_count
     From loan_applications
-    Where funnel_stage = "Underwriting Review" or funnel_stage = "Funded"
+    Where funnel_stage = 'Underwriting Review' or funnel_stage = 'Funded'
     Group By credit_band
-    Order By (case when credit_score="Excellent (800+)" then 1
-                   when credit_score="Very Good (740-799)" then 2
-                   when credit_score="Good (670-739)" then 3
-                   when credit_score="Fair (580-669)" then 4
-                   when credit_score="Poor (<580)" then 5
+    Order By (case when credit_band='Excellent (800+)' then 1
+                   when credit_band='Very Good (740-799)' then 2
+                   when credit_band='Good (670-739)' then 3
+                   when credit_band='Fair (580-669)' then 4
+                   when credit_band='Poor (<580)' then 5
                 end)
     """
     query_income = """
@@ -56,11 +54,11 @@ def cohort_analysis(db_path="data/loan_funnel.db"):
     round(avg(case when decision_outcome = 'Approved' then 1 else 0 end) * 100,2) as approval_rate,
     Count(*) as applicant_count
     From loan_applications
-    Where funnel_stage = "Underwriting Review" or funnel_stage = "Funded"
+    Where funnel_stage = 'Underwriting Review' or funnel_stage = 'Funded'
     Group by income_band
-    Order by (case when income_band="High (80k+)" then 1
-                   when income_band="Mid (40k-80k)" then 2
-                   when income_band="Low (<40k)" then 3
+    Order by (case when income_band='High (80k+)' then 1
+                   when income_band='Mid (40k-80k)' then 2
+                   when income_band='Low (<40k)' then 3
                 end)    
     """
     query_emp = """
@@ -68,7 +66,7 @@ def cohort_analysis(db_path="data/loan_funnel.db"):
     round(avg(case when decision_outcome = 'Approved' then 1 else 0 end) * 100,2) as approval_rate,
     count(*) as applicant_count
     From loan_applications
-    Where funnel_stage = "Underwriting Review" or funnel_stage = "Funded"
+    Where funnel_stage = 'Underwriting Review' or funnel_stage = 'Funded'
     Group by employment_status
     """
 
@@ -85,46 +83,47 @@ def cohort_analysis(db_path="data/loan_funnel.db"):
     round(avg(case when decision_outcome = 'Approved' then 1 else 0 end) * 100,2) as approval_rate,
     count(*) as applicant_count
     From loan_applications
-    Where funnel_stage = "Underwriting Review" or funnel_stage = "Funded"
-    Group by (case when loan_amount_band="High-End Loan" then 1
-                   when loan_amount_band="Very Large Loan" then 2
-                   when loan_amount_band="Large Loan" then 3
-                   when loan_amount_band="Medium Loan" then 4
-                   when loan_amount_band="Small Loan" then 5
-                   when loan_amount_band="Very Small Loan" then 6
+    Where funnel_stage = 'Underwriting Review' or funnel_stage = 'Funded'
+    Group by loan_amount_band
+    Order by (case when loan_amount_band='High-End Loan' then 1
+                   when loan_amount_band='Very Large Loan' then 2
+                   when loan_amount_band='Large Loan' then 3
+                   when loan_amount_band='Medium Loan' then 4
+                   when loan_amount_band='Small Loan' then 5
+                   when loan_amount_band='Very Small Loan' then 6
                 end)
     
     """
     query_age="""
     Select 
     Case
-        when age between 18 and 25 then "18-25"
-        when age between 26 and 35 then "26-35"
-        when age between 36 and 45 then "36-45"
-        when age between 46 and 55 then "46-55"
-        when age between 56 and 65 then "56-65"
-        else "65+"
+        when age between 18 and 25 then '18-25'
+        when age between 26 and 35 then '26-35'
+        when age between 36 and 45 then '36-45'
+        when age between 46 and 55 then '46-55'
+        when age between 56 and 65 then '56-65'
+        else '65+'
     End as Age_band,
     round(avg(case when decision_outcome = 'Approved' then 1 else 0 end) * 100,2) as approval_rate,
     count(*) as applicant_count
     From loan_applications
-    Where funnel_stage = "Underwriting Review" or funnel_stage = "Funded"
-    Group by (case when Age_band="65+" then 1
-                   when Age_band="56-65" then 2
-                   when Age_band="46-55" then 3
-                   when Age_band="36-45" then 4
-                   when Age_band="26-35" then 5
-                   when Age_band="18-25" then 6
+    Where funnel_stage = 'Underwriting Review' or funnel_stage = 'Funded'
+    Group by Age_band
+    Order by (case when Age_band='65+' then 1
+                   when Age_band='56-65' then 2
+                   when Age_band='46-55' then 3
+                   when Age_band='36-45' then 4
+                   when Age_band='26-35' then 5
+                   when Age_band='18-25' then 6
                 end)
     """
 
 
-    credit_df = pd.read_sql(query_credit,conn)
-    income_df = pd.read_sql(query_income, conn)
-    emp_df = pd.read_sql(query_emp, conn)
-    loan_amo_df = pd.read_sql(query_loan_amo, conn)
-    age_df = pd.read_sql(query_age, conn)
-    conn.close()
+    credit_df = read_sql(query_credit, db_path)
+    income_df = read_sql(query_income, db_path)
+    emp_df = read_sql(query_emp, db_path)
+    loan_amo_df = read_sql(query_loan_amo, db_path)
+    age_df = read_sql(query_age, db_path)
 
     print("\n🔹 Cohort Analysis by Credit Band:")
     print(credit_df)
@@ -139,18 +138,17 @@ def cohort_analysis(db_path="data/loan_funnel.db"):
     return credit_df, income_df, emp_df, loan_amo_df, age_df
 
 def two_interaction(db_path="data/loan_funnel.db"):
-    conn = sqlite3.connect(db_path)
     query = """-- Create cohorts with multiple dimensions
         WITH cohort_data AS (
         SELECT 
             applicant_id,
             CASE 
-                when age between 18 and 25 then "18-25"
-                when age between 26 and 35 then "26-35"
-                when age between 36 and 45 then "36-45"
-                when age between 46 and 55 then "46-55"
-                when age between 56 and 65 then "56-65"
-                else "65+"
+                when age between 18 and 25 then '18-25'
+                when age between 26 and 35 then '26-35'
+                when age between 36 and 45 then '36-45'
+                when age between 46 and 55 then '46-55'
+                when age between 56 and 65 then '56-65'
+                else '65+'
             END as age_group,
             CASE 
                 WHEN dti_ratio < 0.36 THEN 'Low DTI'
@@ -192,13 +190,12 @@ def two_interaction(db_path="data/loan_funnel.db"):
         GROUP BY age_group, dti_group
         ORDER BY approval_rate DESC;"""
     
-    two_interaction = pd.read_sql(query,conn)
+    two_interaction = read_sql(query, db_path)
     print(two_interaction)
     return two_interaction
 
 
 def risk_metric(db_path="data/loan_funnel.db"):
-    conn = sqlite3.connect(db_path)
     query="""
     
     WITH risk_segments AS (
@@ -230,24 +227,23 @@ def risk_metric(db_path="data/loan_funnel.db"):
     GROUP BY credit_tier, dti_tier
     ORDER BY credit_tier, dti_tier;
     """
-    risk_metric_df = pd.read_sql(query,conn)
+    risk_metric_df = read_sql(query, db_path)
     print(risk_metric_df)
     return risk_metric_df
 
 def interaction_analysis(db_path="data/loan_funnel.db"):
-    conn = sqlite3.connect(db_path)
     query="""
     -- Analyze complex interactions with statistical significance (SQLite compatible)
 WITH cohort_data AS (
   SELECT 
     *,
     CASE 
-                when age between 18 and 25 then "18-25"
-                when age between 26 and 35 then "26-35"
-                when age between 36 and 45 then "36-45"
-                when age between 46 and 55 then "46-55"
-                when age between 56 and 65 then "56-65"
-                else "65+"
+                when age between 18 and 25 then '18-25'
+                when age between 26 and 35 then '26-35'
+                when age between 36 and 45 then '36-45'
+                when age between 46 and 55 then '46-55'
+                when age between 56 and 65 then '56-65'
+                else '65+'
             END as age_group,
     CASE 
       WHEN dti_ratio < 0.30 THEN 'Low DTI'
@@ -295,7 +291,7 @@ SELECT
 FROM interaction_analysis
 ORDER BY approval_rate DESC;"""
 
-    interaction_analysis_df = pd.read_sql(query,conn)
+    interaction_analysis_df = read_sql(query, db_path)
     print(interaction_analysis_df)
     return interaction_analysis_df
 
@@ -0,0 +1,190 @@
+import numpy as np
+import pandas as pd
+
+from src.cohorts import CODE_COLUMNS, code_labels
+from src.daily_agg import ensure_daily_agg
+from src.report_alerts import APPROVAL_RATE_THRESHOLD, FUNDING_RATE_THRESHOLD
+from src.sql_backend import read_sql
+
+# metric -> (numerator, denominator) over daily_funnel_agg measures
+METRICS = {
+    'approval_rate': ('approvals', 'decided'),
+    'funding_rate': ('fundings', 'decided'),
+    'pull_through_rate': ('fundings', 'applications'),
+    'default_rate': ('defaults', 'fundings'),
+}
+
+# Segment dimension -> column of daily_funnel_agg ('all' is the whole book)
+SEGMENT_DIMENSIONS = {'all': None, 'experiment_group': 'experiment_group', **CODE_COLUMNS}
+
+RULE_COLUMNS = ['rule_id', 'dimension', 'segment', 'metric', 'kind', 'direction', 'threshold', 'min_samples']
+
+MEASURES = ['applications', 'decided', 'approvals', 'fundings', 'defaults']
+
+
+def default_rules(min_samples=30):
+    """report_alerts floors for the book and each experiment arm, baseline-drift rules for every segment
+
+    segment '*' applies a rule to every segment of its dimension. For baseline
+    rules the threshold is the tolerated relative change from the trailing
+    baseline (0.2 = alert beyond a 20% drop or rise).
+    """
+    rules = []
+    for dimension in SEGMENT_DIMENSIONS:
+        if dimension in ('all', 'experiment_group'):
+            rules += [
+                (dimension, '*', 'approval_rate', 'threshold', 'below', APPROVAL_RATE_THRESHOLD),
+                (dimension, '*', 'funding_rate', 'threshold', 'below', FUNDING_RATE_THRESHOLD),
+            ]
+        rules += [
+            (dimension, '*', 'approval_rate', 'baseline', 'below', 0.2),
+            (dimension, '*', 'funding_rate', 'baseline', 'below', 0.2),
+            (dimension, '*', 'pull_through_rate', 'baseline', 'below', 0.2),
+            (dimension, '*', 'default_rate', 'baseline', 'above', 0.5),
+        ]
+    df = pd.DataFrame(rules, columns=RULE_COLUMNS[1:-1])
+    df['min_samples'] = min_samples
+    df.insert(0, 'rule_id', [f"R{i:04d}" for i in range(1, len(df) + 1)])
+    return df
+
+
+def load_window(db_path="data/loan_funnel.db", as_of=None, window_days=7, baseline_days=28):
+    """Daily aggregate rows for the evaluation window and its trailing baseline, in one query"""
+    ensure_daily_agg(db_path)
+    if as_of is None:
+        as_of = read_sql("Select max(application_date) as as_of From daily_funnel_agg", db_path).iloc[0, 0]
+    as_of = pd.Timestamp(as_of)
+    window_start = as_of - pd.Timedelta(days=window_days - 1)
+    baseline_start = window_start - pd.Timedelta(days=baseline_days)
+
+    query = f"""
+    Select application_date, experiment_group, {', '.join(CODE_COLUMNS.values())},
+        applications,
+        stage_underwriting_review + stage_approved + stage_funded as decided,
+        approvals, fundings, defaults
+    From daily_funnel_agg
+    Where application_date >= '{baseline_start:%Y-%m-%d}' And application_date <= '{as_of:%Y-%m-%d}'
+    """
+    df = read_sql(query, db_path)
+    df['period'] = np.where(pd.to_datetime(df['application_date']) >= window_start, 'current', 'baseline')
+    return df, as_of
+
+
+def segment_totals(agg):
+    """Measures summed per (period, dimension, segment) for every segment dimension at once"""
+    frames = []
+    for dimension, column in SEGMENT_DIMENSIONS.items():
+        keys = ['period'] if column is None else ['period', column]
+        totals = agg.groupby(keys, observed=True)[MEASURES].sum().reset_index()
+        if column is None:
+            totals['segment'] = 'All'
+        elif dimension in CODE_COLUMNS:
+            totals['segment'] = np.asarray(code_labels(dimension, totals[column]))
+        else:
+            totals['segment'] = totals[column].astype(str)
+        totals['dimension'] = dimension
+        frames.append(totals[['period', 'dimension', 'segment'] + MEASURES])
+    return pd.concat(frames, ignore_index=True)
+
+
+def metric_values(totals):
+    """Long frame of (period, dimension, segment, metric, value, samples)"""
+    frames = []
+    for metric, (numerator, denominator) in METRICS.items():
+        with np.errstate(divide='ignore', invalid='ignore'):
+            value = totals[numerator] / totals[denominator]
+        frames.append(totals[['period', 'dimension', 'segment']].assign(
+            metric=metric, value=value, samples=totals[denominator]))
+    long = pd.concat(frames, ignore_index=True)
+    current = long[long['period'] == 'current'].drop(columns='period')
+    baseline = long[long['period'] == 'baseline'].drop(columns='period').rename(
+        columns={'value': 'baseline_value', 'samples': 'baseline_samples'})
+    return current.merge(baseline, on=['dimension', 'segment', 'metric'], how='left')
+
+
+def evaluate_rules(rules=None, db_path="data/loan_funnel.db", as_of=None, window_days=7, baseline_days=28):
+    """Evaluate every rule against every matching segment in one vectorized pass
+
+    Returns one row per (rule, segment) with the observed value, the limit it
+    was compared to, whether the minimum-sample guard passed and whether it fired.
+    """
+    rules = default_rules() if rules is None else rules
+    agg, as_of = load_window(db_path, as_of, window_days, baseline_days)
+    values = metric_values(segment_totals(agg))
+
+    # Wildcard rules join on dimension only, specific ones on the segment too
+    wildcard = rules[rules['segment'] == '*'].drop(columns='segment').merge(values, on=['dimension', 'metric'])
+    specific = rules[rules['segment'] != '*'].merge(values, on=['dimension', 'segment', 'metric'])
+    results = pd.concat([wildcard, specific], ignore_index=True)
+
+    is_baseline = (results['kind'] == 'baseline').to_numpy()
+    below = (results['direction'] == 'below').to_numpy()
+    threshold = results['threshold'].to_numpy(dtype=float)
+    baseline_value = results['baseline_value'].to_numpy(dtype=float)
+
+    results['limit'] = np.where(
+        is_baseline,
+        baseline_value * np.where(below, 1 - threshold, 1 + threshold),
+        threshold
+    )
+    min_samples = results['min_samples'].to_numpy()
+    results['sufficient'] = (results['samples'].to_numpy() >= min_samples) & (
+        ~is_baseline | (results['baseline_samples'].fillna(0).to_numpy() >= min_samples))
+    value = results['value'].to_numpy(dtype=float)
+    breach = np.where(below, value < results['limit'].to_numpy(), value > results['limit'].to_numpy())
+    results['fired'] = results['sufficient'] & breach
+    results['as_of'] = as_of.strftime('%Y-%m-%d')
+
+    return results.sort_values(['fired', 'dimension', 'segment', 'metric'], ascending=[False, True, True, True]).reset_index(drop=True)
+
+
+def format_alerts(results):
+    """Alert messages for fired rules, in the report_alerts style"""
+    alerts = []
+    for row in results[results['fired']].itertuples(index=False):
+        label = row.metric.replace('_', ' ').capitalize()
+        segment = "overall" if row.dimension == 'all' else f"{row.dimension}={row.segment}"
+        if row.kind == 'baseline':
+            reference = f"baseline {row.baseline_value:.2%}"
+        else:
+            reference = f"threshold {row.threshold:.2%}"
+        verb = "dropped to" if row.direction == 'below' else "rose to"
+        alerts.append(f"⚠️ ALERT [{segment}]: {label} {verb} {row.value:.2%} ({reference}, n={int(row.samples)})")
+    return alerts
+
+
+def alert_records(results):
+    """Fired rules as alert store records"""
+    fired = results[results['fired']]
+    return pd.DataFrame({
+        'metric': fired['metric'],
+        'segment': np.where(fired['dimension'] == 'all', 'overall', fired['dimension'] + '=' + fired['segment']),
+        'value': fired['value'],
+        'threshold': fired['limit'],
+        'severity': np.where(fired['kind'] == 'threshold', 'critical', 'warning'),
+        'message': format_alerts(results),
+        'source': 'alert_rules:' + fired['rule_id'],
+        'data_date': fired['as_of'],
+    })
+
+
+def check_segment_alerts(db_path="data/loan_funnel.db", rules=None, window_days=7, baseline_days=28):
+    results = evaluate_rules(rules, db_path, window_days=window_days, baseline_days=baseline_days)
+    alerts = format_alerts(results)
+
+    evaluated = int(results['sufficient'].sum())
+    print(f"🔹 Evaluated {len(results):,} rule/segment pairs ({evaluated:,} with enough samples) as of {results['as_of'].iat[0] if len(results) else '-'}")
+    if not alerts:
+        print("✅ All segment metrics are within acceptable thresholds.")
+    else:
+        print("\n🚨 SEGMENT ALERTS:")
+        for alert in alerts:
+            print(alert)
+    return results, alerts
+
+
+if __name__ == "__main__":
+    from src.report_alerts import save_alerts
+
+    results, alerts = check_segment_alerts()
+    save_alerts(alert_records(results))
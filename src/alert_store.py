@@ -0,0 +1,235 @@
+import datetime
+import os
+import re
+import sqlite3
+
+import pandas as pd
+
+ALERT_DB_PATH = "data/alerts.db"
+LEGACY_LOG_PATH = "data/alerts_log.txt"
+ALERT_TABLE = "alerts"
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+ALERT_FIELDS = ['metric', 'segment', 'value', 'threshold', 'severity', 'message', 'source', 'data_date']
+
+SUPPRESS_MINUTES = 60
+RETAIN_DAYS = 365
+COMPACT_AFTER_DAYS = 30
+
+
+def _now():
+    return datetime.datetime.now().strftime(TIME_FORMAT)
+
+
+def connect_alert_store(db_path=ALERT_DB_PATH, legacy_log_path=LEGACY_LOG_PATH):
+    """Open the alert store, creating it (and importing the old text log) on first use"""
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30)
+    exists = conn.execute(
+        "Select 1 From sqlite_master Where type = 'table' And name = ?", (ALERT_TABLE,)
+    ).fetchone() is not None
+    if not exists:
+        conn.execute(f"""
+        Create Table {ALERT_TABLE} (
+            id INTEGER PRIMARY KEY,
+            alert_time TEXT NOT NULL,
+            last_seen TEXT NOT NULL,
+            occurrences INTEGER NOT NULL DEFAULT 1,
+            metric TEXT NOT NULL,
+            segment TEXT NOT NULL DEFAULT 'overall',
+            value REAL,
+            threshold REAL,
+            severity TEXT NOT NULL DEFAULT 'warning',
+            message TEXT,
+            source TEXT NOT NULL DEFAULT 'report_alerts',
+            data_date TEXT
+        )
+        """)
+        conn.execute(f"Create Index idx_{ALERT_TABLE}_time On {ALERT_TABLE} (alert_time)")
+        # Serves the suppression lookup for a (metric, segment, source) key
+        conn.execute(f"Create Index idx_{ALERT_TABLE}_key On {ALERT_TABLE} (metric, segment, source, last_seen)")
+        if legacy_log_path and os.path.exists(legacy_log_path):
+            _import_text_log(conn, legacy_log_path)
+        conn.commit()
+    return conn
+
+
+_LEGACY_LINE = re.compile(r"^\[(?P<time>[^\]]+)\]\s*(?P<message>.*?(?P<metric>Approval|Funding) rate dropped to (?P<value>[\d.]+)%.*)$")
+
+
+def _import_text_log(conn, path):
+    """Carry the append-only text log over into the store
+
+    Every logged line was a report_alerts threshold breach, so it gets that
+    rule's threshold and the severity report_alerts stores today.
+    """
+    from src.report_alerts import APPROVAL_RATE_THRESHOLD, FUNDING_RATE_THRESHOLD
+
+    thresholds = {'approval_rate': APPROVAL_RATE_THRESHOLD, 'funding_rate': FUNDING_RATE_THRESHOLD}
+    rows = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            match = _LEGACY_LINE.match(line.strip())
+            if match is None:
+                continue
+            metric = f"{match['metric'].lower()}_rate"
+            rows.append((match['time'], match['time'], metric, 'overall', float(match['value']) / 100,
+                         thresholds[metric], 'critical', match['message'], 'report_alerts', None))
+    conn.executemany(f"""
+        Insert Into {ALERT_TABLE} (alert_time, last_seen, metric, segment, value, threshold, severity, message, source, data_date)
+        Values (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, rows)
+
+
+def record_alerts(records, db_path=ALERT_DB_PATH, suppress_minutes=SUPPRESS_MINUTES, now=None):
+    """Store alert records, folding repeats of an open alert into it
+
+    A record whose (metric, segment, source, data date) already alerted within
+    the suppression window bumps that alert's occurrences and latest value
+    instead of adding a row. Returns the number of new alerts.
+    """
+    if records is None or len(records) == 0:
+        return 0
+    records = pd.DataFrame(records).reindex(columns=ALERT_FIELDS)
+    records['segment'] = records['segment'].fillna('overall')
+    records['severity'] = records['severity'].fillna('warning')
+    records['source'] = records['source'].fillna('report_alerts')
+    records = records.astype(object).where(records.notna(), None)
+
+    now = now or _now()
+    since = (datetime.datetime.strptime(now, TIME_FORMAT) - datetime.timedelta(minutes=suppress_minutes)).strftime(TIME_FORMAT)
+
+    conn = connect_alert_store(db_path)
+    inserted = 0
+    try:
+        for record in records.to_dict('records'):
+            open_alert = conn.execute(f"""
+                Select id From {ALERT_TABLE}
+                Where metric = ? And segment = ? And source = ? And last_seen >= ? And data_date Is ?
+                Order By last_seen Desc Limit 1
+            """, (record['metric'], record['segment'], record['source'], since, record['data_date'])).fetchone()
+            if open_alert is not None:
+                conn.execute(f"""
+                    Update {ALERT_TABLE}
+                    Set last_seen = ?, occurrences = occurrences + 1, value = ?, message = ?
+                    Where id = ?
+                """, (now, record['value'], record['message'], open_alert[0]))
+            else:
+                conn.execute(f"""
+                    Insert Into {ALERT_TABLE} (alert_time, last_seen, {', '.join(ALERT_FIELDS)})
+                    Values (?, ?, {', '.join('?' for _ in ALERT_FIELDS)})
+                """, (now, now, *[record[field] for field in ALERT_FIELDS]))
+                inserted += 1
+        conn.commit()
+    finally:
+        conn.close()
+    print(f"✅ {inserted} new alert(s) stored in {db_path} ({len(records) - inserted} suppressed as repeats)")
+    return inserted
+
+
+def replace_alert_history(records, source_pattern, db_path=ALERT_DB_PATH, date_range=None):
+    """Bulk-insert backfilled alerts, replacing earlier ones from matching sources over the same dates
+
+    Records carry their own alert_time; no suppression is applied. date_range
+    (first, last data_date) is the span that was re-evaluated and is cleared
+    even when it produced no alerts; by default it is the span of the records.
+    """
+    records = pd.DataFrame(records).reindex(columns=['alert_time'] + ALERT_FIELDS)
+    records = records.astype(object).where(records.notna(), None)
+    if date_range is None and len(records):
+        date_range = (min(records['data_date']), max(records['data_date']))
+
+    conn = connect_alert_store(db_path)
+    try:
+        if date_range is not None:
+            conn.execute(f"""
+                Delete From {ALERT_TABLE}
+                Where source Like ? And data_date >= ? And data_date <= ?
+            """, (source_pattern, *date_range))
+        conn.executemany(f"""
+            Insert Into {ALERT_TABLE} (alert_time, last_seen, {', '.join(ALERT_FIELDS)})
+            Values (?, ?, {', '.join('?' for _ in ALERT_FIELDS)})
+        """, ((row[0], row[0], *row[1:]) for row in records.itertuples(index=False, name=None)))
+        conn.commit()
+    finally:
+        conn.close()
+    return len(records)
+
+
+def recent_alerts(db_path=ALERT_DB_PATH, limit=10, since=None, legacy_log_path=LEGACY_LOG_PATH):
+    """Newest alerts first, read through the time index
+
+    A missing store is created from the old text log when there is one, so
+    alerts logged before the store existed still show; otherwise the result is empty.
+    """
+    if not os.path.exists(db_path) and not (legacy_log_path and os.path.exists(legacy_log_path)):
+        return pd.DataFrame(columns=['alert_time', 'last_seen', 'occurrences', 'metric', 'segment', 'value',
+                                     'threshold', 'severity', 'message', 'source'])
+    conn = connect_alert_store(db_path, legacy_log_path)
+    try:
+        where = "Where alert_time >= ?" if since else ""
+        params = (since, limit) if since else (limit,)
+        return pd.read_sql(f"""
+            Select alert_time, last_seen, occurrences, metric, segment, value, threshold, severity, message, source
+            From {ALERT_TABLE}
+            {where}
+            Order By alert_time Desc
+            Limit ?
+        """, conn, params=params)
+    finally:
+        conn.close()
+
+
+def compact_alerts(db_path=ALERT_DB_PATH, retain_days=RETAIN_DAYS, compact_after_days=COMPACT_AFTER_DAYS, now=None):
+    """Drop alerts past retention and collapse older ones to one row per day and key"""
+    now = datetime.datetime.strptime(now, TIME_FORMAT) if now else datetime.datetime.now()
+    retain_cutoff = (now - datetime.timedelta(days=retain_days)).strftime(TIME_FORMAT)
+    compact_cutoff = (now - datetime.timedelta(days=compact_after_days)).strftime(TIME_FORMAT)
+
+    conn = connect_alert_store(db_path)
+    try:
+        deleted = conn.execute(f"Delete From {ALERT_TABLE} Where alert_time < ?", (retain_cutoff,)).rowcount
+
+        # Keep the first alert of each day per key, carrying the day's totals
+        conn.execute(f"""
+            Create Temp Table compacted As
+            Select min(id) as id, max(last_seen) as last_seen, sum(occurrences) as occurrences
+            From {ALERT_TABLE}
+            Where alert_time < ?
+            Group By date(alert_time), metric, segment, source, data_date
+            Having count(*) > 1
+        """, (compact_cutoff,))
+        merged = conn.execute(f"""
+            Delete From {ALERT_TABLE}
+            Where alert_time < ?
+              And id Not In (Select min(id) From {ALERT_TABLE} Where alert_time < ?
+                             Group By date(alert_time), metric, segment, source, data_date)
+        """, (compact_cutoff, compact_cutoff)).rowcount
+        conn.execute(f"""
+            Update {ALERT_TABLE}
+            Set last_seen = (Select last_seen From compacted Where compacted.id = {ALERT_TABLE}.id),
+                occurrences = (Select occurrences From compacted Where compacted.id = {ALERT_TABLE}.id)
+            Where id In (Select id From compacted)
+        """)
+        conn.execute("Drop Table compacted")
+        conn.commit()
+        conn.execute("Vacuum")
+    finally:
+        conn.close()
+    print(f"✅ Alert store compacted: {deleted} expired, {merged} merged into daily rows")
+    return deleted, merged
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect or compact the alert store")
+    parser.add_argument("--db-path", default=ALERT_DB_PATH)
+    parser.add_argument("--compact", action="store_true")
+    parser.add_argument("--retain-days", type=int, default=RETAIN_DAYS)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.compact:
+        compact_alerts(args.db_path, args.retain_days)
+    print(recent_alerts(args.db_path, args.limit))
@@ -0,0 +1,277 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from src.alert_rules import MEASURES, METRICS, segment_totals
+from src.cohorts import CODE_COLUMNS
+from src.daily_agg import ensure_daily_agg, last_complete_date
+from src.sql_backend import read_sql
+
+STATE_TABLE = "anomaly_state"
+SERIES_KEYS = ['metric', 'dimension', 'segment']
+SEASON_COLUMNS = [f"season_{day}" for day in range(7)]
+
+# Smoothing for the level/variance and for the weekday factors
+EWMA_ALPHA = 0.1
+SEASON_BETA = 0.05
+# CUSUM reference value and decision interval, in standard deviations
+CUSUM_K = 0.5
+CUSUM_H = 5.0
+Z_THRESHOLD = 3.0
+WARMUP_DAYS = 21
+MIN_DAILY_SAMPLES = 20
+
+
+def empty_state(series):
+    """Fresh detector state for new (metric, dimension, segment) series"""
+    state = series[SERIES_KEYS].copy()
+    state['last_date'] = None
+    state['n_obs'] = 0
+    state['ewma_mean'] = np.nan
+    state['ewma_var'] = 0.0
+    state['cusum_pos'] = 0.0
+    state['cusum_neg'] = 0.0
+    for column in SEASON_COLUMNS:
+        state[column] = 1.0
+    return state
+
+
+def load_state(db_path="data/loan_funnel.db"):
+    conn = sqlite3.connect(db_path)
+    try:
+        exists = conn.execute(
+            "Select 1 From sqlite_master Where type = 'table' And name = ?", (STATE_TABLE,)
+        ).fetchone() is not None
+        if not exists:
+            return None
+        return pd.read_sql(f"Select * From {STATE_TABLE}", conn)
+    finally:
+        conn.close()
+
+
+def save_state(state, db_path="data/loan_funnel.db"):
+    conn = sqlite3.connect(db_path)
+    try:
+        state.to_sql(STATE_TABLE, conn, if_exists='replace', index=False)
+    finally:
+        conn.close()
+
+
+def daily_series(db_path="data/loan_funnel.db", after_date=None, through_date=None):
+    """Numerator and denominator matrices (series x day) for every metric and segment after a date"""
+    ensure_daily_agg(db_path)
+    conditions = []
+    if after_date is not None:
+        conditions.append(f"application_date > '{after_date}'")
+    if through_date is not None:
+        conditions.append(f"application_date <= '{through_date}'")
+    where = f"Where {' And '.join(conditions)}" if conditions else ""
+
+    agg = read_sql(f"""
+    Select application_date as period, experiment_group, {', '.join(CODE_COLUMNS.values())},
+        applications,
+        stage_underwriting_review + stage_approved + stage_funded as decided,
+        approvals, fundings, defaults
+    From daily_funnel_agg
+    {where}
+    """, db_path)
+    if agg.empty:
+        return None, None, None, pd.DatetimeIndex([])
+
+    totals = segment_totals(agg)
+    days = pd.date_range(agg['period'].min(), agg['period'].max(), freq='D')
+    day_labels = days.strftime('%Y-%m-%d')
+
+    # One reshape of all measures to segment x day, then each metric picks its two blocks
+    wide = totals.groupby(['dimension', 'segment', 'period'])[MEASURES].sum().unstack('period', fill_value=0)
+    numerators, denominators = [], []
+    for metric, (numerator, denominator) in METRICS.items():
+        index = pd.MultiIndex.from_frame(wide.index.to_frame(index=False).assign(metric=metric)[SERIES_KEYS])
+        numerators.append(wide[numerator].reindex(columns=day_labels, fill_value=0).set_axis(index))
+        denominators.append(wide[denominator].reindex(columns=day_labels, fill_value=0).set_axis(index))
+    num = pd.concat(numerators)
+    den = pd.concat(denominators)
+    series = num.index.to_frame(index=False)
+    return series, num.to_numpy(dtype=float), den.to_numpy(dtype=float), days
+
+
+def run_detectors(state, num, den, days):
+    """Advance EWMA, weekday seasonality and CUSUM for all series one day at a time
+
+    Each step is vectorized across series, so cost grows with days x series in
+    numpy, never with Python loops over segments. Returns the per-day detector
+    output for days where a series had enough samples.
+    """
+    mean = state['ewma_mean'].to_numpy(dtype=float).copy()
+    var = state['ewma_var'].to_numpy(dtype=float).copy()
+    pos = state['cusum_pos'].to_numpy(dtype=float).copy()
+    neg = state['cusum_neg'].to_numpy(dtype=float).copy()
+    n_obs = state['n_obs'].to_numpy(dtype=np.int64).copy()
+    season = state[SEASON_COLUMNS].to_numpy(dtype=float).copy()
+    rows = np.arange(len(state))
+
+    records = []
+    for t, day in enumerate(days):
+        weekday = day.weekday()
+        observed = den[:, t] >= MIN_DAILY_SAMPLES
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rate = num[:, t] / den[:, t]
+        factor = season[rows, weekday]
+        adjusted = rate / factor
+
+        first = observed & np.isnan(mean)
+        mean[first] = adjusted[first]
+        active = observed & ~first
+
+        # Binomial noise floors the spread so quiet series do not alarm on tiny moves
+        shrunk = (mean * den[:, t] + 1) / (den[:, t] + 2)
+        binomial_var = shrunk * (1 - shrunk) / np.maximum(den[:, t], 1)
+        sd = np.sqrt(np.maximum(var, binomial_var))
+        z = np.where(active, (adjusted - mean) / sd, 0.0)
+
+        pos = np.where(active, np.maximum(0.0, pos + z - CUSUM_K), pos)
+        neg = np.where(active, np.maximum(0.0, neg - z - CUSUM_K), neg)
+        warm = n_obs >= WARMUP_DAYS
+        ewma_alarm = active & warm & (np.abs(z) > Z_THRESHOLD)
+        cusum_alarm = active & warm & ((pos > CUSUM_H) | (neg > CUSUM_H))
+
+        if active.any():
+            records.append(pd.DataFrame({
+                'series': rows[active],
+                'date': day.strftime('%Y-%m-%d'),
+                'value': rate[active],
+                'expected': (mean * factor)[active],
+                'z_score': z[active],
+                'cusum_pos': pos[active],
+                'cusum_neg': neg[active],
+                'samples': den[active, t],
+                'ewma_alarm': ewma_alarm[active],
+                'cusum_alarm': cusum_alarm[active],
+            }))
+
+        # Update after scoring so today's value never explains itself
+        delta = adjusted - mean
+        var = np.where(active, (1 - EWMA_ALPHA) * (var + EWMA_ALPHA * delta ** 2), var)
+        mean = np.where(active, mean + EWMA_ALPHA * delta, mean)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = rate / mean
+        season[rows, weekday] = np.where(active & (mean > 0), factor + SEASON_BETA * (ratio - factor), factor)
+        pos = np.where(cusum_alarm, 0.0, pos)
+        neg = np.where(cusum_alarm, 0.0, neg)
+        n_obs = n_obs + observed
+
+    state = state.copy()
+    state['ewma_mean'], state['ewma_var'] = mean, var
+    state['cusum_pos'], state['cusum_neg'] = pos, neg
+    state['n_obs'] = n_obs
+    state[SEASON_COLUMNS] = season
+    if len(days):
+        state['last_date'] = days[-1].strftime('%Y-%m-%d')
+
+    output = pd.concat(records, ignore_index=True) if records else pd.DataFrame(
+        columns=['series', 'date', 'value', 'expected', 'z_score', 'cusum_pos', 'cusum_neg',
+                 'samples', 'ewma_alarm', 'cusum_alarm'])
+    return state, output
+
+
+def update_anomaly_state(db_path="data/loan_funnel.db", through_date=None, reset=False):
+    """Process every complete day since the last run (the whole history on the first run or reset) and persist state
+
+    The newest day in the aggregates is still receiving rows, so it is left for
+    a later run; scoring it now would freeze a partial day into the state.
+    Returns the anomalies detected in the processed days.
+    """
+    state = None if reset else load_state(db_path)
+    after_date = None
+    if state is not None and state['last_date'].notna().any():
+        after_date = state['last_date'].dropna().max()
+
+    complete = last_complete_date(db_path)
+    if complete is None:
+        print("✅ Anomaly state is up to date.")
+        return empty_anomalies()
+    through_date = complete if through_date is None else min(str(through_date), complete)
+
+    series, num, den, days = daily_series(db_path, after_date, through_date)
+    if series is None:
+        print("✅ Anomaly state is up to date.")
+        return empty_anomalies()
+
+    # Line up stored state with the new days' series: new segments start fresh,
+    # stored segments with no new rows keep their state and see empty days
+    if state is None:
+        state = empty_state(series)
+    else:
+        new_series = series.merge(state[SERIES_KEYS], on=SERIES_KEYS, how='left', indicator=True)
+        new_series = new_series[new_series['_merge'] == 'left_only'].drop(columns='_merge')
+        state = pd.concat([state, empty_state(new_series)], ignore_index=True)
+        state['n_obs'] = state['n_obs'].astype(np.int64)
+        position = state[SERIES_KEYS].merge(series.reset_index(), on=SERIES_KEYS, how='left')['index']
+        present = position.notna().to_numpy()
+        aligned_num = np.zeros((len(state), num.shape[1]))
+        aligned_den = np.zeros((len(state), den.shape[1]))
+        aligned_num[present] = num[position[present].astype(int)]
+        aligned_den[present] = den[position[present].astype(int)]
+        series, num, den = state[SERIES_KEYS], aligned_num, aligned_den
+
+    state, output = run_detectors(state, num, den, days)
+    save_state(state, db_path)
+
+    anomalies = output[output['ewma_alarm'] | output['cusum_alarm']]
+    anomalies = series.iloc[anomalies['series']].reset_index(drop=True).join(
+        anomalies.drop(columns='series').reset_index(drop=True))
+    print(f"🔹 Processed {len(days)} day(s) for {len(series):,} series; {len(anomalies):,} anomalies")
+    return anomalies.sort_values(['date'] + SERIES_KEYS).reset_index(drop=True)
+
+
+def empty_anomalies():
+    return pd.DataFrame(columns=SERIES_KEYS + ['date', 'value', 'expected', 'z_score', 'cusum_pos',
+                                               'cusum_neg', 'samples', 'ewma_alarm', 'cusum_alarm'])
+
+
+def format_anomalies(anomalies):
+    """Alert messages for detected anomalies, in the report_alerts style"""
+    alerts = []
+    for row in anomalies.itertuples(index=False):
+        label = row.metric.replace('_', ' ').capitalize()
+        segment = "overall" if row.dimension == 'all' else f"{row.dimension}={row.segment}"
+        detector = "EWMA" if row.ewma_alarm else "CUSUM"
+        direction = "above" if row.value > row.expected else "below"
+        alerts.append(
+            f"⚠️ ANOMALY [{segment}] {row.date}: {label} {row.value:.2%} is {direction} "
+            f"expected {row.expected:.2%} (z={row.z_score:.1f}, {detector})"
+        )
+    return alerts
+
+
+def anomaly_records(anomalies):
+    """Detected anomalies as alert store records"""
+    return pd.DataFrame({
+        'metric': anomalies['metric'],
+        'segment': np.where(anomalies['dimension'] == 'all', 'overall',
+                            anomalies['dimension'] + '=' + anomalies['segment']),
+        'value': anomalies['value'],
+        'threshold': anomalies['expected'],
+        'severity': np.where(anomalies['z_score'].abs() > 2 * Z_THRESHOLD, 'critical', 'warning'),
+        'message': format_anomalies(anomalies),
+        'source': 'anomaly_detection',
+        'data_date': anomalies['date'],
+    })
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="EWMA/CUSUM anomaly detection on the daily funnel aggregates")
+    parser.add_argument("--db-path", default="data/loan_funnel.db")
+    parser.add_argument("--through", default=None, help="process days up to this date (YYYY-MM-DD)")
+    parser.add_argument("--reset", action="store_true", help="discard stored state and backfill the full history")
+    args = parser.parse_args()
+
+    anomalies = update_anomaly_state(args.db_path, args.through, args.reset)
+    for alert in format_anomalies(anomalies):
+        print(alert)
+    if len(anomalies):
+        from src.report_alerts import save_alerts
+        save_alerts(anomaly_records(anomalies))
@@ -0,0 +1,112 @@
+import argparse
+import contextlib
+import io
+import os
+import sqlite3
+import tempfile
+import time
+
+import pandas as pd
+
+from src import sql_backend
+from src.daily_agg import build_daily_agg
+from src.compute_metrics import (
+    mark_data_version,
+    get_total_applicants_passing_each_stage,
+    get_approval_denial_dropout_rates,
+    get_pull_through_ratio,
+    get_weekly_trend,
+    average_time_for_loan_approval
+)
+from src.advanced_analysis import cohort_analysis, risk_metric, interaction_analysis
+from src.two_way_analysis import get_all_key_interactions
+from src.ab_testing import load_experiment_data
+from src.report_alerts import get_current_metrics
+
+BENCHMARK_QUERIES = {
+    'stage_passage': get_total_applicants_passing_each_stage,
+    'approval_rates': get_approval_denial_dropout_rates,
+    'pull_through': get_pull_through_ratio,
+    'weekly_trend': get_weekly_trend,
+    'approval_time': average_time_for_loan_approval,
+    'cohort_analysis': cohort_analysis,
+    'risk_metric': risk_metric,
+    'interaction_analysis': interaction_analysis,
+    'two_way_interactions': get_all_key_interactions,
+    'experiment_groups': load_experiment_data,
+    'current_metrics': get_current_metrics,
+}
+
+
+def build_scaled_dataset(scale, csv_path="data/loan_funnel_data.csv", out_dir=None):
+    """Replicate the sample data `scale` times into a fresh SQLite file and Parquet store"""
+    from src.columnar_store import write_columnar_store
+
+    out_dir = out_dir or tempfile.mkdtemp(prefix="loan_funnel_bench_")
+    db_path = os.path.join(out_dir, "loan_funnel.db")
+    parquet_root = os.path.join(out_dir, "parquet")
+
+    base = pd.read_csv(csv_path)
+    copies = []
+    for i in range(scale):
+        copy = base.copy()
+        copy['applicant_id'] = copy['applicant_id'] + f"-{i}"
+        copies.append(copy)
+    df = pd.concat(copies, ignore_index=True)
+
+    conn = sqlite3.connect(db_path)
+    df.to_sql('loan_applications', conn, if_exists='replace', index=False, chunksize=100000)
+    version = mark_data_version(conn, reload=True)
+    conn.close()
+    build_daily_agg(db_path)
+    # Stamped with the data version so duckdb-parquet serves it rather than falling back to SQLite
+    write_columnar_store(df, parquet_root, version)
+
+    print(f"✅ Built {len(df):,} rows in {out_dir}")
+    return db_path, parquet_root
+
+
+def benchmark_backends(db_path="data/loan_funnel.db", parquet_root="data/parquet",
+                       backends=sql_backend.BACKENDS, repeat=3):
+    """Best-of-N wall time of every metrics query on every backend"""
+    previous = sql_backend.get_backend()
+    rows = []
+    try:
+        for backend in backends:
+            sql_backend.set_backend(backend, parquet_root=parquet_root)
+            for name, query_func in BENCHMARK_QUERIES.items():
+                timings = []
+                try:
+                    for _ in range(repeat):
+                        start = time.perf_counter()
+                        with contextlib.redirect_stdout(io.StringIO()):
+                            query_func(db_path)
+                        timings.append(time.perf_counter() - start)
+                    rows.append({'backend': backend, 'query': name, 'seconds': min(timings)})
+                except Exception as exc:
+                    print(f"⚠️ {backend} unavailable for {name}: {exc.__class__.__name__}")
+                    rows.append({'backend': backend, 'query': name, 'seconds': float('nan')})
+    finally:
+        sql_backend.set_backend(previous)
+
+    results = pd.DataFrame(rows).pivot(index='query', columns='backend', values='seconds')
+    results = results[[backend for backend in backends if backend in results.columns]]
+    print("🔹 Query time by backend (seconds, best of {}):".format(repeat))
+    print(results.round(4))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare SQL execution backends")
+    parser.add_argument("--db-path", default="data/loan_funnel.db")
+    parser.add_argument("--parquet-root", default="data/parquet")
+    parser.add_argument("--scale", type=int, default=None,
+                        help="replicate the sample data N times into a temporary dataset first")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--backends", nargs="+", default=list(sql_backend.BACKENDS))
+    args = parser.parse_args()
+
+    db_path, parquet_root = args.db_path, args.parquet_root
+    if args.scale:
+        db_path, parquet_root = build_scaled_dataset(args.scale)
+    benchmark_backends(db_path, parquet_root, args.backends, args.repeat)
@@ -0,0 +1,128 @@
+import math
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.cohorts import COHORT_BANDS, CODE_COLUMNS, cohort_codes, code_labels
+from src.economic_impact import (
+    COST_PER_APPLICATION,
+    IMPROVEMENT_SHARE,
+    LOST_STAGES,
+    STAGE_IMPROVEMENTS,
+    stage_key,
+    top_k_rows,
+)
+
+# Raw columns needed to band applicants on every cohort dimension
+FINE_COHORT_COLUMNS = ['age', 'dti_ratio', 'credit_score', 'income', 'loan_amount', 'employment_status',
+                       'experiment_group', 'funnel_stage']
+EXPERIMENT_GROUPS = ['A', 'B']
+STAGES = LOST_STAGES + ['Funded']
+
+
+def cohort_keys(df, dimensions=None):
+    """One integer key per row packing the experiment group and every band code (mixed radix)"""
+    dimensions = dimensions or list(COHORT_BANDS)
+    codes = cohort_codes(df, dimensions)
+    group = pd.Categorical(df['experiment_group'], categories=EXPERIMENT_GROUPS).codes.astype(np.int64)
+    key = np.where(group < 0, len(EXPERIMENT_GROUPS), group)
+    for dimension in dimensions:
+        size = len(COHORT_BANDS[dimension]['labels'])
+        key = key * size + codes[CODE_COLUMNS[dimension]].to_numpy(dtype=np.int64)
+    return key
+
+
+def decode_keys(keys, dimensions=None):
+    """Integer cohort keys back to experiment group and band code columns"""
+    dimensions = dimensions or list(COHORT_BANDS)
+    keys = np.asarray(keys, dtype=np.int64).copy()
+    columns = {}
+    for dimension in reversed(dimensions):
+        size = len(COHORT_BANDS[dimension]['labels'])
+        columns[CODE_COLUMNS[dimension]] = (keys % size).astype(np.int8)
+        keys //= size
+    columns['experiment_group'] = np.array(EXPERIMENT_GROUPS + ['Other'])[keys]
+    return pd.DataFrame({name: columns[name] for name in ['experiment_group']
+                         + [CODE_COLUMNS[d] for d in dimensions]})
+
+
+def fine_grained_impact(df, dimensions=None, profit_margin=0.05):
+    """Economic impact for every observed cohort across all band dimensions and experiment group
+
+    Rows are binned by a packed integer cohort key and stage with bincount, so
+    cost is linear in rows and the number of observed cohorts; metrics follow
+    calculate_economic_impact. Cohorts are identified by their codes.
+    """
+    dimensions = dimensions or list(COHORT_BANDS)
+    key = cohort_keys(df, dimensions)
+    cohorts, cohort_index = np.unique(key, return_inverse=True)
+
+    stage = pd.Categorical(df['funnel_stage'], categories=STAGES).codes.astype(np.int64)
+    valid = stage >= 0
+    cell = cohort_index[valid] * len(STAGES) + stage[valid]
+    size = len(cohorts) * len(STAGES)
+    counts = np.bincount(cell, minlength=size).reshape(-1, len(STAGES))
+    amounts = np.bincount(cell, weights=pd.to_numeric(df['loan_amount']).to_numpy(dtype=float)[valid],
+                          minlength=size).reshape(-1, len(STAGES))
+
+    impact = decode_keys(cohorts, dimensions)
+    impact['cohort_key'] = cohorts
+    impact['total_applications'] = np.bincount(cohort_index, minlength=len(cohorts))
+    conversion_value = np.zeros(len(cohorts))
+    for i, stage_name in enumerate(LOST_STAGES):
+        name = stage_key(stage_name)
+        impact[f"lost_at_{name}"] = amounts[:, i]
+        impact[f"lost_revenue_{name}"] = amounts[:, i] * profit_margin
+        conversion_value += amounts[:, i] * STAGE_IMPROVEMENTS[name] * 0.05
+    impact['total_lost_revenue'] = amounts[:, :len(LOST_STAGES)].sum(axis=1) * profit_margin
+    impact['improvement_potential'] = impact['total_lost_revenue'] * IMPROVEMENT_SHARE
+    impact['roi_ratio'] = impact['improvement_potential'] / (impact['total_applications'] * COST_PER_APPLICATION)
+    impact['priority_score'] = impact['improvement_potential'] * impact['total_applications'] / 1000
+    impact['conversion_improvement_value'] = conversion_value
+    impact['funded'] = counts[:, len(LOST_STAGES)]
+    return impact
+
+
+def label_cohorts(impact, dimensions=None):
+    """Readable band labels and a combined cohort label for a (small) slice of cohorts"""
+    dimensions = dimensions or list(COHORT_BANDS)
+    labeled = impact.copy()
+    for dimension in dimensions:
+        labeled[dimension] = np.asarray(code_labels(dimension, labeled[CODE_COLUMNS[dimension]]))
+    labeled['cohort'] = labeled['experiment_group'].astype(str)
+    for dimension in dimensions:
+        labeled['cohort'] = labeled['cohort'] + ' | ' + labeled[dimension].astype(str)
+    return labeled
+
+
+def cohort_report_page(impact, page=1, page_size=25, by='priority_score'):
+    """One page of cohorts ranked by a metric; only the rows up to that page are selected and sorted"""
+    n_pages = max(1, math.ceil(len(impact) / page_size))
+    page = min(max(1, page), n_pages)
+    ranked = top_k_rows(impact, page * page_size, by)
+    rows = ranked.iloc[(page - 1) * page_size:]
+    rows = label_cohorts(rows)
+    rows.insert(0, 'rank', np.arange((page - 1) * page_size + 1, (page - 1) * page_size + 1 + len(rows)))
+    return rows.reset_index(drop=True), n_pages
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from src.dataset import load_loan_data
+
+    parser = argparse.ArgumentParser(description="Economic impact over every cohort band and experiment group")
+    parser.add_argument("--db-path", default="data/loan_funnel.db")
+    parser.add_argument("--page", type=int, default=1)
+    parser.add_argument("--page-size", type=int, default=25)
+    parser.add_argument("--sort-by", default="priority_score")
+    args = parser.parse_args()
+
+    pd.set_option('display.width', 200)
+    start = time.perf_counter()
+    impact = fine_grained_impact(load_loan_data(FINE_COHORT_COLUMNS, args.db_path))
+    page, n_pages = cohort_report_page(impact, args.page, args.page_size, args.sort_by)
+    print(f"🔹 {len(impact):,} cohorts in {time.perf_counter() - start:.2f}s — page {args.page} of {n_pages}")
+    print(page[['rank', 'cohort', 'total_applications', 'total_lost_revenue', 'roi_ratio', 'priority_score']]
+          .round(2).to_string(index=False))
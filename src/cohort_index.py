@@ -0,0 +1,96 @@
+import pandas as pd
+import numpy as np
+
+# Filters and measures of the Risk page's cohort explorer
+COHORT_DIMENSIONS = ['age_group', 'dti_group', 'credit_group', 'income_band', 'loan_amount_group', 'employment_status']
+COHORT_MEASURES = ['completed_app', 'uploaded_docs', 'passed_underwriting', 'funded', 'abandonment_risk']
+
+
+class CohortBitmapIndex:
+    """Bitmap index over categorical cohort dimensions for fast interactive filtering"""
+
+    def __init__(self, df, dimensions, measures):
+        self.df = df.reset_index(drop=True)
+        self.dimensions = list(dimensions)
+        self.measures = list(measures)
+        self.n_rows = len(self.df)
+        self.codes = {}
+        self.levels = {}
+        self.bitmaps = {}
+
+        for dim in self.dimensions:
+            codes, levels = pd.factorize(self.df[dim], sort=False)
+            self.codes[dim] = codes
+            self.levels[dim] = pd.Index(levels)
+            # One packed bitset per dimension value
+            one_hot = codes[np.newaxis, :] == np.arange(len(levels))[:, np.newaxis]
+            self.bitmaps[dim] = np.packbits(one_hot, axis=1)
+
+        # Pre-summed measure arrays: NaNs are zeroed and tracked separately so
+        # that any filtered mean is a single masked sum
+        values = self.df[self.measures].to_numpy(dtype=float)
+        self.valid = ~np.isnan(values)
+        self.values = np.where(self.valid, values, 0.0)
+        self.valid = self.valid.astype(float)
+
+    def options(self, dim):
+        """Distinct values of a dimension in order of appearance"""
+        return self.levels[dim]
+
+    def select(self, dim, selected):
+        """Bitset of rows whose dimension value is in the selection"""
+        positions = self.levels[dim].get_indexer(pd.Index(list(selected)))
+        positions = positions[positions >= 0]
+        if len(positions) == 0:
+            return np.zeros(self.bitmaps[dim].shape[1], dtype=np.uint8)
+        return np.bitwise_or.reduce(self.bitmaps[dim][positions], axis=0)
+
+    def filter(self, selections):
+        """Resolve a {dimension: selected values} combination to a boolean row mask"""
+        bits = np.full(self.bitmaps[self.dimensions[0]].shape[1], 0xFF, dtype=np.uint8)
+        for dim, selected in selections.items():
+            bits &= self.select(dim, selected)
+        return np.unpackbits(bits, count=self.n_rows).astype(bool)
+
+    def filtered_frame(self, mask):
+        """Rows of the indexed frame matching a mask"""
+        return self.df[mask]
+
+    def aggregate(self, mask):
+        """Mean of every measure over the filtered rows"""
+        weights = mask.astype(float)
+        sums = weights @ self.values
+        counts = weights @ self.valid
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = np.where(counts > 0, sums / counts, np.nan)
+        return pd.Series(means, index=self.measures)
+
+    def pivot(self, measure, index, columns, mask=None):
+        """Mean of a measure by two dimensions, equivalent to pivot_table(aggfunc='mean')"""
+        col = self.measures.index(measure)
+        n_index = len(self.levels[index])
+        n_columns = len(self.levels[columns])
+        keep = (self.codes[index] >= 0) & (self.codes[columns] >= 0)
+        if mask is not None:
+            keep &= mask
+        cells = self.codes[index][keep] * n_columns + self.codes[columns][keep]
+        weights = self.valid[keep, col]
+        size = n_index * n_columns
+
+        sums = np.bincount(cells, weights=self.values[keep, col] * weights, minlength=size)
+        counts = np.bincount(cells, weights=weights, minlength=size)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = np.where(counts > 0, sums / counts, np.nan)
+
+        pivot_data = pd.DataFrame(
+            means.reshape(n_index, n_columns),
+            index=self.levels[index].rename(index),
+            columns=self.levels[columns].rename(columns)
+        )
+        pivot_data = pivot_data.sort_index(axis=0).sort_index(axis=1)
+        return pivot_data.dropna(how='all').dropna(axis=1, how='all')
+
+
+def build_cohort_index(cohort_df, dimensions, measures):
+    """Build a bitmap index over a cohort table or row-level data"""
+    return CohortBitmapIndex(cohort_df, dimensions, measures)
@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+
+# Cohort band definitions shared by the aggregate tables. Labels and edges match
+# the CASE expressions in two_way_analysis.py.
+COHORT_BANDS = {
+    'age_group': {
+        'column': 'age',
+        'labels': ['18-25', '26-35', '36-45', '46-55', '56-65', '65+'],
+    },
+    'dti_group': {
+        'column': 'dti_ratio',
+        'labels': ['Low DTI', 'Medium DTI', 'High DTI'],
+    },
+    'credit_group': {
+        'column': 'credit_score',
+        'labels': ['Poor (<580)', 'Fair (580-669)', 'Good (670-739)', 'Very Good (740-799)', 'Excellent (800+)'],
+    },
+    'income_band': {
+        'column': 'income',
+        'labels': ['Low (<40k)', 'Mid (40k-80k)', 'High (80k+)'],
+    },
+    'loan_amount_group': {
+        'column': 'loan_amount',
+        'labels': ['Very Small Loan', 'Small Loan', 'Medium Loan', 'Large Loan', 'Very Large Loan', 'High-End Loan'],
+    },
+    'employment_status': {
+        'column': 'employment_status',
+        'labels': ['Employed', 'Self-employed', 'Unemployed'],
+    },
+}
+
+# Integer code column stored in aggregate tables for each cohort dimension
+CODE_COLUMNS = {
+    'age_group': 'age_code',
+    'dti_group': 'dti_code',
+    'credit_group': 'credit_code',
+    'income_band': 'income_code',
+    'loan_amount_group': 'loan_code',
+    'employment_status': 'employment_code',
+}
+
+
+# Upper edge of every band but the last as (operator, value); the last band takes the rest
+BAND_EDGES = {
+    'age_group': [('<=', 25), ('<=', 35), ('<=', 45), ('<=', 55), ('<=', 65)],
+    'dti_group': [('<', 0.36), ('<=', 0.50)],
+    'credit_group': [('<', 580), ('<=', 669), ('<=', 739), ('<=', 799)],
+    'income_band': [('<', 40000), ('<=', 80000)],
+    'loan_amount_group': [('<', 5000), ('<=', 10000), ('<=', 15000), ('<=', 25000), ('<=', 35000)],
+}
+_OPERATORS = {'<': np.less, '<=': np.less_equal}
+
+
+def _band_conditions(dimension, values):
+    return [_OPERATORS[operator](values, edge) for operator, edge in BAND_EDGES[dimension]]
+
+
+def band_code_sql(dimension):
+    """SQL CASE expression giving the same integer band code as band_codes"""
+    column = COHORT_BANDS[dimension]['column']
+    whens = "\n            ".join(f"WHEN {column} {operator} {edge} THEN {code}"
+                                  for code, (operator, edge) in enumerate(BAND_EDGES[dimension]))
+    return f"""CASE
+            {whens}
+            ELSE {len(COHORT_BANDS[dimension]['labels']) - 1}
+        END"""
+
+
+def band_codes(df, dimension):
+    """Integer band code (index into the dimension's labels) for every row"""
+    band = COHORT_BANDS[dimension]
+    values = df[band['column']]
+
+    if dimension == 'employment_status':
+        codes = pd.Categorical(values, categories=band['labels']).codes
+        return np.where(codes < 0, len(band['labels']) - 1, codes).astype(np.int8)
+
+    values = pd.to_numeric(values).to_numpy()
+    conditions = _band_conditions(dimension, values)
+    choices = np.arange(len(conditions))
+    return np.select(conditions, choices, default=len(band['labels']) - 1).astype(np.int8)
+
+
+def cohort_codes(df, dimensions=None):
+    """Frame of integer band codes, one column per cohort dimension"""
+    dimensions = dimensions or list(COHORT_BANDS)
+    return pd.DataFrame({CODE_COLUMNS[dim]: band_codes(df, dim) for dim in dimensions}, index=df.index)
+
+
+def code_labels(dimension, codes):
+    """Map integer band codes back to their labels as an ordered categorical"""
+    labels = COHORT_BANDS[dimension]['labels']
+    return pd.Categorical.from_codes(np.asarray(codes), categories=labels, ordered=True)
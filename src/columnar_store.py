@@ -0,0 +1,142 @@
+import os
+import shutil
+import uuid
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from src.dataset import COLUMN_DTYPES, typed_loan_frame
+
+PARQUET_DIR = "data/parquet"
+PARTITION_COLUMN = "application_month"
+VERSION_FILE = "_data_version"
+
+DATE_COLUMNS = [name for name, dtype in COLUMN_DTYPES.items() if dtype == 'date']
+
+
+def write_columnar_store(df, root=PARQUET_DIR, version=None):
+    """Write loan applications as Parquet partitioned by application month
+
+    Categorical columns are stored dictionary-encoded and dates as date32. The
+    whole store is replaced so partitions never mix two data loads.
+    """
+    typed = typed_loan_frame(df)
+    typed[PARTITION_COLUMN] = typed['application_date'].dt.strftime('%Y-%m')
+
+    table = pa.Table.from_pandas(typed, preserve_index=False)
+    for name in DATE_COLUMNS:
+        if name in table.column_names:
+            position = table.column_names.index(name)
+            table = table.set_column(position, name, table[name].cast(pa.date32()))
+
+    tmp_root = f"{root}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_root, ignore_errors=True)
+    ds.write_dataset(
+        table,
+        tmp_root,
+        format="parquet",
+        partitioning=ds.partitioning(pa.schema([(PARTITION_COLUMN, pa.string())]), flavor="hive"),
+        file_options=ds.ParquetFileFormat().make_write_options(use_dictionary=True, compression="zstd"),
+        existing_data_behavior="overwrite_or_ignore"
+    )
+    if version is not None:
+        with open(os.path.join(tmp_root, VERSION_FILE), "w", encoding="utf-8") as f:
+            f.write(version)
+
+    shutil.rmtree(root, ignore_errors=True)
+    os.replace(tmp_root, root)
+    print(f"✅ Columnar store written to {root}")
+
+
+def append_columnar_store(df, root=PARQUET_DIR, version=None):
+    """Add newly ingested rows to the store as extra files in their month partitions"""
+    typed = typed_loan_frame(df)
+    typed[PARTITION_COLUMN] = typed['application_date'].dt.strftime('%Y-%m')
+
+    table = pa.Table.from_pandas(typed, preserve_index=False)
+    for name in DATE_COLUMNS:
+        if name in table.column_names:
+            position = table.column_names.index(name)
+            table = table.set_column(position, name, table[name].cast(pa.date32()))
+
+    ds.write_dataset(
+        table,
+        root,
+        format="parquet",
+        partitioning=ds.partitioning(pa.schema([(PARTITION_COLUMN, pa.string())]), flavor="hive"),
+        file_options=ds.ParquetFileFormat().make_write_options(use_dictionary=True, compression="zstd"),
+        basename_template=f"append-{version or uuid.uuid4().hex}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore"
+    )
+    if version is not None:
+        stamp_columnar_store(root, version)
+
+
+def stamp_columnar_store(root=PARQUET_DIR, version=None):
+    """Record the data version the store's files now match"""
+    with open(os.path.join(root, VERSION_FILE), "w", encoding="utf-8") as f:
+        f.write(version)
+
+
+def columnar_store_exists(root=PARQUET_DIR, version=None):
+    """Whether the store exists (and, if given, was written for this data version)"""
+    if not os.path.isdir(root):
+        return False
+    if version is None:
+        return True
+    version_path = os.path.join(root, VERSION_FILE)
+    if not os.path.exists(version_path):
+        return False
+    with open(version_path, encoding="utf-8") as f:
+        return f.read().strip() == version
+
+
+def open_columnar_store(root=PARQUET_DIR):
+    return ds.dataset(
+        root,
+        format="parquet",
+        partitioning=ds.partitioning(pa.schema([(PARTITION_COLUMN, pa.string())]), flavor="hive"),
+        exclude_invalid_files=True,
+        ignore_prefixes=[VERSION_FILE, "."]
+    )
+
+
+def read_columnar_store(columns=None, start_month=None, end_month=None, root=PARQUET_DIR, filter=None):
+    """Read loan applications with column projection and month partition pruning
+
+    Months are 'YYYY-MM' strings (inclusive). An extra pyarrow expression can be
+    passed as filter and is pushed down into the Parquet scan.
+    """
+    dataset = open_columnar_store(root)
+
+    expression = filter
+    if start_month is not None:
+        month_filter = ds.field(PARTITION_COLUMN) >= start_month
+        expression = month_filter if expression is None else expression & month_filter
+    if end_month is not None:
+        month_filter = ds.field(PARTITION_COLUMN) <= end_month
+        expression = month_filter if expression is None else expression & month_filter
+
+    if columns is None:
+        columns = [name for name in dataset.schema.names if name != PARTITION_COLUMN]
+    table = dataset.to_table(columns=list(columns), filter=expression)
+    df = table.to_pandas(date_as_object=False)
+
+    for name in df.columns:
+        if COLUMN_DTYPES.get(name) == 'date':
+            df[name] = df[name].astype('datetime64[s]')
+    return df
+
+
+def list_partitions(root=PARQUET_DIR):
+    """Application months present in the store"""
+    if not os.path.isdir(root):
+        return []
+    prefix = f"{PARTITION_COLUMN}="
+    return sorted(name[len(prefix):] for name in os.listdir(root) if name.startswith(prefix))
+
+
+if __name__ == "__main__":
+    print(list_partitions())
+    print(read_columnar_store(['credit_score', 'funnel_stage'], start_month=list_partitions()[-1]).head())
@@ -1,34 +1,140 @@
 import pandas as pd
 import sqlite3
 import os
+import datetime
 
-def load_data_to_sqlite(csv_path="data/loan_funnel_data.csv",db_path="data/loan_funnel.db"):
+from src.sql_backend import read_sql
+from src.daily_agg import build_daily_agg, update_daily_agg, ensure_daily_agg
+from src.event_log import events_from_applications, write_events, ensure_event_log
+from src.latency_sketch import build_latency_sketches, update_latency_sketches, ensure_latency_sketches
+
+def load_data_to_sqlite(csv_path="data/loan_funnel_data.csv",db_path="data/loan_funnel.db",parquet_root="data/parquet",
+                        events_csv_path="data/loan_funnel_events.csv"):
     if not os.path.exists(csv_path):
         raise FileNotFoundError(f"{csv_path} not found. Please generate the data first.")
     
     df = pd.read_csv(csv_path)
     os.makedirs(os.path.dirname(db_path),exist_ok=True)
 
+    # Stage-transition log from the generator, or derived from the final stages
+    if events_csv_path is not None and os.path.exists(events_csv_path):
+        events = pd.read_csv(events_csv_path)
+    else:
+        events = events_from_applications(df)
+
     conn = sqlite3.connect(db_path)
     df.to_sql('loan_applications', conn, if_exists='replace',index=False)
+    write_events(conn, events, replace=True)
+    version = mark_data_version(conn, reload=True)
     conn.close()
     print(f"✅ Data loaded into {db_path}")
+    build_daily_agg(db_path)
+    build_latency_sketches(db_path)
 
-def get_total_applications(db_path="data/loan_funnel.db"):
+    # Columnar copy for analytical reads; pass parquet_root=None to skip
+    if parquet_root is not None:
+        from src.columnar_store import write_columnar_store
+        write_columnar_store(df, parquet_root, version)
+
+def prepare_append(db_path="data/loan_funnel.db"):
+    """Derived tables must cover the existing rows before new ones are folded in"""
+    ensure_daily_agg(db_path)
+    ensure_latency_sketches(db_path)
+    ensure_event_log(db_path)
+
+def append_applications(df, db_path="data/loan_funnel.db", parquet_root="data/parquet", events=None,
+                        prepared=False, mark_version=True):
+    """Ingest new application rows (and their stage events) and fold them into the daily aggregates incrementally
+
+    Streaming writers call prepare_append once and pass prepared=True, and with
+    mark_version=False they publish the new version themselves (publish_data_version)
+    once per flush window rather than invalidating caches on every batch.
+    """
+    if events is None:
+        events = events_from_applications(df)
+    if not prepared:
+        prepare_append(db_path)
+    conn = sqlite3.connect(db_path)
+    df.to_sql('loan_applications', conn, if_exists='append', index=False)
+    write_events(conn, events)
+    update_daily_agg(conn, df)
+    update_latency_sketches(conn, df)
+    conn.commit()
+    version = mark_data_version(conn) if mark_version else None
+    conn.close()
+
+    if parquet_root is not None and os.path.isdir(parquet_root):
+        from src.columnar_store import append_columnar_store
+        append_columnar_store(df, parquet_root, version)
+    return version
+
+def publish_data_version(db_path="data/loan_funnel.db", parquet_root="data/parquet"):
+    """Stamp a new data version after unversioned appends, and mark the Parquet store as matching it"""
+    conn = sqlite3.connect(db_path)
+    version = mark_data_version(conn)
+    conn.close()
+    if parquet_root is not None and os.path.isdir(parquet_root):
+        from src.columnar_store import stamp_columnar_store
+        stamp_columnar_store(parquet_root, version)
+    return version
+
+def mark_data_version(conn, reload=False):
+    """Stamp the database with a new version after loan_applications changes
+
+    load_id changes only when reload=True (a full load replaced the table), so
+    readers can tell a reload from an append.
+    """
+    version = datetime.datetime.now().strftime("%Y%m%d%H%M%S%f")
+    conn.execute("Create Table If Not Exists data_version (version TEXT, load_id TEXT)")
+    if 'load_id' not in [row[1] for row in conn.execute("Pragma table_info(data_version)")]:
+        conn.execute("Alter Table data_version Add Column load_id TEXT")
+    previous = conn.execute("Select load_id From data_version").fetchone()
+    load_id = previous[0] if not reload and previous is not None and previous[0] is not None else version
+    conn.execute("Delete From data_version")
+    conn.execute("Insert Into data_version (version, load_id) Values (?, ?)", (version, load_id))
+    conn.commit()
+    return version
+
+def get_load_id(db_path="data/loan_funnel.db", conn=None):
+    """Stamp of the last full load of loan_applications, or None for unstamped databases (never writes)"""
+    own = conn is None
+    conn = conn or sqlite3.connect(db_path)
+    try:
+        row = conn.execute("Select load_id From data_version").fetchone()
+    except sqlite3.OperationalError:
+        row = None
+    finally:
+        if own:
+            conn.close()
+    return row[0] if row is not None else None
+
+def get_data_version(db_path="data/loan_funnel.db"):
+    """Version stamp of the loaded data, falling back to the file signature for older databases (never writes)"""
     conn = sqlite3.connect(db_path)
+    try:
+        row = conn.execute("Select version From data_version").fetchone()
+    except sqlite3.OperationalError:
+        row = None
+    finally:
+        conn.close()
+
+    if row is not None:
+        return row[0]
+    stat = os.stat(db_path)
+    return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+def get_total_applications(db_path="data/loan_funnel.db"):
     query = """
     Select count(*) as total_applications
     From loan_applications
 
     """
-    df = pd.read_sql(query,conn)
-    conn.close()
+    df = read_sql(query, db_path)
     print("Total Applications: ")
     print(df)
     return df
 
 def get_total_applicants_passing_each_stage(db_path="data/loan_funnel.db"):
-    conn = sqlite3.connect(db_path)
     query = """
     with cte as(
         Select funnel_stage,
@@ -36,17 +142,16 @@ def get_total_applicants_passing_each_stage(db_path="data/loan_funnel.db"):
         From loan_applications
         Group By funnel_stage)
     Select funnel_stage, sum(applicants) over
-        (Order By Case when funnel_stage is "Application Started" then 1
-                    when funnel_stage is "Documents Uploaded" then 2
-                    when funnel_stage is "Underwriting Review" then 3
-                    when funnel_stage is "Approved" then 4
-                    when funnel_stage is "Funded" then 5
+        (Order By Case when funnel_stage = 'Application Started' then 1
+                    when funnel_stage = 'Documents Uploaded' then 2
+                    when funnel_stage = 'Underwriting Review' then 3
+                    when funnel_stage = 'Approved' then 4
+                    when funnel_stage = 'Funded' then 5
                     end
                     rows between current row and unbounded following) as Applicants_passing
     From cte
     """
-    df = pd.read_sql(query,conn)
-    conn.close()
+    df = read_sql(query, db_path)
 
     # total_applicants = df['applicants'].sum()
     # df['conversion_rate'] = df['applicants']/total_applicants * 100
@@ -54,8 +159,8 @@ def get_total_applicants_passing_each_stage(db_path="data/loan_funnel.db"):
     print(df)
     return df
 
-def conversion_rate_at_each_stage():
-    stage_counts = get_total_applicants_passing_each_stage().reset_index(drop=True)
+def conversion_rate_at_each_stage(db_path="data/loan_funnel.db"):
+    stage_counts = get_total_applicants_passing_each_stage(db_path).reset_index(drop=True)
     total_applicants = stage_counts[stage_counts['funnel_stage'] == 'Application Started']["Applicants_passing"].iloc[0]
     coversion_row = []
     for i in range(len(stage_counts)-1):
@@ -74,9 +179,9 @@ def conversion_rate_at_each_stage():
     print(conversion_df)
     return conversion_df
 
-def dropout_rate_at_each_stage():
+def dropout_rate_at_each_stage(db_path="data/loan_funnel.db"):
     
-    stage_counts = get_total_applicants_passing_each_stage().reset_index(drop=True)
+    stage_counts = get_total_applicants_passing_each_stage(db_path).reset_index(drop=True)
     dropout_rows = []
 
 
@@ -101,76 +206,69 @@ def dropout_rate_at_each_stage():
 
 
 def get_approval_denial_dropout_rates(db_path="data/loan_funnel.db"):
-    conn = sqlite3.connect(db_path)
+    ensure_daily_agg(db_path)
     query = """
     Select
      
-     avg(case when decision_outcome = 'Approved' then 1 else 0 end)*100 as Approval_rate,
-     avg(case when decision_outcome = 'Rejected' then 1 else 0 end)*100 as Rejection_rate,
-     avg(case when decision_outcome is null then 1 else 0 end)*100 as Dropout_rate
+     sum(approvals)*100.0/sum(applications) as Approval_rate,
+     sum(rejections)*100.0/sum(applications) as Rejection_rate,
+     sum(undecided)*100.0/sum(applications) as Dropout_rate
      
-    from loan_applications
+    from daily_funnel_agg
     
     """
 
-    df = pd.read_sql(query, conn)
-    conn.close()
+    df = read_sql(query, db_path)
 
     print("🔹 Approval, Rejected and Dropout Rates:")
     print(df)
     return df
 
 def average_time_for_loan_approval(db_path="data/loan_funnel.db"):
-    conn = sqlite3.connect(db_path)
+    ensure_daily_agg(db_path)
     query = """
-    Select round(avg(julianday(approved_date)-julianday(application_date))) as Average_approval_time
-    From loan_applications
-    Where decision_outcome = 'Approved'
+    Select round(sum(approval_delay_sum)*1.0/sum(approval_delay_count)) as Average_approval_time
+    From daily_funnel_agg
 
     """
-    df = pd.read_sql(query, conn)
-    conn.close()
+    df = read_sql(query, db_path)
     print(df)
     return df
 
 def get_pull_through_ratio(db_path="data/loan_funnel.db"):
-    conn=sqlite3.connect(db_path)
+    ensure_daily_agg(db_path)
     query="""
     Select strftime('%Y-%m',application_date) as application_month,
-    round(avg(case when funding_status='Funded' then 1.0 else 0.0 end)*100) as Pull_through_rate
-    From loan_applications
+    round(sum(fundings)*100.0/sum(applications)) as Pull_through_rate
+    From daily_funnel_agg
     Group by application_month
     Order by application_month
     """
-    df = pd.read_sql(query,conn)
-    conn.close()
+    df = read_sql(query, db_path)
     print(df)
     return df
 
 def get_decision_to_close_time(db_path="data/loan_funnel.db"):
-    conn=sqlite3.connect(db_path)
+    ensure_daily_agg(db_path)
     query="""
-    Select round(avg(julianday(funded_date)-julianday(approved_date))) as Average_decision_close_date
-    From loan_applications
-    Where decision_outcome = 'Approved'
+    Select round(sum(funding_delay_sum)*1.0/sum(funding_delay_count)) as Average_decision_close_date
+    From daily_funnel_agg
     """
-    df=pd.read_sql(query,conn)
-    conn.close()
+    df=read_sql(query, db_path)
     print(df)
     return df
 
 def get_weekly_trend(db_path="data/loan_funnel.db"):
-    conn = sqlite3.connect(db_path)
+    ensure_daily_agg(db_path)
     query = """
     Select 
         strftime('%Y-%W', application_date) As week,
-        count(*) As applications
-    From loan_applications
+        sum(applications) As applications
+    From daily_funnel_agg
     Group By week
     Order By week
     """ 
-    df = pd.read_sql(query,conn)
-    conn.close()
+    df = read_sql(query, db_path)
 
     print("🔹 Weekly Application Volume Trend:")
     print(df)
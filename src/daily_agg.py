@@ -0,0 +1,150 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from src.cohorts import CODE_COLUMNS, cohort_codes
+
+AGG_TABLE = "daily_funnel_agg"
+
+AGG_KEYS = ['application_date', 'experiment_group'] + list(CODE_COLUMNS.values())
+
+# Final funnel stage -> count column
+STAGE_COLUMNS = {
+    'Application Started': 'stage_application_started',
+    'Documents Uploaded': 'stage_documents_uploaded',
+    'Underwriting Review': 'stage_underwriting_review',
+    'Approved': 'stage_approved',
+    'Funded': 'stage_funded',
+}
+
+AGG_MEASURES = (
+    ['applications']
+    + list(STAGE_COLUMNS.values())
+    + ['approvals', 'rejections', 'undecided', 'fundings', 'defaults',
+       'approval_delay_sum', 'approval_delay_count',
+       'funding_delay_sum', 'funding_delay_count',
+       'loan_amount_sum', 'funded_amount_sum']
+)
+
+REAL_MEASURES = ['funded_amount_sum']
+
+RAW_COLUMNS = ['application_date', 'experiment_group', 'age', 'dti_ratio', 'credit_score', 'income',
+               'loan_amount', 'employment_status', 'funnel_stage', 'decision_outcome', 'funding_status',
+               'defaulted', 'approved_date', 'funded_date', 'funded_amount']
+
+
+def application_delays(df):
+    """Days from application to approval and from approval to funding (NaN where not reached)"""
+    application_date = pd.to_datetime(df['application_date'])
+    approved_date = pd.to_datetime(df['approved_date'])
+    funded_date = pd.to_datetime(df['funded_date'])
+    approved = (df['decision_outcome'] == 'Approved').to_numpy()
+    approval_delay = (approved_date - application_date).dt.days.where(approved)
+    funding_delay = (funded_date - approved_date).dt.days.where(approved)
+    return approval_delay, funding_delay
+
+
+def aggregate_applications(df):
+    """Collapse raw application rows into daily_funnel_agg rows"""
+    application_date = pd.to_datetime(df['application_date'])
+    approved = (df['decision_outcome'] == 'Approved').to_numpy()
+    approval_delay, funding_delay = application_delays(df)
+
+    rows = pd.DataFrame({
+        'application_date': application_date.dt.strftime('%Y-%m-%d'),
+        'experiment_group': df['experiment_group'].astype(str),
+    }, index=df.index)
+    rows = rows.join(cohort_codes(df))
+
+    rows['applications'] = 1
+    for stage, column in STAGE_COLUMNS.items():
+        rows[column] = (df['funnel_stage'] == stage).astype(np.int64)
+    rows['approvals'] = approved.astype(np.int64)
+    rows['rejections'] = (df['decision_outcome'] == 'Rejected').astype(np.int64)
+    rows['undecided'] = df['decision_outcome'].isna().astype(np.int64)
+    rows['fundings'] = (df['funding_status'] == 'Funded').astype(np.int64)
+    rows['defaults'] = (pd.to_numeric(df['defaulted']) == 1).astype(np.int64)
+    rows['approval_delay_sum'] = approval_delay.fillna(0).astype(np.int64)
+    rows['approval_delay_count'] = approval_delay.notna().astype(np.int64)
+    rows['funding_delay_sum'] = funding_delay.fillna(0).astype(np.int64)
+    rows['funding_delay_count'] = funding_delay.notna().astype(np.int64)
+    rows['loan_amount_sum'] = pd.to_numeric(df['loan_amount']).astype(np.int64)
+    rows['funded_amount_sum'] = pd.to_numeric(df['funded_amount']).fillna(0)
+
+    return rows.groupby(AGG_KEYS, sort=False)[AGG_MEASURES].sum().reset_index()
+
+
+def create_daily_agg_table(conn):
+    key_columns = ",\n        ".join(
+        ['application_date TEXT NOT NULL', 'experiment_group TEXT NOT NULL']
+        + [f"{column} INTEGER NOT NULL" for column in CODE_COLUMNS.values()]
+    )
+    measure_columns = ",\n        ".join(
+        f"{column} {'REAL' if column in REAL_MEASURES else 'INTEGER'} NOT NULL DEFAULT 0" for column in AGG_MEASURES
+    )
+    conn.execute(f"""
+    Create Table If Not Exists {AGG_TABLE} (
+        {key_columns},
+        {measure_columns},
+        Primary Key ({', '.join(AGG_KEYS)})
+    )
+    """)
+
+
+def upsert_daily_agg(conn, agg_df):
+    """Add aggregated counts into daily_funnel_agg, creating missing key rows"""
+    if agg_df.empty:
+        return
+    columns = AGG_KEYS + AGG_MEASURES
+    updates = ", ".join(f"{column} = {column} + excluded.{column}" for column in AGG_MEASURES)
+    query = f"""
+    Insert Into {AGG_TABLE} ({', '.join(columns)})
+    Values ({', '.join('?' for _ in columns)})
+    On Conflict ({', '.join(AGG_KEYS)}) Do Update Set {updates}
+    """
+    records = agg_df[columns].astype(object).itertuples(index=False, name=None)
+    conn.executemany(query, records)
+
+
+def build_daily_agg(db_path="data/loan_funnel.db", chunksize=500000):
+    """Rebuild daily_funnel_agg from loan_applications in bounded-memory chunks"""
+    conn = sqlite3.connect(db_path)
+    conn.execute(f"Drop Table If Exists {AGG_TABLE}")
+    create_daily_agg_table(conn)
+    for chunk in pd.read_sql(f"Select {', '.join(RAW_COLUMNS)} From loan_applications", conn, chunksize=chunksize):
+        upsert_daily_agg(conn, aggregate_applications(chunk))
+    conn.commit()
+    n_rows = conn.execute(f"Select count(*) From {AGG_TABLE}").fetchone()[0]
+    conn.close()
+    print(f"✅ Built {AGG_TABLE} with {n_rows:,} rows")
+
+
+def update_daily_agg(conn, new_rows):
+    """Fold newly ingested application rows into daily_funnel_agg (caller commits)"""
+    create_daily_agg_table(conn)
+    upsert_daily_agg(conn, aggregate_applications(new_rows))
+
+
+def ensure_daily_agg(db_path="data/loan_funnel.db"):
+    """Build daily_funnel_agg for databases loaded before the table existed"""
+    conn = sqlite3.connect(db_path)
+    exists = conn.execute(
+        "Select 1 From sqlite_master Where type = 'table' And name = ?", (AGG_TABLE,)
+    ).fetchone() is not None
+    conn.close()
+    if not exists:
+        build_daily_agg(db_path)
+
+
+def last_complete_date(db_path="data/loan_funnel.db"):
+    """Day before the newest application_date in daily_funnel_agg; the newest day may still be filling up"""
+    ensure_daily_agg(db_path)
+    conn = sqlite3.connect(db_path)
+    try:
+        newest = conn.execute(f"Select max(application_date) From {AGG_TABLE}").fetchone()[0]
+    finally:
+        conn.close()
+    if newest is None:
+        return None
+    return (pd.Timestamp(newest) - pd.Timedelta(days=1)).strftime('%Y-%m-%d')
@@ -0,0 +1,168 @@
+import json
+import os
+import shutil
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+
+from src.compute_metrics import get_data_version
+
+CACHE_DIR = "data/cache"
+# The version just replaced stays on disk for processes still memory-mapping it
+CACHE_KEEP_VERSIONS = 2
+
+FUNNEL_ORDER = ["Application Started", "Documents Uploaded", "Underwriting Review", "Approved", "Funded"]
+
+# Storage dtype of every loan application column
+COLUMN_DTYPES = {
+    'applicant_id': 'str',
+    'application_date': 'date',
+    'credit_score': np.int16,
+    'income': np.int32,
+    'age': np.int8,
+    'employment_status': 'category',
+    'loan_amount': np.int32,
+    'dti_ratio': np.float32,
+    'experiment_group': 'category',
+    'funnel_stage': 'category',
+    'decision_outcome': 'category',
+    'funding_status': 'category',
+    'defaulted': np.int8,
+    'approved_date': 'date',
+    'funded_date': 'date',
+    'funded_amount': np.float32,
+}
+
+# Fixed category order where one is meaningful
+CATEGORY_ORDER = {
+    'funnel_stage': FUNNEL_ORDER,
+}
+
+
+def _typed_column(series, dtype, name):
+    if dtype == 'date':
+        return pd.to_datetime(series).to_numpy().astype('datetime64[s]')
+    if dtype == 'str':
+        return series.astype(str).to_numpy().astype(str)
+    if dtype == 'category':
+        categorical = pd.Categorical(series, categories=CATEGORY_ORDER.get(name), ordered=name in CATEGORY_ORDER)
+        return categorical
+    return pd.to_numeric(series).to_numpy().astype(dtype)
+
+
+def typed_loan_frame(df):
+    """Cast raw loan application columns to their storage dtypes"""
+    return pd.DataFrame({
+        name: _typed_column(df[name], dtype, name)
+        for name, dtype in COLUMN_DTYPES.items() if name in df.columns
+    })
+
+
+def build_column_cache(db_path="data/loan_funnel.db", cache_dir=CACHE_DIR):
+    """Write one memory-mappable .npy file per column for the current data version"""
+    version = get_data_version(db_path)
+    final_dir = os.path.join(cache_dir, version)
+    if os.path.isdir(final_dir):
+        return final_dir
+
+    conn = sqlite3.connect(db_path)
+    df = pd.read_sql("Select * From loan_applications", conn)
+    conn.close()
+
+    tmp_dir = f"{final_dir}.tmp-{os.getpid()}-{threading.get_ident()}"
+    os.makedirs(tmp_dir, exist_ok=True)
+    for name, dtype in COLUMN_DTYPES.items():
+        if name not in df.columns:
+            continue
+        values = _typed_column(df[name], dtype, name)
+        if dtype == 'category':
+            np.save(os.path.join(tmp_dir, f"{name}.codes.npy"), values.codes)
+            with open(os.path.join(tmp_dir, f"{name}.categories.json"), "w", encoding="utf-8") as f:
+                json.dump({'categories': list(values.categories), 'ordered': bool(values.ordered)}, f)
+        else:
+            np.save(os.path.join(tmp_dir, f"{name}.npy"), values)
+
+    try:
+        os.replace(tmp_dir, final_dir)
+    except OSError:
+        # Another process published the same version first
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    prune_column_cache(cache_dir, keep=CACHE_KEEP_VERSIONS)
+
+    print(f"✅ Column cache built at {final_dir}")
+    return final_dir
+
+
+def prune_column_cache(cache_dir=CACHE_DIR, keep=CACHE_KEEP_VERSIONS):
+    """Remove cached versions older than the newest `keep`"""
+    versions = [
+        os.path.join(cache_dir, name) for name in os.listdir(cache_dir)
+        if os.path.isdir(os.path.join(cache_dir, name)) and '.tmp-' not in name
+    ]
+    versions.sort(key=os.path.getmtime, reverse=True)
+    for path in versions[keep:]:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def _read_cached_column(version_dir, name):
+    codes_path = os.path.join(version_dir, f"{name}.codes.npy")
+    if os.path.exists(codes_path):
+        with open(os.path.join(version_dir, f"{name}.categories.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        codes = np.load(codes_path, mmap_mode='r')
+        dtype = pd.CategoricalDtype(meta['categories'], ordered=meta['ordered'])
+        return pd.Series(pd.Categorical.from_codes(codes, dtype=dtype), name=name)
+
+    values = np.load(os.path.join(version_dir, f"{name}.npy"), mmap_mode='r')
+    return pd.Series(values, name=name)
+
+
+# One typed copy of each column per data version, shared by every page and session
+_column_cache = {}
+_cache_lock = threading.Lock()
+
+
+def load_loan_data(columns=None, db_path="data/loan_funnel.db", cache_dir=CACHE_DIR,
+                   start_month=None, end_month=None, parquet_root="data/parquet"):
+    """Typed loan application data with only the requested columns
+
+    A month range ('YYYY-MM', inclusive) is served from the Parquet store when
+    it exists, so only the matching partitions are read.
+    """
+    if columns is None:
+        columns = list(COLUMN_DTYPES)
+
+    if start_month is not None or end_month is not None:
+        from src.columnar_store import columnar_store_exists, read_columnar_store
+
+        if columnar_store_exists(parquet_root, get_data_version(db_path)):
+            return read_columnar_store(columns, start_month, end_month, parquet_root)
+        month = load_loan_data(['application_date'], db_path, cache_dir)['application_date'].dt.strftime('%Y-%m')
+        in_range = pd.Series(True, index=month.index)
+        if start_month is not None:
+            in_range &= month >= start_month
+        if end_month is not None:
+            in_range &= month <= end_month
+        return load_loan_data(columns, db_path, cache_dir)[in_range.to_numpy()].reset_index(drop=True)
+
+    version = get_data_version(db_path)
+    with _cache_lock:
+        missing = [name for name in columns if (db_path, version, name) not in _column_cache]
+        if missing:
+            version_dir = build_column_cache(db_path, cache_dir)
+            for key in [key for key in _column_cache if key[0] == db_path and key[1] != version]:
+                del _column_cache[key]
+            for name in missing:
+                _column_cache[(db_path, version, name)] = _read_cached_column(version_dir, name)
+        series = {name: _column_cache[(db_path, version, name)] for name in columns}
+
+    return pd.DataFrame(series)
+
+
+if __name__ == "__main__":
+    df = load_loan_data()
+    print(df.dtypes)
+    print(f"Memory usage: {df.memory_usage(deep=True).sum() / 1e6:.2f} MB")
@@ -1,6 +1,25 @@
 import pandas as pd
 import numpy as np
 
+# Columns the economic impact analysis reads
+ECONOMIC_COLUMNS = ['age', 'dti_ratio', 'credit_score', 'funnel_stage', 'loan_amount', 'funded_amount']
+
+# Stages where an application is lost before funding
+LOST_STAGES = ['Application Started', 'Documents Uploaded', 'Underwriting Review', 'Approved']
+IMPROVEMENT_SHARE = 0.2  # Share of lost revenue assumed recoverable
+COST_PER_APPLICATION = 50  # Example cost
+# Assume different improvement rates for different stages
+STAGE_IMPROVEMENTS = {
+    'application_started': 0.1,  # 10% improvement possible
+    'documents_uploaded': 0.15,   # 15% improvement possible
+    'underwriting_review': 0.2,   # 20% improvement possible
+    'approved': 0.25              # 25% improvement possible
+}
+
+def stage_key(stage):
+    """Snake-case key of a funnel stage, as used in the per-stage column names"""
+    return stage.lower().replace(' ', '_')
+
 def prepare_data(df):
     """Prepare data by creating cohort groups"""
     # Create cohort groups
@@ -26,16 +45,8 @@ def prepare_data(df):
 
 def calculate_conversion_improvement(row):
     """Calculate the value of improving conversion rates"""
-    # Assume different improvement rates for different stages
-    improvements = {
-        'application_started': 0.1,  # 10% improvement possible
-        'documents_uploaded': 0.15,   # 15% improvement possible
-        'underwriting_review': 0.2,   # 20% improvement possible
-        'approved': 0.25              # 25% improvement possible
-    }
-    
     total_value = 0
-    for stage, improvement in improvements.items():
+    for stage, improvement in STAGE_IMPROVEMENTS.items():
         lost_key = f'lost_at_{stage}'
         if lost_key in row:
             total_value += row[lost_key] * improvement * 0.05  # 5% profit margin
@@ -67,30 +78,29 @@ def calculate_economic_impact(df, profit_margin=0.05):
         }
         
         # Calculate losses at each stage
-        stages = ['Application Started', 'Documents Uploaded', 'Underwriting Review', 'Approved']
+        stages = LOST_STAGES
         
         for stage in stages:
             stage_data = group[group['funnel_stage'] == stage]
             if not stage_data.empty:
                 lost_amount = stage_data['total_loan_amount'].iloc[0]
                 lost_revenue = lost_amount * profit_margin
-                cohort_data[f'lost_at_{stage.lower().replace(" ", "_")}'] = lost_amount
-                cohort_data[f'lost_revenue_{stage.lower().replace(" ", "_")}'] = lost_revenue
+                cohort_data[f'lost_at_{stage_key(stage)}'] = lost_amount
+                cohort_data[f'lost_revenue_{stage_key(stage)}'] = lost_revenue
             else:
-                cohort_data[f'lost_at_{stage.lower().replace(" ", "_")}'] = 0
-                cohort_data[f'lost_revenue_{stage.lower().replace(" ", "_")}'] = 0
+                cohort_data[f'lost_at_{stage_key(stage)}'] = 0
+                cohort_data[f'lost_revenue_{stage_key(stage)}'] = 0
         
         # Calculate total losses and potential improvements
-        total_lost = sum(cohort_data[f'lost_at_{stage.lower().replace(" ", "_")}'] 
+        total_lost = sum(cohort_data[f'lost_at_{stage_key(stage)}'] 
                         for stage in stages)
         total_lost_revenue = total_lost * profit_margin
         
         cohort_data['total_lost_revenue'] = total_lost_revenue
-        cohort_data['improvement_potential'] = total_lost_revenue * 0.2  # Assume 20% improvement possible
+        cohort_data['improvement_potential'] = total_lost_revenue * IMPROVEMENT_SHARE
         
         # Calculate ROI (potential gain / cost)
-        cost_per_application = 50  # Example cost
-        total_cost = cohort_data['total_applications'] * cost_per_application
+        total_cost = cohort_data['total_applications'] * COST_PER_APPLICATION
         cohort_data['roi_ratio'] = cohort_data['improvement_potential'] / total_cost if total_cost > 0 else 0
         
         # Priority score (combines potential value and volume)
@@ -106,7 +116,8 @@ def calculate_economic_impact(df, profit_margin=0.05):
         lambda row: calculate_conversion_improvement(row), axis=1
     )
     
-    return impact_df.sort_values('priority_score', ascending=False)
+    # Unordered: callers rank with get_priority_cohorts, which selects the top N without a full sort
+    return impact_df
 
 def run_economic_impact_analysis(df):
     """Main function to run economic impact analysis"""
@@ -119,9 +130,19 @@ def run_economic_impact_analysis(df):
     # Return results
     return economic_impact_df
 
-def get_priority_cohorts(impact_df, top_n=10):
-    """Get top N priority cohorts"""
-    return impact_df.head(top_n).copy()
+def get_priority_cohorts(impact_df, top_n=10, by='priority_score'):
+    """Get top N priority cohorts, selecting them without sorting the whole frame"""
+    return top_k_rows(impact_df, top_n, by).copy()
+
+def top_k_rows(df, k, by='priority_score'):
+    """Rows with the k largest values of a column, in descending order (partial selection)"""
+    values = df[by].to_numpy()
+    if k >= len(values):
+        order = np.argsort(-values, kind='stable')
+    else:
+        candidates = np.argpartition(-values, k - 1)[:k]
+        order = candidates[np.argsort(-values[candidates], kind='stable')]
+    return df.iloc[order]
 
 def create_cohort_labels(impact_df):
     """Create readable cohort labels"""
@@ -0,0 +1,141 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from src.economic_impact import COST_PER_APPLICATION, IMPROVEMENT_SHARE, LOST_STAGES, prepare_data
+
+COHORT_COLUMNS = ['age_group', 'dti_group', 'credit_group']
+STAGES = LOST_STAGES + ['Funded']
+
+N_DRAWS = 2000
+# Dirichlet prior count added to every stage (Jeffreys)
+STAGE_PRIOR = 0.5
+QUANTILES = (0.05, 0.5, 0.95)
+# Cohorts per worker task when the grid is split across processes
+COHORTS_PER_TASK = 2000
+
+
+def cohort_stage_stats(df, cohort_columns=COHORT_COLUMNS):
+    """Cohort keys plus (cohorts x stages) counts, loan amount means and standard deviations"""
+    stats = df.groupby(cohort_columns + ['funnel_stage'], observed=True)['loan_amount'].agg(['count', 'mean', 'std'])
+    wide = stats.unstack('funnel_stage')
+    counts = wide['count'].reindex(columns=STAGES).fillna(0).to_numpy(dtype=np.int64)
+
+    # Stages a cohort never reached borrow the cohort's overall loan amount distribution
+    cohort_amounts = df.groupby(cohort_columns, observed=True)['loan_amount'].agg(['mean', 'std']).reindex(wide.index)
+    means = wide['mean'].reindex(columns=STAGES).to_numpy(dtype=float)
+    sds = wide['std'].reindex(columns=STAGES).to_numpy(dtype=float)
+    means = np.where(np.isnan(means), cohort_amounts['mean'].to_numpy()[:, None], means)
+    sds = np.where(np.isnan(sds), cohort_amounts['std'].fillna(0).to_numpy()[:, None], sds)
+    return wide.index.to_frame(index=False), counts, means, sds
+
+
+def simulate_cohort_impact(counts, means, sds, draws=N_DRAWS, profit_margin=0.05, seed=42):
+    """Draws of lost revenue, improvement potential, ROI and priority score, shape (draws x cohorts)
+
+    Stage shares come from each cohort's Dirichlet posterior and stage counts
+    from a multinomial of the cohort's size; each stage's mean loan amount is
+    drawn from its sampling distribution. Small cohorts get wide spreads.
+    """
+    rng = np.random.default_rng(seed)
+    applications = counts.sum(axis=1)
+
+    shares = rng.standard_gamma(counts + STAGE_PRIOR, size=(draws,) + counts.shape)
+    shares /= shares.sum(axis=2, keepdims=True)
+    stage_counts = rng.multinomial(applications, shares)
+
+    amount_se = sds / np.sqrt(np.maximum(counts, 1))
+    stage_amounts = np.maximum(means + amount_se * rng.standard_normal((draws,) + counts.shape), 0)
+
+    lost = len(LOST_STAGES)
+    lost_revenue = (stage_counts[:, :, :lost] * stage_amounts[:, :, :lost]).sum(axis=2) * profit_margin
+    improvement = lost_revenue * IMPROVEMENT_SHARE
+    with np.errstate(divide='ignore', invalid='ignore'):
+        roi = np.where(applications > 0, improvement / (applications * COST_PER_APPLICATION), 0)
+    priority = improvement * applications / 1000
+    return {'total_lost_revenue': lost_revenue, 'improvement_potential': improvement,
+            'roi_ratio': roi, 'priority_score': priority}
+
+
+def _summarize(counts, means, sds, draws, profit_margin, seed, top_n, offset):
+    """Quantile bands of one cohort slice, plus each draw's top-N priority candidates for cross-cohort ranking
+
+    Only the slice's N largest priorities per draw (and their cohort rows,
+    offset into the full grid) leave the worker, so the parent never holds a
+    draws x cohorts matrix.
+    """
+    samples = simulate_cohort_impact(counts, means, sds, draws, profit_margin, seed)
+    summary = {}
+    for name, values in samples.items():
+        bands = np.quantile(values, QUANTILES, axis=0)
+        for q, band in zip(QUANTILES, bands):
+            summary[f"{name}_p{int(q * 100)}"] = band
+
+    priority = samples['priority_score']
+    k = min(top_n, priority.shape[1])
+    top = np.argpartition(priority, -k, axis=1)[:, -k:]
+    return summary, np.take_along_axis(priority, top, axis=1).astype(np.float32), (top + offset).astype(np.int64)
+
+
+def economic_uncertainty(df, cohort_columns=COHORT_COLUMNS, draws=N_DRAWS, profit_margin=0.05, top_n=10,
+                         seed=42, workers=1):
+    """Monte Carlo bands of each cohort's economic impact and its chance of ranking in the top N
+
+    The cohort grid is split into slices simulated in parallel processes when
+    `workers` > 1; every slice draws all its cohorts at once.
+    """
+    start = time.perf_counter()
+    keys, counts, means, sds = cohort_stage_stats(prepare_data(df.copy()), cohort_columns)
+    top_n = min(top_n, len(keys))
+    n_slices = max(workers, int(np.ceil(len(keys) / COHORTS_PER_TASK)))
+    slices = np.array_split(np.arange(len(keys)), n_slices)
+    slices = [rows for rows in slices if len(rows)]
+    seeds = np.random.SeedSequence(seed).spawn(len(slices))
+    tasks = [(counts[rows], means[rows], sds[rows], draws, profit_margin, task_seed, top_n, rows[0])
+             for rows, task_seed in zip(slices, seeds)]
+
+    if workers > 1 and len(tasks) > 1:
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            parts = list(pool.map(_summarize, *zip(*tasks)))
+    else:
+        parts = [_summarize(*task) for task in tasks]
+
+    bands = pd.concat([pd.DataFrame(summary) for summary, _, _ in parts], ignore_index=True)
+
+    # Every draw's global top N is among the slices' top-N candidates; a cohort is
+    # in the top N of a draw when its priority reaches that draw's N-th largest
+    values = np.concatenate([part[1] for part in parts], axis=1)
+    rows = np.concatenate([part[2] for part in parts], axis=1)
+    kth = np.partition(values, -top_n, axis=1)[:, -top_n]
+    hits = rows[values >= kth[:, None]]
+    bands[f"prob_top_{top_n}"] = np.bincount(hits, minlength=len(keys)) / draws
+
+    result = pd.concat([keys, bands], axis=1)
+    result['total_applications'] = counts.sum(axis=1)
+    print(f"🔹 Economic impact Monte Carlo: {draws:,} draws x {len(keys):,} cohorts in {time.perf_counter() - start:.2f}s")
+    return result.sort_values('priority_score_p50', ascending=False).reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from src.dataset import load_loan_data
+    from src.economic_impact import ECONOMIC_COLUMNS
+
+    parser = argparse.ArgumentParser(description="Monte Carlo uncertainty bands for cohort economic impact")
+    parser.add_argument("--db-path", default="data/loan_funnel.db")
+    parser.add_argument("--draws", type=int, default=N_DRAWS)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    pd.set_option('display.width', 200)
+    bands = economic_uncertainty(load_loan_data(ECONOMIC_COLUMNS, args.db_path), draws=args.draws,
+                                 top_n=args.top, workers=args.workers)
+    columns = COHORT_COLUMNS + ['total_applications', 'total_lost_revenue_p5', 'total_lost_revenue_p50',
+                                'total_lost_revenue_p95', 'priority_score_p50', f"prob_top_{args.top}"]
+    print(bands[columns].head(args.top * 2).round(2).to_string(index=False))
@@ -0,0 +1,212 @@
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from src.daily_agg import STAGE_COLUMNS
+
+EVENT_TABLE = "funnel_events"
+EVENT_COLUMNS = ['applicant_id', 'stage', 'event_time']
+EVENT_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+FUNNEL_STAGES = list(STAGE_COLUMNS)
+
+
+def _stage_index(df):
+    return pd.Categorical(df['funnel_stage'], categories=FUNNEL_STAGES).codes
+
+
+def _event_frame(applicant_ids, stage, times):
+    return pd.DataFrame({
+        'applicant_id': applicant_ids,
+        'stage': stage,
+        'event_time': pd.Series(times).dt.strftime(EVENT_TIME_FORMAT).to_numpy(),
+    })
+
+
+def _sorted_events(frames):
+    events = pd.concat(frames, ignore_index=True)
+    return events.sort_values(['event_time', 'applicant_id'], kind='stable').reset_index(drop=True)
+
+
+def generate_event_log(df, seed=42):
+    """Stage-transition events (applicant_id, stage, event_time) for generated applications
+
+    Every stage an applicant reached gets one event. Approval and funding events
+    fall on approved_date / funded_date where the application has them; the
+    other timestamps are drawn with their own generator so the application
+    columns are unaffected.
+    """
+    rng = np.random.default_rng(seed)
+    n = len(df)
+    reached = _stage_index(df)
+    ids = df['applicant_id'].to_numpy()
+
+    start = pd.to_datetime(df['application_date']).to_numpy() + pd.to_timedelta(
+        rng.uniform(8, 22, n), unit='h').to_numpy()
+    approved = pd.to_datetime(df['approved_date']).to_numpy()
+    funded = pd.to_datetime(df['funded_date']).to_numpy()
+
+    # Decision time: the recorded approval date, else a 1-10 day review
+    decision = start + pd.to_timedelta(rng.uniform(1, 10, n), unit='D').to_numpy()
+    has_approval = ~pd.isna(approved)
+    decision[has_approval] = approved[has_approval] + pd.to_timedelta(
+        rng.uniform(9, 18, has_approval.sum()), unit='h').to_numpy()
+    decision = np.maximum(decision, start + np.timedelta64(2, 'h'))
+
+    # Pre-decision stages land between start and decision; dropouts have no decision to bound them
+    span = decision - start
+    documents = start + (span * rng.uniform(0.1, 0.5, n)).astype('timedelta64[s]')
+    review = documents + ((decision - documents) * rng.uniform(0.2, 0.8, n)).astype('timedelta64[s]')
+    dropped = reached < FUNNEL_STAGES.index('Underwriting Review')
+    documents[dropped] = start[dropped] + pd.to_timedelta(
+        rng.exponential(18, dropped.sum()), unit='h').to_numpy()
+
+    funded_time = funded.copy()
+    has_funding = ~pd.isna(funded)
+    funded_time[has_funding] = funded[has_funding] + pd.to_timedelta(
+        rng.uniform(9, 18, has_funding.sum()), unit='h').to_numpy()
+
+    stage_times = [start, documents, review, decision, funded_time]
+    frames = []
+    for code, (stage, times) in enumerate(zip(FUNNEL_STAGES, stage_times)):
+        mask = reached >= code
+        frames.append(_event_frame(ids[mask], stage, times[mask]))
+    return _sorted_events(frames)
+
+
+def events_from_applications(df):
+    """Derive the event log from final-stage application rows (for data without one)
+
+    Stages before the decision have no recorded timestamp and are placed at the
+    application date, so their time-in-stage reads as zero.
+    """
+    reached = _stage_index(df)
+    ids = df['applicant_id'].to_numpy()
+    application = pd.to_datetime(df['application_date'])
+    approved = pd.to_datetime(df['approved_date']).fillna(application)
+    funded = pd.to_datetime(df['funded_date']).fillna(approved)
+
+    stage_times = [application, application, application, approved, funded]
+    frames = []
+    for code, (stage, times) in enumerate(zip(FUNNEL_STAGES, stage_times)):
+        mask = reached >= code
+        frames.append(_event_frame(ids[mask], stage, times.to_numpy()[mask]))
+    return _sorted_events(frames)
+
+
+def create_event_table(conn):
+    conn.execute(f"""
+    Create Table If Not Exists {EVENT_TABLE} (
+        applicant_id TEXT NOT NULL,
+        stage TEXT NOT NULL,
+        event_time TEXT NOT NULL
+    )
+    """)
+    # Serves the (applicant, time) ordered scan of the funnel builder
+    conn.execute(f"Create Index If Not Exists idx_{EVENT_TABLE}_applicant On {EVENT_TABLE} (applicant_id, event_time)")
+    conn.execute(f"Create Index If Not Exists idx_{EVENT_TABLE}_time On {EVENT_TABLE} (event_time)")
+
+
+def write_events(conn, events, replace=False):
+    """Store stage-transition events; replace=True drops the existing log first (caller commits)"""
+    if replace:
+        conn.execute(f"Drop Table If Exists {EVENT_TABLE}")
+    create_event_table(conn)
+    events[EVENT_COLUMNS].to_sql(EVENT_TABLE, conn, if_exists='append', index=False, chunksize=100000)
+
+
+def ensure_event_log(db_path="data/loan_funnel.db", events_csv_path="data/loan_funnel_events.csv"):
+    """Create funnel_events for databases loaded without an event log
+
+    The generator's event CSV is used when it exists; applicants it does not
+    cover get events derived from their final stage.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        exists = conn.execute(
+            "Select 1 From sqlite_master Where type = 'table' And name = ?", (EVENT_TABLE,)
+        ).fetchone() is not None
+        if not exists:
+            df = pd.read_sql("""
+                Select applicant_id, application_date, funnel_stage, approved_date, funded_date
+                From loan_applications
+            """, conn)
+            if events_csv_path is not None and os.path.exists(events_csv_path):
+                logged = pd.read_csv(events_csv_path)
+                logged = logged[logged['applicant_id'].isin(df['applicant_id'])]
+                missing = df[~df['applicant_id'].isin(logged['applicant_id'])]
+                events = _sorted_events([logged[EVENT_COLUMNS], events_from_applications(missing)])
+                source = f"{events_csv_path} ({len(missing):,} applicants derived)"
+            else:
+                events = events_from_applications(df)
+                source = "loan_applications"
+            write_events(conn, events, replace=True)
+            conn.commit()
+            print(f"✅ Loaded {EVENT_TABLE} from {source}")
+    finally:
+        conn.close()
+
+
+def build_funnel_from_events(db_path="data/loan_funnel.db", chunksize=1000000):
+    """Stage passage, conversion and time-in-stage from the event log in one ordered pass
+
+    Events are streamed in (applicant_id, event_time) order a chunk at a time;
+    the last applicant of each chunk is carried into the next so no transition
+    is split, and only per-stage totals are kept between chunks.
+    """
+    ensure_event_log(db_path)
+    n_stages = len(FUNNEL_STAGES)
+    passing = np.zeros(n_stages, dtype=np.int64)
+    dwell_seconds = np.zeros(n_stages)
+    dwell_count = np.zeros(n_stages, dtype=np.int64)
+
+    def consume(events):
+        codes = pd.Categorical(events['stage'], categories=FUNNEL_STAGES).codes
+        seconds = pd.to_datetime(events['event_time'], format=EVENT_TIME_FORMAT).to_numpy().astype('datetime64[s]').astype(np.int64)
+        ids = events['applicant_id'].to_numpy()
+
+        valid = codes >= 0
+        passing[:] += np.bincount(codes[valid], minlength=n_stages)
+
+        # Dwell time in a stage is the gap to the same applicant's next event
+        advanced = (ids[:-1] == ids[1:]) & valid[:-1]
+        gaps = (seconds[1:] - seconds[:-1])[advanced]
+        dwell_seconds[:] += np.bincount(codes[:-1][advanced], weights=gaps, minlength=n_stages)
+        dwell_count[:] += np.bincount(codes[:-1][advanced], minlength=n_stages)
+
+    conn = sqlite3.connect(db_path)
+    try:
+        carry = None
+        query = f"Select {', '.join(EVENT_COLUMNS)} From {EVENT_TABLE} Order By applicant_id, event_time"
+        for chunk in pd.read_sql(query, conn, chunksize=chunksize):
+            if carry is not None:
+                chunk = pd.concat([carry, chunk], ignore_index=True)
+            last = chunk['applicant_id'].iat[-1]
+            tail = (chunk['applicant_id'] == last).to_numpy()
+            carry = chunk[tail]
+            consume(chunk[~tail])
+        if carry is not None:
+            consume(carry)
+    finally:
+        conn.close()
+
+    previous = np.concatenate([[np.nan], passing[:-1]])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        conversion = np.round(passing / previous * 100, 2)
+        hours = np.round(dwell_seconds / dwell_count / 3600, 1)
+
+    df = pd.DataFrame({
+        'funnel_stage': FUNNEL_STAGES,
+        'Applicants_passing': passing,
+        'Conversion Rate (%)': conversion,
+        'Avg Hours in Stage': hours,
+    })
+    print("🔹 Funnel from Event Log:")
+    print(df)
+    return df
+
+
+if __name__ == "__main__":
+    build_funnel_from_events()
@@ -0,0 +1,142 @@
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+from statsmodels.stats.multitest import multipletests
+
+from src.cohorts import CODE_COLUMNS, code_labels
+from src.daily_agg import ensure_daily_agg
+from src.sql_backend import read_sql
+
+# metric -> (successes, trials) over daily_funnel_agg measures. Funding is conditioned on
+# approval here, unlike the alerting funding_rate (fundings over decided applicants)
+EXPERIMENT_METRICS = {
+    'approval_rate': ('approvals', 'decided'),
+    'funded_given_approved': ('fundings', 'approvals'),
+    'default_rate': ('defaults', 'fundings'),
+    'pull_through_rate': ('fundings', 'applications'),
+}
+
+# Segment dimension -> cohort code column ('all' is the whole experiment)
+EXPERIMENT_SEGMENTS = {'all': None, **CODE_COLUMNS}
+
+MEASURES = ['applications', 'decided', 'approvals', 'fundings', 'defaults']
+
+
+def load_arm_counts(db_path="data/loan_funnel.db"):
+    """Measures per experiment arm and cohort cell, from one aggregate query"""
+    ensure_daily_agg(db_path)
+    codes = ', '.join(CODE_COLUMNS.values())
+    return read_sql(f"""
+    Select experiment_group, {codes},
+        Sum(applications) as applications,
+        Sum(stage_underwriting_review + stage_approved + stage_funded) as decided,
+        Sum(approvals) as approvals,
+        Sum(fundings) as fundings,
+        Sum(defaults) as defaults
+    From daily_funnel_agg
+    Group By experiment_group, {codes}
+    """, db_path)
+
+
+def segment_arm_counts(cells, segments=EXPERIMENT_SEGMENTS):
+    """Long frame of (dimension, segment, experiment_group) measure totals"""
+    frames = []
+    for dimension, column in segments.items():
+        keys = ['experiment_group'] if column is None else [column, 'experiment_group']
+        totals = cells.groupby(keys)[MEASURES].sum().reset_index()
+        if column is None:
+            totals['segment'] = 'All'
+        else:
+            totals['segment'] = np.asarray(code_labels(dimension, totals[column]))
+        totals['dimension'] = dimension
+        frames.append(totals[['dimension', 'segment', 'experiment_group'] + MEASURES])
+    return pd.concat(frames, ignore_index=True)
+
+
+def two_proportion_tests(successes_c, trials_c, successes_t, trials_t, alpha=0.05):
+    """Pooled two-proportion z-test, Wald CI of the difference and relative lift, element-wise"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rate_c = successes_c / trials_c
+        rate_t = successes_t / trials_t
+        pooled = (successes_c + successes_t) / (trials_c + trials_t)
+        se_pooled = np.sqrt(pooled * (1 - pooled) * (1 / trials_c + 1 / trials_t))
+        z = (rate_t - rate_c) / se_pooled
+        p_value = 2 * norm.sf(np.abs(z))
+
+        diff = rate_t - rate_c
+        se_diff = np.sqrt(rate_c * (1 - rate_c) / trials_c + rate_t * (1 - rate_t) / trials_t)
+        z_crit = norm.ppf(1 - alpha / 2)
+        lift = diff / rate_c
+        # Delta-method interval for the ratio rate_t / rate_c
+        se_log_ratio = np.sqrt((1 - rate_c) / successes_c + (1 - rate_t) / successes_t)
+        ratio = rate_t / rate_c
+        lift_ci_lower = ratio * np.exp(-z_crit * se_log_ratio) - 1
+        lift_ci_upper = ratio * np.exp(z_crit * se_log_ratio) - 1
+
+    return {
+        'control_rate': rate_c,
+        'treatment_rate': rate_t,
+        'difference': diff,
+        'ci_lower': diff - z_crit * se_diff,
+        'ci_upper': diff + z_crit * se_diff,
+        'lift': lift,
+        'lift_ci_lower': lift_ci_lower,
+        'lift_ci_upper': lift_ci_upper,
+        'z_stat': z,
+        'p_value': p_value,
+    }
+
+
+def analyze_experiment(db_path="data/loan_funnel.db", control="A", alpha=0.05, correction="fdr_bh",
+                       min_trials=30, segments=EXPERIMENT_SEGMENTS, metrics=EXPERIMENT_METRICS):
+    """Every metric x segment x treatment-arm comparison against control in one vectorized pass
+
+    p-values are adjusted across all tests with at least `min_trials` per arm
+    (Benjamini-Hochberg by default; any statsmodels multipletests method works).
+    """
+    counts = segment_arm_counts(load_arm_counts(db_path), segments)
+    control_counts = counts[counts['experiment_group'] == control].drop(columns='experiment_group')
+    treatment_counts = counts[counts['experiment_group'] != control].rename(columns={'experiment_group': 'treatment'})
+    paired = treatment_counts.merge(control_counts, on=['dimension', 'segment'], suffixes=('_t', '_c'))
+
+    frames = []
+    for metric, (successes, trials) in metrics.items():
+        tests = two_proportion_tests(
+            paired[f"{successes}_c"].to_numpy(dtype=float), paired[f"{trials}_c"].to_numpy(dtype=float),
+            paired[f"{successes}_t"].to_numpy(dtype=float), paired[f"{trials}_t"].to_numpy(dtype=float),
+            alpha
+        )
+        frame = paired[['dimension', 'segment', 'treatment']].assign(
+            metric=metric,
+            control_trials=paired[f"{trials}_c"].to_numpy(),
+            treatment_trials=paired[f"{trials}_t"].to_numpy(),
+            **tests
+        )
+        frames.append(frame)
+    results = pd.concat(frames, ignore_index=True)
+    results.insert(2, 'control', control)
+
+    testable = ((results['control_trials'] >= min_trials) & (results['treatment_trials'] >= min_trials)
+                & results['p_value'].notna()).to_numpy()
+    results['p_adjusted'] = np.nan
+    results['significant'] = False
+    if testable.any():
+        reject, adjusted, _, _ = multipletests(results.loc[testable, 'p_value'], alpha=alpha, method=correction)
+        results.loc[testable, 'p_adjusted'] = adjusted
+        results.loc[testable, 'significant'] = reject
+
+    print(f"🔹 Experiment Analysis: {int(testable.sum())} tests, {int(results['significant'].sum())} significant after {correction} correction")
+    return results
+
+
+def overall_results(results, treatment="B"):
+    """Whole-experiment row per metric for one treatment arm, indexed by metric"""
+    overall = results[(results['dimension'] == 'all') & (results['treatment'] == treatment)]
+    return overall.set_index('metric')
+
+
+if __name__ == "__main__":
+    pd.set_option('display.width', 200)
+    results = analyze_experiment()
+    columns = ['dimension', 'segment', 'metric', 'control_rate', 'treatment_rate', 'lift', 'p_value', 'p_adjusted']
+    print(results[results['significant']][columns].to_string(index=False))
@@ -0,0 +1,238 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.daily_agg import ensure_daily_agg
+from src.experiment_engine import EXPERIMENT_METRICS, load_arm_counts
+from src.policy_simulator import LOSS_GIVEN_DEFAULT
+from src.risk_adjusted_value import REPAID_LOAN_MARGIN
+from src.sql_backend import read_sql
+
+# Mutually exclusive applicant outcomes, built from the nested aggregate counts
+# (defaults within fundings within approvals within decided within applications)
+OUTCOME_CLASSES = ['not_decided', 'rejected', 'approved_not_funded', 'funded_repaid', 'defaulted']
+# Each measure as a sum of outcome classes
+MEASURE_CLASSES = {
+    'applications': OUTCOME_CLASSES,
+    'decided': ['rejected', 'approved_not_funded', 'funded_repaid', 'defaulted'],
+    'approvals': ['approved_not_funded', 'funded_repaid', 'defaulted'],
+    'fundings': ['funded_repaid', 'defaulted'],
+    'defaults': ['defaulted'],
+}
+# Direction that counts as the treatment doing better
+HIGHER_IS_BETTER = {'approval_rate': True, 'funded_given_approved': True, 'default_rate': False, 'pull_through_rate': True}
+
+# Probability of approving more needed to recommend the treatment, and the most
+# probability of a higher default rate a full rollout may carry
+RECOMMEND_PROBABILITY = 0.95
+MAX_DEFAULT_RISK = 0.5
+
+N_DRAWS = 10000
+BOOTSTRAP_STRATA = ['credit_code', 'dti_code']
+
+
+def outcome_counts(cells):
+    """Split nested measure counts into the exclusive outcome classes"""
+    return pd.DataFrame({
+        'not_decided': cells['applications'] - cells['decided'],
+        'rejected': cells['decided'] - cells['approvals'],
+        'approved_not_funded': cells['approvals'] - cells['fundings'],
+        'funded_repaid': cells['fundings'] - cells['defaults'],
+        'defaulted': cells['defaults'],
+    }, index=cells.index)
+
+
+def _class_matrix():
+    """measures x classes 0/1 matrix turning class counts back into measures"""
+    return np.array([[name in classes for name in OUTCOME_CLASSES] for classes in MEASURE_CLASSES.values()], dtype=float)
+
+
+def posterior_draws(successes, trials, draws=N_DRAWS, prior=(1.0, 1.0), rng=None):
+    """Beta-Binomial posterior samples of each rate, shape (draws,) + successes.shape"""
+    rng = np.random.default_rng(rng)
+    successes = np.asarray(successes, dtype=float)
+    trials = np.asarray(trials, dtype=float)
+    return rng.beta(prior[0] + successes, prior[1] + trials - successes, size=(draws,) + successes.shape)
+
+
+def bayesian_comparison(arm_totals, control="A", treatment="B", metrics=EXPERIMENT_METRICS,
+                        draws=N_DRAWS, prior=(1.0, 1.0), seed=42):
+    """Posterior rates, credible intervals and probability of superiority for every metric at once"""
+    successes = np.array([[arm_totals.at[arm, s] for arm in (control, treatment)] for s, _ in metrics.values()])
+    trials = np.array([[arm_totals.at[arm, n] for arm in (control, treatment)] for _, n in metrics.values()])
+    samples = posterior_draws(successes, trials, draws, prior, seed)  # draws x metrics x arms
+    diff = samples[:, :, 1] - samples[:, :, 0]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        lift = samples[:, :, 1] / samples[:, :, 0] - 1
+
+    better = np.array([HIGHER_IS_BETTER.get(metric, True) for metric in metrics])
+    prob_higher = (diff > 0).mean(axis=0)
+    return pd.DataFrame({
+        'metric': list(metrics),
+        'posterior_control': samples[:, :, 0].mean(axis=0),
+        'posterior_treatment': samples[:, :, 1].mean(axis=0),
+        'diff_mean': diff.mean(axis=0),
+        'credible_lower': np.quantile(diff, 0.025, axis=0),
+        'credible_upper': np.quantile(diff, 0.975, axis=0),
+        'lift_mean': lift.mean(axis=0),
+        'prob_treatment_higher': prob_higher,
+        'prob_superior': np.where(better, prob_higher, 1 - prob_higher),
+    }).set_index('metric')
+
+
+def stratified_bootstrap(cells, control="A", treatment="B", strata=BOOTSTRAP_STRATA, metrics=EXPERIMENT_METRICS,
+                         replicates=N_DRAWS, seed=42, level=0.95):
+    """Percentile CIs of rate differences from multinomial resampling of cohort outcome counts
+
+    Applicants are resampled within each (arm, stratum) cell with the cell size
+    fixed, by drawing outcome-class counts from a multinomial, so the cost
+    depends on the number of cells and replicates, never on applicant rows.
+    """
+    keys = ['experiment_group'] + list(strata)
+    stratum_counts = cells[cells['experiment_group'].isin([control, treatment])].groupby(keys)[list(MEASURE_CLASSES)].sum()
+    classes = outcome_counts(stratum_counts).to_numpy(dtype=np.int64)
+    sizes = classes.sum(axis=1)
+    keep = sizes > 0
+    classes, sizes = classes[keep], sizes[keep]
+    arm = (stratum_counts.index.get_level_values('experiment_group')[keep] == treatment).astype(int)
+
+    rng = np.random.default_rng(seed)
+    resampled = rng.multinomial(sizes, classes / sizes[:, None], size=(replicates, len(sizes)))  # B x cells x classes
+    by_arm = np.stack([resampled[:, arm == a].sum(axis=1) for a in (0, 1)], axis=1)  # B x arms x classes
+    measures = by_arm @ _class_matrix().T  # B x arms x measures
+    measure_index = {name: i for i, name in enumerate(MEASURE_CLASSES)}
+
+    tail = (1 - level) / 2
+    rows = []
+    for metric, (successes, trials) in metrics.items():
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rates = measures[:, :, measure_index[successes]] / measures[:, :, measure_index[trials]]
+            diff = rates[:, 1] - rates[:, 0]
+            lift = rates[:, 1] / rates[:, 0] - 1
+        rows.append({
+            'metric': metric,
+            'bootstrap_lower': np.nanquantile(diff, tail),
+            'bootstrap_upper': np.nanquantile(diff, 1 - tail),
+            'bootstrap_se': np.nanstd(diff),
+            'lift_lower': np.nanquantile(lift, tail),
+            'lift_upper': np.nanquantile(lift, 1 - tail),
+        })
+    return pd.DataFrame(rows).set_index('metric')
+
+
+def experiment_uncertainty(db_path="data/loan_funnel.db", control="A", treatment="B", draws=N_DRAWS,
+                           strata=BOOTSTRAP_STRATA, seed=42):
+    """Observed difference, Bayesian posterior and stratified bootstrap summary per metric"""
+    start = time.perf_counter()
+    cells = load_arm_counts(db_path)
+    arm_totals = cells.groupby('experiment_group')[list(MEASURE_CLASSES)].sum()
+
+    observed = pd.DataFrame({
+        'metric': list(EXPERIMENT_METRICS),
+        'control_rate': [arm_totals.at[control, s] / arm_totals.at[control, n] for s, n in EXPERIMENT_METRICS.values()],
+        'treatment_rate': [arm_totals.at[treatment, s] / arm_totals.at[treatment, n] for s, n in EXPERIMENT_METRICS.values()],
+    }).set_index('metric')
+    observed['difference'] = observed['treatment_rate'] - observed['control_rate']
+
+    summary = observed.join(bayesian_comparison(arm_totals, control, treatment, draws=draws, seed=seed))
+    summary = summary.join(stratified_bootstrap(cells, control, treatment, strata, replicates=draws, seed=seed))
+    print(f"🔹 Experiment uncertainty: {draws:,} posterior draws and bootstrap replicates in {time.perf_counter() - start:.3f}s")
+    return summary
+
+
+def recommendation(summary, treatment="B"):
+    """('implement' | 'gradual' | 'continue', sentence) from the approval and default-rate posteriors"""
+    approval_better = summary.at['approval_rate', 'prob_superior']
+    default_worse = 1 - summary.at['default_rate', 'prob_superior']
+    if approval_better >= RECOMMEND_PROBABILITY and default_worse < MAX_DEFAULT_RISK:
+        return 'implement', f"We recommend implementing Strategy {treatment} across all channels."
+    if approval_better >= RECOMMEND_PROBABILITY:
+        return 'gradual', (f"Strategy {treatment} approves more loans but may raise defaults; "
+                           "roll out gradually while monitoring risk.")
+    return 'continue', f"The evidence does not yet favor Strategy {treatment}; keep the experiment running."
+
+
+def executive_summary(summary, control="A", treatment="B"):
+    """Recommendation text generated from the posterior and bootstrap results"""
+    approval = summary.loc['approval_rate']
+    default = summary.loc['default_rate']
+    approval_better = approval['prob_superior']
+    default_worse = 1 - default['prob_superior']
+
+    text = (
+        f"Strategy {treatment} changes the approval rate by {approval['lift_mean']:+.1%} relative to Strategy {control} "
+        f"(95% CI {approval['lift_lower']:+.1%} to {approval['lift_upper']:+.1%}; "
+        f"{approval_better:.1%} probability it approves more). "
+        f"The default rate moves {default['difference'] * 100:+.1f} pts "
+        f"(95% CI {default['bootstrap_lower'] * 100:+.1f} to {default['bootstrap_upper'] * 100:+.1f} pts; "
+        f"{default_worse:.1%} probability it is higher). "
+    )
+    return text + recommendation(summary, treatment)[1]
+
+
+def load_arm_totals(db_path="data/loan_funnel.db"):
+    """Decided applicants, approvals, fundings, defaults and funded amount per experiment arm"""
+    ensure_daily_agg(db_path)
+    return read_sql("""
+    Select experiment_group,
+        Sum(stage_underwriting_review + stage_approved + stage_funded) as decided,
+        Sum(approvals) as approvals,
+        Sum(fundings) as fundings,
+        Sum(defaults) as defaults,
+        Sum(funded_amount_sum) as funded_amount
+    From daily_funnel_agg
+    Group By experiment_group
+    """, db_path).set_index('experiment_group')
+
+
+def business_impact(summary, arm_totals, control="A", treatment="B", margin=REPAID_LOAN_MARGIN,
+                    lgd=LOSS_GIVEN_DEFAULT):
+    """Extra approvals, funded loans and expected profit of the treatment over the control at the treatment's volume
+
+    Each arm's per-decided-applicant rates are applied to the treatment arm's
+    decided applicants, at the arm's own average funded amount. Repaid loans earn
+    `margin` and defaults lose `lgd` of the amount. The profit range re-prices the
+    treatment's defaults at the ends of the default-rate bootstrap interval.
+    """
+    decided = arm_totals.at[treatment, 'decided']
+    per_decided = arm_totals[['approvals', 'fundings', 'defaults']].div(arm_totals['decided'], axis=0)
+    average_loan = arm_totals['funded_amount'] / arm_totals['fundings']
+
+    def profit(fundings, defaults, loan):
+        return ((fundings - defaults) * margin - defaults * lgd) * loan
+
+    control_profit = profit(per_decided.at[control, 'fundings'], per_decided.at[control, 'defaults'],
+                            average_loan[control]) * decided
+    treatment_fundings = per_decided.at[treatment, 'fundings'] * decided
+    default = summary.loc['default_rate']
+    control_default_rate = default['control_rate']
+
+    def treatment_profit(default_rate):
+        return profit(treatment_fundings, treatment_fundings * default_rate, average_loan[treatment])
+
+    approval = summary.loc['approval_rate']
+    profit_bounds = sorted(treatment_profit(control_default_rate + default[bound]) - control_profit
+                           for bound in ('bootstrap_lower', 'bootstrap_upper'))
+    return {
+        'decided': decided,
+        'extra_approvals': approval['difference'] * decided,
+        'extra_approvals_lower': approval['bootstrap_lower'] * decided,
+        'extra_approvals_upper': approval['bootstrap_upper'] * decided,
+        'extra_fundings': treatment_fundings - per_decided.at[control, 'fundings'] * decided,
+        'average_loan': average_loan[treatment],
+        'margin': margin,
+        'lgd': lgd,
+        'profit_change': treatment_profit(default['treatment_rate']) - control_profit,
+        'profit_lower': profit_bounds[0],
+        'profit_upper': profit_bounds[1],
+    }
+
+
+if __name__ == "__main__":
+    pd.set_option('display.width', 200)
+    summary = experiment_uncertainty()
+    print(summary.round(4).to_string())
+    print(executive_summary(summary))
+    for name, value in business_impact(summary, load_arm_totals()).items():
+        print(f"   {name}: {value:,.2f}")
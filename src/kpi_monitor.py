@@ -0,0 +1,196 @@
+import argparse
+import datetime
+import os
+import signal
+import sqlite3
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.alert_store import ALERT_DB_PATH
+from src.compute_metrics import get_load_id
+from src.report_alerts import APPROVAL_RATE_THRESHOLD, FUNDING_RATE_THRESHOLD, save_alerts
+
+# Applications that reached a decision; the same population get_current_metrics uses
+DECIDED_STAGES = ('Underwriting Review', 'Approved', 'Funded')
+
+
+class RollingRate:
+    """Share of successes over the last `window` observations, kept in a fixed ring buffer
+
+    Each observation costs O(1) and memory never grows past the buffer.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.buffer = np.zeros(window, dtype=np.int8)
+        self.position = 0
+        self.count = 0
+        self.total = 0
+
+    def update(self, values):
+        """Add observations in order; returns the rate after each one"""
+        values = np.asarray(values, dtype=np.int8)
+        if len(values) == 0:
+            return np.empty(0)
+        if len(values) > self.window:
+            # Each slot may only be overwritten once per step
+            return np.concatenate([self.update(values[i:i + self.window]) for i in range(0, len(values), self.window)])
+
+        slots = (self.position + np.arange(len(values))) % self.window
+        evicted = np.where(self.count + np.arange(len(values)) >= self.window, self.buffer[slots], 0)
+        totals = self.total + np.cumsum(values.astype(np.int64) - evicted)
+        counts = np.minimum(self.count + np.arange(1, len(values) + 1), self.window)
+
+        self.buffer[slots] = values
+        self.position = int((self.position + len(values)) % self.window)
+        self.count = int(counts[-1])
+        self.total = int(totals[-1])
+        return totals / counts
+
+    @property
+    def rate(self):
+        return self.total / self.count if self.count else float('nan')
+
+    @property
+    def full(self):
+        return self.count >= self.window
+
+
+class KPIMonitor:
+    """Tail loan_applications by rowid and alert when rolling approval or funding rates breach"""
+
+    def __init__(self, db_path="data/loan_funnel.db", window=500, batch_size=10000,
+                 thresholds=None, alert_db_path=ALERT_DB_PATH):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.alert_db_path = alert_db_path
+        self.thresholds = thresholds or {
+            'approval_rate': APPROVAL_RATE_THRESHOLD,
+            'funding_rate': FUNDING_RATE_THRESHOLD,
+        }
+        self.rates = {metric: RollingRate(window) for metric in self.thresholds}
+        self.breached = {metric: False for metric in self.thresholds}
+        self.high_water_mark = None
+        self.load_id = None
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _fetch(self, conn, where, params, order="Asc"):
+        placeholders = ", ".join("?" for _ in DECIDED_STAGES)
+        return conn.execute(f"""
+            Select rowid,
+                coalesce(decision_outcome = 'Approved', 0),
+                coalesce(funding_status = 'Funded', 0)
+            From loan_applications
+            Where funnel_stage In ({placeholders}) And {where}
+            Order By rowid {order}
+            Limit ?
+        """, (*DECIDED_STAGES, *params)).fetchall()
+
+    def seed(self, conn):
+        """Start from the newest decided applications so the window is warm on launch"""
+        window = next(iter(self.rates.values())).window
+        self.rates = {metric: RollingRate(window) for metric in self.thresholds}
+        rows = self._fetch(conn, "1 = 1", (window,), order="Desc")[::-1]
+        self._observe(rows, alert=False)
+        self.high_water_mark = conn.execute("Select coalesce(max(rowid), 0) From loan_applications").fetchone()[0]
+        self.load_id = get_load_id(conn=conn)
+        print(f"🔹 Monitoring from rowid {self.high_water_mark:,} with {len(rows):,} applications in the window")
+
+    def _observe(self, rows, alert=True):
+        if not rows:
+            return []
+        values = np.array(rows, dtype=np.int64)
+        observed = {'approval_rate': values[:, 1], 'funding_rate': values[:, 2]}
+
+        alerts = []
+        for metric, rolling in self.rates.items():
+            count_before = rolling.count
+            rates = rolling.update(observed[metric])
+            if not alert:
+                continue
+            # Rates only count once the window has filled
+            valid = count_before + np.arange(1, len(rates) + 1) >= rolling.window
+            below = valid & (rates < self.thresholds[metric])
+            if below.any() and not self.breached[metric]:
+                first = int(np.argmax(below))
+                label = metric.replace('_', ' ').capitalize()
+                alerts.append({
+                    'metric': metric,
+                    'segment': 'overall',
+                    'value': float(rates[first]),
+                    'threshold': self.thresholds[metric],
+                    'severity': 'critical',
+                    'message': f"⚠️ ALERT: {label} dropped to {rates[first]:.2%} over the last {rolling.window} decisions (rowid {values[first, 0]})",
+                    'source': 'kpi_monitor',
+                })
+            if valid.any():
+                self.breached[metric] = bool(rates[valid][-1] < self.thresholds[metric])
+        return alerts
+
+    def poll(self):
+        """Process applications added since the last poll; returns any new alerts"""
+        conn = self._connect()
+        try:
+            if self.high_water_mark is None:
+                self.seed(conn)
+                return []
+            max_rowid = conn.execute("Select coalesce(max(rowid), 0) From loan_applications").fetchone()[0]
+            # A new load stamp means the table was replaced, whatever its size; shrinking rowids catch unstamped reloads
+            if get_load_id(conn=conn) != self.load_id or max_rowid < self.high_water_mark:
+                print("🔹 loan_applications was reloaded; reseeding the rolling window")
+                self.seed(conn)
+                return []
+
+            alerts = []
+            while self.high_water_mark < max_rowid:
+                upper = min(self.high_water_mark + self.batch_size, max_rowid)
+                rows = self._fetch(conn, "rowid > ? And rowid <= ?", (self.high_water_mark, upper, self.batch_size))
+                alerts += self._observe(rows)
+                self.high_water_mark = upper
+        finally:
+            conn.close()
+
+        if alerts:
+            print(f"\n🚨 ALERTS ({datetime.datetime.now():%Y-%m-%d %H:%M:%S}):")
+            for alert in alerts:
+                print(alert['message'])
+            save_alerts(alerts, self.alert_db_path)
+        return alerts
+
+    def snapshot(self):
+        return {metric: rolling.rate for metric, rolling in self.rates.items()}
+
+
+def run_monitor(db_path="data/loan_funnel.db", window=500, poll_seconds=1.0,
+                alert_db_path=ALERT_DB_PATH, max_polls=None):
+    """Poll for new applications until stopped, alerting within one poll interval of a breach"""
+    monitor = KPIMonitor(db_path, window, alert_db_path=alert_db_path)
+    polls = 0
+    # Stop cleanly under a process supervisor as well as on Ctrl+C
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        while max_polls is None or polls < max_polls:
+            monitor.poll()
+            polls += 1
+            time.sleep(poll_seconds)
+    except KeyboardInterrupt:
+        pass
+    print(f"✅ Monitor stopped at rowid {monitor.high_water_mark:,}; rolling rates {monitor.snapshot()}")
+    return monitor
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream funnel KPIs from new applications and alert on breaches")
+    parser.add_argument("--db-path", default="data/loan_funnel.db")
+    parser.add_argument("--window", type=int, default=500, help="decided applications in the rolling window")
+    parser.add_argument("--poll-seconds", type=float, default=1.0)
+    parser.add_argument("--alert-db", default=ALERT_DB_PATH)
+    args = parser.parse_args()
+
+    run_monitor(args.db_path, args.window, args.poll_seconds, args.alert_db)
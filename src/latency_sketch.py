@@ -0,0 +1,215 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from src.cohorts import COHORT_BANDS, CODE_COLUMNS, cohort_codes, code_labels
+from src.daily_agg import AGG_KEYS, RAW_COLUMNS, application_delays
+
+SKETCH_TABLE = "latency_sketch"
+LATENCY_METRICS = ['approval_delay', 'funding_delay']
+
+# DDSketch: bucket i holds values in (gamma^(i-1), gamma^i], so any quantile is
+# answered within RELATIVE_ACCURACY of the true value; sketches merge by adding bucket counts
+RELATIVE_ACCURACY = 0.01
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+# Bucket for zero (same-day) delays, which have no logarithm
+ZERO_BUCKET = -(2 ** 31)
+DEFAULT_QUANTILES = (0.5, 0.9, 0.99)
+
+
+def bucket_index(values):
+    """DDSketch bucket of every non-negative value"""
+    values = np.asarray(values, dtype=float)
+    with np.errstate(divide='ignore'):
+        index = np.ceil(np.log(values) / np.log(GAMMA))
+    return np.where(values > 0, index, ZERO_BUCKET).astype(np.int64)
+
+
+def bucket_value(index):
+    """Representative value of a bucket, within the relative accuracy of everything it holds"""
+    index = np.asarray(index, dtype=np.int64)
+    return np.where(index == ZERO_BUCKET, 0.0, 2 * GAMMA ** index.astype(float) / (GAMMA + 1))
+
+
+def sketch_applications(df):
+    """Bucket counts of approval and funding delay per day and segment (daily_funnel_agg keys)"""
+    keys = pd.DataFrame({
+        'application_date': pd.to_datetime(df['application_date']).dt.strftime('%Y-%m-%d'),
+        'experiment_group': df['experiment_group'].astype(str),
+    }, index=df.index).join(cohort_codes(df))
+
+    parts = []
+    for metric, delay in zip(LATENCY_METRICS, application_delays(df)):
+        observed = delay.notna().to_numpy()
+        rows = keys[observed].copy()
+        rows['metric'] = metric
+        rows['bucket'] = bucket_index(delay[observed].to_numpy())
+        parts.append(rows)
+    rows = pd.concat(parts, ignore_index=True)
+    return rows.groupby(AGG_KEYS + ['metric', 'bucket'], sort=False).size().rename('count').reset_index()
+
+
+def create_sketch_table(conn):
+    key_columns = ",\n        ".join(
+        ['application_date TEXT NOT NULL', 'experiment_group TEXT NOT NULL']
+        + [f"{column} INTEGER NOT NULL" for column in CODE_COLUMNS.values()]
+    )
+    conn.execute(f"""
+    Create Table If Not Exists {SKETCH_TABLE} (
+        {key_columns},
+        metric TEXT NOT NULL,
+        bucket INTEGER NOT NULL,
+        count INTEGER NOT NULL DEFAULT 0,
+        Primary Key ({', '.join(AGG_KEYS)}, metric, bucket)
+    )
+    """)
+
+
+def upsert_sketches(conn, sketch_df):
+    """Merge bucket counts into latency_sketch, creating missing buckets"""
+    if sketch_df.empty:
+        return
+    columns = AGG_KEYS + ['metric', 'bucket', 'count']
+    query = f"""
+    Insert Into {SKETCH_TABLE} ({', '.join(columns)})
+    Values ({', '.join('?' for _ in columns)})
+    On Conflict ({', '.join(AGG_KEYS)}, metric, bucket) Do Update Set count = count + excluded.count
+    """
+    conn.executemany(query, sketch_df[columns].astype(object).itertuples(index=False, name=None))
+
+
+def build_latency_sketches(db_path="data/loan_funnel.db", chunksize=500000):
+    """Rebuild latency_sketch from loan_applications in bounded-memory chunks"""
+    conn = sqlite3.connect(db_path)
+    conn.execute(f"Drop Table If Exists {SKETCH_TABLE}")
+    create_sketch_table(conn)
+    for chunk in pd.read_sql(f"Select {', '.join(RAW_COLUMNS)} From loan_applications", conn, chunksize=chunksize):
+        upsert_sketches(conn, sketch_applications(chunk))
+    conn.commit()
+    n_rows = conn.execute(f"Select count(*) From {SKETCH_TABLE}").fetchone()[0]
+    conn.close()
+    print(f"✅ Built {SKETCH_TABLE} with {n_rows:,} buckets")
+
+
+def update_latency_sketches(conn, new_rows):
+    """Fold newly ingested application rows into latency_sketch (caller commits)"""
+    create_sketch_table(conn)
+    upsert_sketches(conn, sketch_applications(new_rows))
+
+
+def ensure_latency_sketches(db_path="data/loan_funnel.db"):
+    """Build latency_sketch for databases loaded before the table existed"""
+    conn = sqlite3.connect(db_path)
+    exists = conn.execute(
+        "Select 1 From sqlite_master Where type = 'table' And name = ?", (SKETCH_TABLE,)
+    ).fetchone() is not None
+    conn.close()
+    if not exists:
+        build_latency_sketches(db_path)
+
+
+def _key_column(name):
+    """Cohort dimension names map to their stored code column"""
+    return CODE_COLUMNS.get(name, name)
+
+
+def merged_sketch(metric, start_date=None, end_date=None, segment=None, by=None, db_path="data/loan_funnel.db"):
+    """Bucket counts merged over a date range and segment, optionally kept apart per `by` key
+
+    `segment` maps key columns or cohort dimensions to a value, e.g.
+    {'experiment_group': 'B', 'credit_group': 'Good (670-739)'}.
+    """
+    ensure_latency_sketches(db_path)
+    conditions, params = ["metric = ?"], [metric]
+    if start_date is not None:
+        conditions.append("application_date >= ?")
+        params.append(str(start_date))
+    if end_date is not None:
+        conditions.append("application_date <= ?")
+        params.append(str(end_date))
+    for name, value in (segment or {}).items():
+        if name in COHORT_BANDS:
+            value = COHORT_BANDS[name]['labels'].index(value)
+        conditions.append(f"{_key_column(name)} = ?")
+        params.append(value)
+
+    group_columns = [_key_column(name) for name in (by or [])]
+    select = ", ".join(group_columns + ["bucket", "sum(count) as count"])
+    conn = sqlite3.connect(db_path)
+    try:
+        return pd.read_sql(f"""
+        Select {select}
+        From {SKETCH_TABLE}
+        Where {' And '.join(conditions)}
+        Group By {', '.join(group_columns + ['bucket'])}
+        """, conn, params=params)
+    finally:
+        conn.close()
+
+
+def sketch_quantiles(buckets, counts, quantiles=DEFAULT_QUANTILES):
+    """Quantiles of one merged sketch from its bucket counts"""
+    order = np.argsort(buckets)
+    buckets, cumulative = np.asarray(buckets)[order], np.cumsum(np.asarray(counts)[order])
+    if len(cumulative) == 0 or cumulative[-1] == 0:
+        return np.full(len(quantiles), np.nan)
+    ranks = np.asarray(quantiles) * (cumulative[-1] - 1)
+    return bucket_value(buckets[np.searchsorted(cumulative, ranks, side='right')])
+
+
+def latency_quantiles(metric="approval_delay", quantiles=DEFAULT_QUANTILES, start_date=None, end_date=None,
+                      segment=None, by=None, db_path="data/loan_funnel.db"):
+    """p50/p90/p99 (or any quantiles) of a delay for a date range and segment, from merged sketches"""
+    merged = merged_sketch(metric, start_date, end_date, segment, by, db_path)
+    names = [f"p{q * 100:g}" for q in quantiles]
+    by = by or []
+    if not by:
+        groups = [((), merged)]
+    else:
+        groups = merged.groupby([_key_column(name) for name in by], sort=True)
+
+    rows = []
+    for key, sketch in groups:
+        key = key if isinstance(key, tuple) else (key,)
+        row = dict(zip(by, key))
+        row['count'] = int(sketch['count'].sum())
+        row.update(zip(names, sketch_quantiles(sketch['bucket'].to_numpy(), sketch['count'].to_numpy(), quantiles)))
+        rows.append(row)
+    result = pd.DataFrame(rows, columns=by + ['count'] + names)
+    for name in by:
+        if name in COHORT_BANDS:
+            result[name] = np.asarray(code_labels(name, result[name]))
+    return result
+
+
+def latency_summary(db_path="data/loan_funnel.db", quantiles=DEFAULT_QUANTILES):
+    """Quantiles of every delay metric over the whole history"""
+    return pd.concat([latency_quantiles(metric, quantiles, db_path=db_path).assign(metric=metric)
+                      for metric in LATENCY_METRICS], ignore_index=True).set_index('metric')
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Approval and funding delay quantiles from merged DDSketches")
+    parser.add_argument("--db-path", default="data/loan_funnel.db")
+    parser.add_argument("--metric", default="approval_delay", choices=LATENCY_METRICS)
+    parser.add_argument("--start-date", default=None)
+    parser.add_argument("--end-date", default=None)
+    parser.add_argument("--segment", nargs="*", default=[], help="key=value filters, e.g. experiment_group=B")
+    parser.add_argument("--by", nargs="*", default=[], help="key columns or cohort dimensions to split by")
+    parser.add_argument("--quantiles", type=float, nargs="+", default=list(DEFAULT_QUANTILES))
+    parser.add_argument("--rebuild", action="store_true", help="rebuild the sketches from loan_applications")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        build_latency_sketches(args.db_path)
+    segment = dict(item.split("=", 1) for item in args.segment)
+    for name, value in segment.items():
+        if name not in COHORT_BANDS and name != 'experiment_group' and name != 'application_date':
+            segment[name] = int(value)
+    pd.set_option('display.width', 200)
+    print(f"🔹 {args.metric} quantiles (days):")
+    print(latency_quantiles(args.metric, args.quantiles, args.start_date, args.end_date, segment, args.by,
+                            args.db_path).round(2).to_string(index=False))
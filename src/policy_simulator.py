@@ -0,0 +1,163 @@
+import time
+
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+
+from src.sql_backend import read_sql
+
+# Approval scoring from the application simulator (generate_data.generate_applications)
+SCORE_WEIGHTS = {'credit': 0.45, 'income': 0.15, 'dti': 0.3, 'employed': 0.1}
+PENALTY_NAMES = ['high_dti', 'subprime', 'unemployed', 'large_loan']
+BASE_PENALTIES = np.array([0.15, 0.2, 0.25, 0.1])
+SCORE_NOISE_SD = 0.05
+CURRENT_POLICIES = {'A': 0.65, 'B': 0.55}
+
+# Share of the funded amount lost when a loan defaults
+LOSS_GIVEN_DEFAULT = 1.0
+
+
+def load_scored_applicants(db_path="data/loan_funnel.db"):
+    """Applicants that reached underwriting, with the features the approval score uses"""
+    return read_sql("""
+    Select applicant_id, experiment_group, credit_score, income, dti_ratio, employment_status, loan_amount,
+        decision_outcome, funding_status, defaulted, funded_amount
+    From loan_applications
+    Where funnel_stage In ('Underwriting Review', 'Approved', 'Funded')
+    """, db_path)
+
+
+def default_probability(credit_score, dti_ratio):
+    """Simulator default probability of a funded loan from credit score and DTI, vectorized"""
+    credit = np.asarray(credit_score, dtype=float)
+    dti = np.asarray(dti_ratio, dtype=float)
+    base_default = np.select([credit < 580, credit < 650, credit < 720], [0.4, 0.25, 0.12], default=0.05)
+    return np.minimum(base_default * (1 + dti * 1.5), 0.6)
+
+
+def applicant_features(applicants):
+    """Policy-independent score part, penalty indicators, default probability and expected funded amount"""
+    credit = applicants['credit_score'].to_numpy(dtype=float)
+    income = applicants['income'].to_numpy(dtype=float)
+    dti = applicants['dti_ratio'].to_numpy(dtype=float)
+    loan = applicants['loan_amount'].to_numpy(dtype=float)
+    employed = (applicants['employment_status'] == 'Employed').to_numpy()
+    unemployed = (applicants['employment_status'] == 'Unemployed').to_numpy()
+
+    base_score = (
+        (credit - 300) / 550 * SCORE_WEIGHTS['credit']
+        + income / 200000 * SCORE_WEIGHTS['income']
+        + (1 - dti) * SCORE_WEIGHTS['dti']
+        + employed * SCORE_WEIGHTS['employed']
+    )
+    penalties = np.column_stack([dti > 0.43, credit < 620, unemployed, loan > 50000]).astype(float)
+    return base_score, penalties, default_probability(credit, dti), 0.95 * loan
+
+
+def policy_grid(thresholds=np.linspace(0.40, 0.80, 41), penalty_scales=(0.0, 0.5, 1.0, 1.5, 2.0)):
+    """Every threshold x penalty-scale combination as a policy table"""
+    threshold, scale = np.meshgrid(np.asarray(thresholds), np.asarray(penalty_scales), indexing='ij')
+    policies = pd.DataFrame({'threshold': threshold.ravel().round(4), 'penalty_scale': scale.ravel()})
+    for name, weight in zip(PENALTY_NAMES, BASE_PENALTIES):
+        policies[f"penalty_{name}"] = policies['penalty_scale'] * weight
+    return policies
+
+
+def simulate_policies(applicants, policies, lgd=LOSS_GIVEN_DEFAULT, chunk_size=50000):
+    """Expected approvals, fundings, defaults, funded volume and default loss of every policy
+
+    Scores are an (applicants x policies) broadcast of the shared score part
+    minus each policy's penalties; the score noise makes approval a normal
+    tail probability, so totals are expectations rather than one random draw.
+    Applicants are processed in chunks to bound memory.
+    """
+    thresholds = policies['threshold'].to_numpy(dtype=float)
+    penalty_weights = policies[[f"penalty_{name}" for name in PENALTY_NAMES]].to_numpy(dtype=float)
+    totals = np.zeros((5, len(policies)))
+
+    for start in range(0, len(applicants), chunk_size):
+        base_score, penalties, default_prob, funded_amount = applicant_features(applicants.iloc[start:start + chunk_size])
+        score = base_score[:, None] - penalties @ penalty_weights.T
+        approval = norm.sf((thresholds - score) / SCORE_NOISE_SD)
+        funding = approval * np.clip(0.7 + score * 0.2, 0, 1)
+        totals[0] += approval.sum(axis=0)
+        totals[1] += funding.sum(axis=0)
+        totals[2] += default_prob @ funding
+        totals[3] += funded_amount @ funding
+        totals[4] += (default_prob * funded_amount * lgd) @ funding
+
+    results = policies.copy()
+    results['expected_approvals'] = totals[0]
+    results['expected_fundings'] = totals[1]
+    results['expected_defaults'] = totals[2]
+    results['expected_funded_volume'] = totals[3]
+    results['expected_default_loss'] = totals[4]
+    results['approval_rate'] = totals[0] / max(len(applicants), 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        results['loss_rate'] = totals[4] / totals[3]
+    return results
+
+
+def efficient_frontier(results, volume="expected_approvals", loss="expected_default_loss"):
+    """Flag policies no other policy beats on both higher volume and lower loss"""
+    order = results.sort_values([loss, volume], ascending=[True, False]).index
+    best_volume = np.maximum.accumulate(results.loc[order, volume].to_numpy())
+    efficient = results.loc[order, volume].to_numpy() >= best_volume
+    # Only the first policy at each new volume high is efficient
+    efficient &= np.concatenate([[True], best_volume[1:] > best_volume[:-1]])
+    results = results.copy()
+    results['efficient'] = pd.Series(efficient, index=order).reindex(results.index)
+    return results
+
+
+def run_policy_sweep(db_path="data/loan_funnel.db", thresholds=np.linspace(0.40, 0.80, 41),
+                     penalty_scales=(0.0, 0.5, 1.0, 1.5, 2.0), lgd=LOSS_GIVEN_DEFAULT):
+    """Sweep the policy grid over the applicants that reached underwriting and mark the frontier"""
+    applicants = load_scored_applicants(db_path)
+    policies = policy_grid(thresholds, penalty_scales)
+    start = time.perf_counter()
+    results = efficient_frontier(simulate_policies(applicants, policies, lgd))
+    print(f"🔹 Simulated {len(policies):,} policies over {len(applicants):,} applicants "
+          f"in {time.perf_counter() - start:.3f}s; {int(results['efficient'].sum())} on the efficient frontier")
+    return results
+
+
+def current_policy_check(db_path="data/loan_funnel.db"):
+    """Simulated vs observed approvals for the A and B thresholds on their own applicants"""
+    applicants = load_scored_applicants(db_path)
+    rows = []
+    for group, threshold in CURRENT_POLICIES.items():
+        arm = applicants[applicants['experiment_group'] == group]
+        simulated = simulate_policies(arm, policy_grid([threshold], [1.0])).iloc[0]
+        rows.append({
+            'experiment_group': group,
+            'threshold': threshold,
+            'observed_approvals': int((arm['decision_outcome'] == 'Approved').sum()),
+            'expected_approvals': simulated['expected_approvals'],
+            'observed_fundings': int((arm['funding_status'] == 'Funded').sum()),
+            'expected_fundings': simulated['expected_fundings'],
+            'observed_defaults': int((pd.to_numeric(arm['defaulted']) == 1).sum()),
+            'expected_defaults': simulated['expected_defaults'],
+        })
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Counterfactual underwriting policy sweep")
+    parser.add_argument("--db-path", default="data/loan_funnel.db")
+    parser.add_argument("--min-threshold", type=float, default=0.40)
+    parser.add_argument("--max-threshold", type=float, default=0.80)
+    parser.add_argument("--steps", type=int, default=41)
+    parser.add_argument("--penalty-scales", type=float, nargs="+", default=[0.0, 0.5, 1.0, 1.5, 2.0])
+    parser.add_argument("--lgd", type=float, default=LOSS_GIVEN_DEFAULT)
+    args = parser.parse_args()
+
+    pd.set_option('display.width', 200)
+    results = run_policy_sweep(args.db_path, np.linspace(args.min_threshold, args.max_threshold, args.steps),
+                               args.penalty_scales, args.lgd)
+    columns = ['threshold', 'penalty_scale', 'expected_approvals', 'expected_fundings', 'expected_default_loss', 'loss_rate']
+    print(results[results['efficient']].sort_values('expected_approvals')[columns].round(3).to_string(index=False))
+    print("🔹 Simulated vs observed outcomes under the current A/B thresholds:")
+    print(current_policy_check(args.db_path).round(2).to_string(index=False))
@@ -0,0 +1,175 @@
+import math
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from src.experiment_engine import two_proportion_tests
+
+# Funnel steps, each conditional on the previous one; a metric is a step's rate
+FUNNEL_STEPS = ['decided', 'approvals', 'fundings', 'defaults']
+STEP_METRICS = {'approval_rate': 'approvals', 'funded_given_approved': 'fundings', 'default_rate': 'defaults'}
+
+DEFAULT_EFFECTS = [0.02, 0.05, 0.10, 0.15, 0.20, 0.30]
+DEFAULT_SAMPLE_SIZES = [250, 500, 1000, 2000, 4000, 8000, 16000, 32000]
+N_SIMULATIONS = 2000
+TARGET_POWER = 0.8
+
+
+def simulator_baseline(n=20000, seed=7, group="A"):
+    """Conditional funnel rates of one arm of the synthetic application simulator"""
+    from src.generate_data import generate_applications
+
+    df = generate_applications(n=n, seed=seed)
+    df = df[df['experiment_group'] == group]
+    decided = df['funnel_stage'].isin(['Underwriting Review', 'Approved', 'Funded'])
+    approved = df['decision_outcome'] == 'Approved'
+    funded = df['funding_status'] == 'Funded'
+    defaulted = pd.to_numeric(df['defaulted']) == 1
+    return {
+        'decided': decided.mean(),
+        'approvals': approved.sum() / decided.sum(),
+        'fundings': funded.sum() / approved.sum(),
+        'defaults': defaulted.sum() / funded.sum(),
+    }
+
+
+def daily_application_volume(db_path="data/loan_funnel.db"):
+    """Average applications per day over the loaded history"""
+    from src.sql_backend import read_sql
+
+    volume = read_sql("""
+    Select count(*) * 1.0 / (julianday(max(application_date)) - julianday(min(application_date)) + 1) as per_day
+    From loan_applications
+    """, db_path)
+    return float(volume['per_day'].iloc[0])
+
+
+def simulate_batch(baseline, metric, effects, sample_sizes, n_sims, alpha, seed):
+    """Rejection counts for an (effects x sample sizes) grid, all simulations drawn at once
+
+    Each experiment draws both arms through the funnel as chained binomials,
+    lifting the metric's step rate by the relative effect in the treatment arm,
+    and applies the pooled two-proportion z-test used by ab_testing.
+    """
+    rng = np.random.default_rng(seed)
+    step = STEP_METRICS[metric]
+    shape = (len(effects), len(sample_sizes), n_sims)
+    applications = np.broadcast_to(np.asarray(sample_sizes)[None, :, None], shape)
+    lift = np.asarray(effects)[:, None, None]
+
+    def run_arm(lifted):
+        count = applications
+        for name in FUNNEL_STEPS:
+            rate = baseline[name] * (1 + lift) if (lifted and name == step) else np.full(shape, baseline[name])
+            trials, count = count, rng.binomial(count, np.clip(rate, 0, 1))
+            if name == step:
+                return count.astype(float), trials.astype(float)
+
+    successes_c, trials_c = run_arm(False)
+    successes_t, trials_t = run_arm(True)
+    p_value = two_proportion_tests(successes_c, trials_c, successes_t, trials_t, alpha)['p_value']
+    return (np.nan_to_num(p_value, nan=1.0) < alpha).sum(axis=2)
+
+
+def _worker_count(workers):
+    return max(1, workers or multiprocessing.cpu_count())
+
+
+def power_curves(baseline=None, metric="approval_rate", effects=DEFAULT_EFFECTS, sample_sizes=DEFAULT_SAMPLE_SIZES,
+                 n_sims=N_SIMULATIONS, alpha=0.05, seed=42, workers=None):
+    """Simulated power for every effect size and per-arm sample size, simulations split across processes"""
+    baseline = baseline or simulator_baseline()
+    workers = _worker_count(workers)
+    batches = [len(batch) for batch in np.array_split(np.arange(n_sims), workers) if len(batch)]
+    seeds = np.random.SeedSequence(seed).spawn(len(batches))
+
+    start = time.perf_counter()
+    if len(batches) == 1:
+        rejections = simulate_batch(baseline, metric, effects, sample_sizes, batches[0], alpha, seeds[0])
+    else:
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=len(batches), mp_context=context) as pool:
+            futures = [pool.submit(simulate_batch, baseline, metric, effects, sample_sizes, size, alpha, batch_seed)
+                       for size, batch_seed in zip(batches, seeds)]
+            rejections = sum(future.result() for future in futures)
+
+    curves = pd.DataFrame(rejections / n_sims, index=pd.Index(effects, name='effect'),
+                          columns=pd.Index(sample_sizes, name='applications_per_arm'))
+    print(f"🔹 Simulated {n_sims * len(effects) * len(sample_sizes):,} experiments for {metric} "
+          f"in {time.perf_counter() - start:.2f}s on {len(batches)} process(es)")
+    return curves
+
+
+def required_duration(curves, daily_volume, target_power=TARGET_POWER, treatment_share=0.5):
+    """Sample size reaching the target power per effect, and the days of volume it takes
+
+    Interpolates each power curve in log sample size between the simulated
+    points; effects that never reach the target within the grid get NaN.
+    """
+    log_sizes = np.log(curves.columns.to_numpy(dtype=float))
+    per_arm = []
+    for power in curves.to_numpy():
+        power = np.maximum.accumulate(power)
+        if power[-1] < target_power:
+            per_arm.append(np.nan)
+        elif power[0] >= target_power:
+            per_arm.append(np.exp(log_sizes[0]))
+        else:
+            upper = int(np.argmax(power >= target_power))
+            lower = upper - 1
+            share = (target_power - power[lower]) / (power[upper] - power[lower])
+            per_arm.append(np.exp(log_sizes[lower] + share * (log_sizes[upper] - log_sizes[lower])))
+    per_arm = np.ceil(np.array(per_arm))
+    # The smaller arm is the bottleneck
+    arm_share = min(treatment_share, 1 - treatment_share)
+    return pd.DataFrame({
+        'effect': curves.index,
+        'applications_per_arm': per_arm,
+        'duration_days': np.ceil(per_arm / (daily_volume * arm_share)),
+    })
+
+
+def format_duration(durations, metric, target_power=TARGET_POWER):
+    lines = []
+    for row in durations.itertuples(index=False):
+        if math.isnan(row.applications_per_arm):
+            lines.append(f"🔹 {row.effect:+.0%} {metric}: not reached within the simulated sample sizes")
+        else:
+            lines.append(f"✅ {row.effect:+.0%} {metric}: {int(row.applications_per_arm):,} applications per arm "
+                         f"for {target_power:.0%} power → about {int(row.duration_days)} days")
+    return lines
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Simulated power curves and experiment duration")
+    parser.add_argument("--db-path", default="data/loan_funnel.db")
+    parser.add_argument("--metric", default="approval_rate", choices=list(STEP_METRICS))
+    parser.add_argument("--effects", type=float, nargs="+", default=DEFAULT_EFFECTS, help="relative lifts to detect")
+    parser.add_argument("--sample-sizes", type=int, nargs="+", default=DEFAULT_SAMPLE_SIZES,
+                        help="applications per arm")
+    parser.add_argument("--simulations", type=int, default=N_SIMULATIONS)
+    parser.add_argument("--alpha", type=float, default=0.05)
+    parser.add_argument("--power", type=float, default=TARGET_POWER)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--daily-volume", type=float, default=None,
+                        help="applications per day (default: average of the loaded data)")
+    parser.add_argument("--output", default=None, help="write the power curves to this CSV")
+    args = parser.parse_args()
+
+    baseline = simulator_baseline()
+    print("🔹 Simulator baseline (control arm): " + ", ".join(f"{k}={v:.3f}" for k, v in baseline.items()))
+    curves = power_curves(baseline, args.metric, args.effects, args.sample_sizes, args.simulations,
+                          args.alpha, workers=args.workers)
+    print(curves.round(3).to_string())
+    if args.output:
+        curves.to_csv(args.output)
+
+    daily_volume = args.daily_volume or daily_application_volume(args.db_path)
+    print(f"🔹 Daily application volume: {daily_volume:.1f}")
+    for line in format_duration(required_duration(curves, daily_volume, args.power), args.metric, args.power):
+        print(line)
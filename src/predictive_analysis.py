@@ -3,6 +3,10 @@ import numpy as np
 from sklearn.linear_model import LogisticRegression
 from sklearn.preprocessing import StandardScaler
 
+# Columns the drop-off models and cohort groupings read
+PREDICTIVE_COLUMNS = ['applicant_id', 'funnel_stage', 'credit_score', 'income', 'age',
+                      'dti_ratio', 'loan_amount', 'employment_status']
+
 class PredictiveDropoffAnalysis:
     def __init__(self, df):
         self.df = df.copy()
@@ -200,6 +204,7 @@ def run_predictive_analysis(df):
     return analyzer.run_analysis()
 
 if __name__=="__main__":
-    df = pd.read_csv('./data/loan_funnel_data.csv')
+    from src.dataset import load_loan_data
+    df = load_loan_data(PREDICTIVE_COLUMNS)
     results = run_predictive_analysis(df)
     print(results)
\ No newline at end of file
@@ -0,0 +1,183 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.compute_metrics import append_applications, prepare_append, publish_data_version
+from src.event_log import EVENT_COLUMNS, generate_event_log
+from src.generate_data import generate_applications
+
+SINKS = ("sqlite", "queue")
+
+
+def build_replay_stream(n=10000, seed=7, days=1, id_prefix=None):
+    """Synthetic applications and their stage events as one timestamp-ordered stream
+
+    Each event row carries a `completes` flag on the applicant's last event; the
+    application record is emitted then, once its final stage is known.
+    """
+    # A per-run prefix keeps replayed ids distinct from loaded data and earlier runs
+    id_prefix = id_prefix or time.strftime("SIM%Y%m%d%H%M%S")
+    applications = generate_applications(n, seed=seed, start_date=f'-{days}d', id_prefix=id_prefix)
+    # Same shape the CSV ingest produces
+    applications['decision_outcome'] = applications['decision_outcome'].replace("N/A", None)
+    for column in ['application_date', 'approved_date', 'funded_date']:
+        applications[column] = pd.to_datetime(applications[column]).dt.strftime('%Y-%m-%d')
+
+    events = generate_event_log(applications, seed=seed)
+    events['completes'] = ~events.duplicated('applicant_id', keep='last')
+    return applications.set_index('applicant_id', drop=False), events
+
+
+def emission_offsets(n_events, rate, burst_rate=None, burst_every=None, burst_length=None):
+    """Seconds after start at which each event is due
+
+    Events arrive at `rate` per second; with bursts, the first `burst_length`
+    seconds of every `burst_every` seconds run at `burst_rate` instead.
+    """
+    index = np.arange(n_events, dtype=np.float64)
+    if not (burst_rate and burst_every and burst_length):
+        return index / rate
+
+    burst_length = min(burst_length, burst_every)
+    burst_events = burst_rate * burst_length
+    period_events = burst_events + rate * (burst_every - burst_length)
+    period, within = np.divmod(index, period_events)
+    offsets = np.where(
+        within < burst_events,
+        within / burst_rate,
+        burst_length + (within - burst_events) / rate
+    )
+    return period * burst_every + offsets
+
+
+class SQLiteSink:
+    """Ingest events and completed applications through the normal append path
+
+    Derived tables are prepared once per sink, and a new data version (which
+    invalidates dashboard artifacts and the column cache) is published at most
+    once per `version_every` seconds and when the run ends. Rows also go to
+    the Parquet store when it exists; it reads as stale until the next version
+    is published.
+    """
+
+    def __init__(self, db_path="data/loan_funnel.db", parquet_root="data/parquet", version_every=60.0):
+        self.db_path = db_path
+        self.parquet_root = parquet_root
+        self.version_every = version_every
+        self.pending = False
+        self.last_published = time.perf_counter()
+        prepare_append(db_path)
+
+    def write(self, events, applications):
+        append_applications(applications, self.db_path, self.parquet_root, events=events[EVENT_COLUMNS],
+                            prepared=True, mark_version=False)
+        self.pending = True
+        if time.perf_counter() - self.last_published >= self.version_every:
+            self.publish()
+
+    def publish(self):
+        publish_data_version(self.db_path, self.parquet_root)
+        self.pending = False
+        self.last_published = time.perf_counter()
+
+    def close(self):
+        if self.pending:
+            self.publish()
+
+
+class QueueFileSink:
+    """Append events and completed applications to a JSON-lines file, like a message queue"""
+
+    def __init__(self, path="data/replay_queue.jsonl"):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.file = open(path, "a", encoding="utf-8")
+
+    def write(self, events, applications):
+        lines = [json.dumps({'type': 'event', **record}) for record in events[EVENT_COLUMNS].to_dict('records')]
+        records = applications.astype(object).where(applications.notna(), None).to_dict('records')
+        lines += [json.dumps({'type': 'application', **record}, default=str) for record in records]
+        self.file.write("\n".join(lines) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def replay(sink, n=10000, rate=100.0, burst_rate=None, burst_every=None, burst_length=None,
+           max_batch=5000, seed=7, days=1):
+    """Emit the synthetic stream into the sink at the target rate and report throughput and lag"""
+    applications, events = build_replay_stream(n, seed=seed, days=days)
+    offsets = emission_offsets(len(events), rate, burst_rate, burst_every, burst_length)
+
+    lags = []
+    write_seconds = []
+    start = time.perf_counter()
+    position = 0
+    while position < len(events):
+        now = time.perf_counter() - start
+        if offsets[position] > now:
+            time.sleep(min(offsets[position] - now, 0.5))
+            continue
+
+        # Everything that is already due goes out in one write
+        end = min(int(np.searchsorted(offsets, now, side='right')), position + max_batch)
+        batch = events.iloc[position:end]
+        completed = applications.loc[batch.loc[batch['completes'], 'applicant_id']]
+
+        write_start = time.perf_counter()
+        sink.write(batch, completed.reset_index(drop=True))
+        write_seconds.append(time.perf_counter() - write_start)
+        lags.append(time.perf_counter() - start - offsets[position:end])
+        position = end
+    sink.close()
+
+    elapsed = time.perf_counter() - start
+    lags = np.concatenate(lags) if lags else np.zeros(1)
+    summary = {
+        'events': len(events),
+        'applications': len(applications),
+        'seconds': elapsed,
+        'events_per_second': len(events) / elapsed if elapsed else float('nan'),
+        'target_events_per_second': rate,
+        'batches': len(write_seconds),
+        'mean_write_ms': float(np.mean(write_seconds) * 1000) if write_seconds else 0.0,
+        'p50_lag_ms': float(np.percentile(lags, 50) * 1000),
+        'p99_lag_ms': float(np.percentile(lags, 99) * 1000),
+        'max_lag_ms': float(lags.max() * 1000),
+    }
+    print("🔹 Replay Summary:")
+    print(pd.Series(summary).round(2).to_string())
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay synthetic funnel events at a controlled rate")
+    parser.add_argument("--sink", choices=SINKS, default="sqlite")
+    parser.add_argument("--db-path", default="data/loan_funnel.db")
+    parser.add_argument("--queue-path", default="data/replay_queue.jsonl")
+    parser.add_argument("--parquet-root", default="data/parquet", help="Parquet store to append to when it exists")
+    parser.add_argument("--version-every", type=float, default=60.0,
+                        help="seconds between data version bumps (dashboard cache invalidation)")
+    parser.add_argument("--applications", type=int, default=1000)
+    parser.add_argument("--rate", type=float, default=100.0, help="events per second")
+    parser.add_argument("--burst-rate", type=float, default=None, help="events per second during a burst")
+    parser.add_argument("--burst-every", type=float, default=None, help="seconds between burst starts")
+    parser.add_argument("--burst-length", type=float, default=None, help="seconds each burst lasts")
+    parser.add_argument("--max-batch", type=int, default=5000)
+    parser.add_argument("--days", type=int, default=1, help="application dates span the last N days")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    if args.sink == "sqlite":
+        sink = SQLiteSink(args.db_path, args.parquet_root, args.version_every)
+    else:
+        sink = QueueFileSink(args.queue_path)
+    replay(sink, args.applications, args.rate, args.burst_rate, args.burst_every, args.burst_length,
+           args.max_batch, args.seed, args.days)
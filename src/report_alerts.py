@@ -1,25 +1,26 @@
-import sqlite3
 import pandas as pd
-import datetime
+
+from src.sql_backend import read_sql
+from src.alert_store import ALERT_DB_PATH, record_alerts
+from src.daily_agg import ensure_daily_agg
 
 APPROVAL_RATE_THRESHOLD = 0.70
 FUNDING_RATE_THRESHOLD = 0.60
 
 def get_current_metrics(db_path="data/loan_funnel.db"):
-    conn = sqlite3.connect(db_path)
 
+    ensure_daily_agg(db_path)
     query = """Select
-        strftime('%Y-%m-%d', application_date) as date,
-        Sum(Case when decision_outcome = 'Approved' Then 1 else 0 end) * 1.0/count(*) as approval_rate,
-        Sum(Case when funding_status = 'Funded' Then 1 else 0 end)*1.0/count(*) As funding_rate
-        From loan_applications
-        Where funnel_stage In ('Approved','Funded','Underwriting Review')
+        application_date as date,
+        Sum(approvals) * 1.0/Sum(stage_underwriting_review + stage_approved + stage_funded) as approval_rate,
+        Sum(fundings)*1.0/Sum(stage_underwriting_review + stage_approved + stage_funded) As funding_rate
+        From daily_funnel_agg
         Group By date
+        Having Sum(stage_underwriting_review + stage_approved + stage_funded) > 0
         Order By Date DESC
         Limit 1"""
     
-    df = pd.read_sql(query, conn)
-    conn.close()
+    df = read_sql(query, db_path)
 
     if df.empty:
         print("⚠️ No recent application data found.")
@@ -47,17 +48,31 @@ def check_alerts(metrics):
 
     return alerts
 
-def save_alerts(alerts, output_path="data/alerts_log.txt"):
-    if not alerts:
-        return 
-    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    with open(output_path, "a", encoding="utf-8") as f:
-        for alert in alerts:
-            f.write(f"[{timestamp}] {alert}\n")
-    print(f"✅ Alerts logged to {output_path}")
+def alert_records(metrics):
+    """Structured form of the check_alerts breaches, for the alert store"""
+    records = []
+    for metric, threshold in [('approval_rate', APPROVAL_RATE_THRESHOLD), ('funding_rate', FUNDING_RATE_THRESHOLD)]:
+        if metrics[metric] < threshold:
+            label = metric.replace('_', ' ').capitalize()
+            records.append({
+                'metric': metric,
+                'segment': 'overall',
+                'value': float(metrics[metric]),
+                'threshold': threshold,
+                'severity': 'critical',
+                'message': f"⚠️ ALERT: {label} dropped to {metrics[metric]:.2%}",
+                'source': 'report_alerts',
+                'data_date': metrics['date'],
+            })
+    return records
+
+def save_alerts(records, db_path=ALERT_DB_PATH):
+    if records is None or len(records) == 0:
+        return
+    record_alerts(records, db_path)
 
 if __name__ == "__main__":
     metrics = get_current_metrics()
     if metrics is not None:
-        alerts = check_alerts(metrics)
-        save_alerts(alerts)    
\ No newline at end of file
+        check_alerts(metrics)
+        save_alerts(alert_records(metrics))
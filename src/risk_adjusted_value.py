@@ -0,0 +1,137 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.cohort_economics import FINE_COHORT_COLUMNS, STAGES, cohort_keys, decode_keys, label_cohorts
+from src.economic_impact import COST_PER_APPLICATION, LOST_STAGES, STAGE_IMPROVEMENTS, stage_key, top_k_rows
+from src.policy_simulator import LOSS_GIVEN_DEFAULT, default_probability
+
+RISK_COLUMNS = FINE_COHORT_COLUMNS + ['funded_amount', 'defaulted']
+# Example lifetime profit on a repaid loan, as a share of the funded amount
+REPAID_LOAN_MARGIN = 0.15
+# Funded share of the requested amount when a cohort has no funded loans (simulator mean)
+DEFAULT_FUNDED_SHARE = 0.95
+# Per-cohort outputs added on top of the cohort codes and key
+RISK_VALUE_COLUMNS = ([f"net_value_{stage_key(stage)}" for stage in LOST_STAGES]
+                      + ['recovered_volume', 'expected_default_loss', 'risk_adjusted_value', 'risk_adjusted_roi',
+                         'expected_default_rate', 'observed_default_rate'])
+
+
+def cohort_stage_arrays(df, dimensions=None):
+    """Cohort keys plus (cohorts x stages) counts, loan amounts and default-probability-weighted amounts"""
+    key = cohort_keys(df, dimensions)
+    cohorts, cohort_index = np.unique(key, return_inverse=True)
+    stage = pd.Categorical(df['funnel_stage'], categories=STAGES).codes.astype(np.int64)
+    valid = stage >= 0
+    cell = cohort_index[valid] * len(STAGES) + stage[valid]
+    size = len(cohorts) * len(STAGES)
+
+    loan = pd.to_numeric(df['loan_amount']).to_numpy(dtype=float)[valid]
+    pd_ = default_probability(pd.to_numeric(df['credit_score']).to_numpy(dtype=float)[valid],
+                              pd.to_numeric(df['dti_ratio']).to_numpy(dtype=float)[valid])
+    funded = np.nan_to_num(pd.to_numeric(df['funded_amount']).to_numpy(dtype=float)[valid])
+    defaulted = np.nan_to_num(pd.to_numeric(df['defaulted']).to_numpy(dtype=float)[valid])
+
+    def binned(weights=None):
+        return np.bincount(cell, weights=weights, minlength=size).reshape(-1, len(STAGES))
+
+    return cohorts, {
+        'count': binned(),
+        'amount': binned(loan),
+        'pd_amount': binned(loan * pd_),
+        'pd': binned(pd_),
+        'funded_amount': binned(funded),
+        'defaults': binned(defaulted),
+    }
+
+
+def expected_stage_value(arrays, profit_margin=REPAID_LOAN_MARGIN, lgd=LOSS_GIVEN_DEFAULT):
+    """Net expected profit recovered by improving each lost stage, shape (cohorts x lost stages)
+
+    Recovered applicants continue at their cohort's downstream conversion rate
+    to funding, are funded at the cohort's funded share of the requested amount
+    and then earn the margin if they repay or lose LGD of the amount if they
+    default, with the simulator's default probability of the applicants lost at
+    that stage. All cohorts and stages are computed as one set of array ops.
+    """
+    counts, amount, pd_amount = arrays['count'], arrays['amount'], arrays['pd_amount']
+    funded_col = len(LOST_STAGES)
+
+    # Applicants reaching each stage (stages are ordered, so a reverse cumulative sum)
+    reached = counts[:, ::-1].cumsum(axis=1)[:, ::-1]
+    funded = counts[:, [funded_col]]
+    pooled = funded.sum() / np.maximum(reached.sum(axis=0), 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        continuation = np.where(reached[:, 1:] > 0, funded / reached[:, 1:], pooled[1:])
+        funded_share = np.where(amount[:, funded_col] > 0,
+                                arrays['funded_amount'][:, funded_col] / amount[:, funded_col], DEFAULT_FUNDED_SHARE)
+
+    improvement = np.array([STAGE_IMPROVEMENTS[stage_key(stage)] for stage in LOST_STAGES])
+    recovered_share = improvement * continuation * funded_share[:, None]
+    lost_amount = amount[:, :funded_col]
+    lost_pd_amount = pd_amount[:, :funded_col]
+
+    recovered_volume = recovered_share * lost_amount
+    gross_profit = recovered_share * (lost_amount - lost_pd_amount) * profit_margin
+    default_loss = recovered_share * lost_pd_amount * lgd
+    return {
+        'recovered_volume': recovered_volume,
+        'gross_profit': gross_profit,
+        'expected_default_loss': default_loss,
+        'net_value': gross_profit - default_loss,
+    }
+
+
+def risk_adjusted_impact(df, dimensions=None, profit_margin=REPAID_LOAN_MARGIN, lgd=LOSS_GIVEN_DEFAULT):
+    """Risk-adjusted economic impact of every cohort, keyed like fine_grained_impact"""
+    start = time.perf_counter()
+    cohorts, arrays = cohort_stage_arrays(df, dimensions)
+    values = expected_stage_value(arrays, profit_margin, lgd)
+
+    impact = decode_keys(cohorts, dimensions)
+    impact['cohort_key'] = cohorts
+    impact['total_applications'] = arrays['count'].sum(axis=1)
+    for i, stage in enumerate(LOST_STAGES):
+        impact[f"net_value_{stage_key(stage)}"] = values['net_value'][:, i]
+    impact['recovered_volume'] = values['recovered_volume'].sum(axis=1)
+    impact['expected_default_loss'] = values['expected_default_loss'].sum(axis=1)
+    impact['risk_adjusted_value'] = values['net_value'].sum(axis=1)
+    impact['risk_adjusted_roi'] = impact['risk_adjusted_value'] / (impact['total_applications'] * COST_PER_APPLICATION)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        funded_col = len(LOST_STAGES)
+        # Model vs realized default rate of the cohort's funded loans
+        impact['expected_default_rate'] = arrays['pd'][:, funded_col] / arrays['count'][:, funded_col]
+        impact['observed_default_rate'] = arrays['defaults'][:, funded_col] / arrays['count'][:, funded_col]
+    print(f"🔹 Risk-adjusted value for {len(cohorts):,} cohorts in {time.perf_counter() - start:.2f}s")
+    return impact
+
+
+def stage_value_summary(impact):
+    """Net expected value of improving each stage, summed over cohorts, with the share of cohorts it helps"""
+    rows = []
+    for stage in LOST_STAGES:
+        values = impact[f"net_value_{stage_key(stage)}"]
+        rows.append({'stage': stage, 'net_value': values.sum(), 'positive_value': values.clip(lower=0).sum(),
+                     'share_of_cohorts_positive': (values > 0).mean()})
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from src.dataset import load_loan_data
+
+    parser = argparse.ArgumentParser(description="Default-loss-aware expected value of improving each funnel stage")
+    parser.add_argument("--db-path", default="data/loan_funnel.db")
+    parser.add_argument("--margin", type=float, default=REPAID_LOAN_MARGIN, help="profit margin on a repaid loan")
+    parser.add_argument("--lgd", type=float, default=LOSS_GIVEN_DEFAULT, help="share of a defaulted loan lost")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    pd.set_option('display.width', 200)
+    impact = risk_adjusted_impact(load_loan_data(RISK_COLUMNS, args.db_path), profit_margin=args.margin, lgd=args.lgd)
+    print(stage_value_summary(impact).round(3).to_string(index=False))
+    top = label_cohorts(top_k_rows(impact, args.top, 'risk_adjusted_value'))
+    print(top[['cohort', 'total_applications', 'recovered_volume', 'expected_default_loss', 'risk_adjusted_value',
+               'expected_default_rate', 'observed_default_rate']].round(3).to_string(index=False))
@@ -0,0 +1,248 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from src.daily_agg import ensure_daily_agg, last_complete_date
+from src.experiment_engine import EXPERIMENT_METRICS, MEASURES
+from src.sql_backend import read_sql
+
+STATE_TABLE = "sequential_state"
+TEST_KEYS = ['metric', 'control', 'treatment']
+
+ALPHA = 0.05
+# Prior scale of the mixture over the true rate difference (absolute, e.g. 0.05 = 5 points)
+MIXTURE_TAU = 0.05
+# Both arms need this many trials before a test may stop
+MIN_TRIALS = 100
+
+
+def daily_arm_counts(db_path="data/loan_funnel.db", after_date=None, through_date=None):
+    """Measures per application date and experiment arm, only for days after the last processed one"""
+    ensure_daily_agg(db_path)
+    conditions = []
+    if after_date is not None:
+        conditions.append(f"application_date > '{after_date}'")
+    if through_date is not None:
+        conditions.append(f"application_date <= '{through_date}'")
+    where = f"Where {' And '.join(conditions)}" if conditions else ""
+    return read_sql(f"""
+    Select application_date, experiment_group,
+        Sum(applications) as applications,
+        Sum(stage_underwriting_review + stage_approved + stage_funded) as decided,
+        Sum(approvals) as approvals,
+        Sum(fundings) as fundings,
+        Sum(defaults) as defaults
+    From daily_funnel_agg
+    {where}
+    Group By application_date, experiment_group
+    Order By application_date
+    """, db_path)
+
+
+def empty_state(tests):
+    """Fresh running totals for new (metric, control, treatment) tests"""
+    state = tests[TEST_KEYS].copy()
+    for column in ['successes_c', 'trials_c', 'successes_t', 'trials_t']:
+        state[column] = 0.0
+    state['p_value'] = 1.0
+    state['stopped_date'] = None
+    state['decision'] = None
+    state['last_date'] = None
+    return state
+
+
+def load_state(db_path="data/loan_funnel.db"):
+    conn = sqlite3.connect(db_path)
+    try:
+        exists = conn.execute(
+            "Select 1 From sqlite_master Where type = 'table' And name = ?", (STATE_TABLE,)
+        ).fetchone() is not None
+        if not exists:
+            return None
+        return pd.read_sql(f"Select * From {STATE_TABLE}", conn)
+    finally:
+        conn.close()
+
+
+def save_state(state, db_path="data/loan_funnel.db"):
+    conn = sqlite3.connect(db_path)
+    try:
+        state.to_sql(STATE_TABLE, conn, if_exists='replace', index=False)
+    finally:
+        conn.close()
+
+
+def mixture_likelihood_ratio(successes_c, trials_c, successes_t, trials_t, tau=MIXTURE_TAU):
+    """mSPRT statistic for the rate difference under a N(0, tau^2) mixture, element-wise
+
+    Uses the normal approximation to the difference of two proportions, so
+    1 / statistic is an always-valid p-value that may be checked after every day.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rate_c = successes_c / trials_c
+        rate_t = successes_t / trials_t
+        diff = rate_t - rate_c
+        variance = rate_c * (1 - rate_c) / trials_c + rate_t * (1 - rate_t) / trials_t
+        tau_sq = tau ** 2
+        log_ratio = 0.5 * np.log(variance / (variance + tau_sq)) + \
+            diff ** 2 * tau_sq / (2 * variance * (variance + tau_sq))
+    return np.exp(np.where(variance > 0, log_ratio, 0.0)), diff
+
+
+def run_sequential(state, daily, alpha=ALPHA, tau=MIXTURE_TAU, min_trials=MIN_TRIALS, metrics=EXPERIMENT_METRICS):
+    """Fold new days into the running totals and always-valid p-values of every test
+
+    Cumulative counts over the new days are one cumsum per arm; the always-valid
+    p-value is the running minimum of 1 / likelihood ratio, so it carries over
+    from the stored state without touching earlier days. A test stops on the
+    first day its p-value drops below `alpha`. Returns (state, path) where path
+    has one row per test and processed day.
+    """
+    days = np.sort(daily['application_date'].unique())
+    wide = daily.pivot_table(index='experiment_group', columns='application_date', values=MEASURES,
+                             aggfunc='sum', fill_value=0)
+
+    def cumulative(arm, measure):
+        if arm not in wide.index:
+            return np.zeros(len(days))
+        return np.cumsum(wide.loc[arm, measure].reindex(days, fill_value=0).to_numpy(dtype=float))
+
+    successes_c, trials_c, successes_t, trials_t = [], [], [], []
+    for test in state.itertuples(index=False):
+        successes, trials = metrics[test.metric]
+        successes_c.append(cumulative(test.control, successes))
+        trials_c.append(cumulative(test.control, trials))
+        successes_t.append(cumulative(test.treatment, successes))
+        trials_t.append(cumulative(test.treatment, trials))
+
+    # tests x days running totals, offset by what earlier runs already counted
+    successes_c = np.vstack(successes_c) + state['successes_c'].to_numpy(dtype=float)[:, None]
+    trials_c = np.vstack(trials_c) + state['trials_c'].to_numpy(dtype=float)[:, None]
+    successes_t = np.vstack(successes_t) + state['successes_t'].to_numpy(dtype=float)[:, None]
+    trials_t = np.vstack(trials_t) + state['trials_t'].to_numpy(dtype=float)[:, None]
+
+    ratio, diff = mixture_likelihood_ratio(successes_c, trials_c, successes_t, trials_t, tau)
+    ready = (trials_c >= min_trials) & (trials_t >= min_trials)
+    daily_p = np.where(ready, np.minimum(1.0, 1.0 / ratio), 1.0)
+    p_value = np.minimum.accumulate(
+        np.minimum(daily_p, state['p_value'].to_numpy(dtype=float)[:, None]), axis=1)
+
+    # First crossing per test, unless it stopped in an earlier run
+    crossed = p_value < alpha
+    first = crossed.argmax(axis=1)
+    newly_stopped = crossed.any(axis=1) & state['stopped_date'].isna().to_numpy()
+    rows = np.flatnonzero(newly_stopped)
+
+    state = state.copy()
+    state['successes_c'], state['trials_c'] = successes_c[:, -1], trials_c[:, -1]
+    state['successes_t'], state['trials_t'] = successes_t[:, -1], trials_t[:, -1]
+    state['p_value'] = p_value[:, -1]
+    state['stopped_date'] = state['stopped_date'].astype(object)
+    state['decision'] = state['decision'].astype(object)
+    state.loc[rows, 'stopped_date'] = days[first[rows]]
+    state.loc[rows, 'decision'] = np.where(diff[rows, first[rows]] > 0, 'treatment higher', 'treatment lower')
+    state['last_date'] = days[-1]
+
+    path = pd.DataFrame({
+        'metric': np.repeat(state['metric'].to_numpy(), len(days)),
+        'control': np.repeat(state['control'].to_numpy(), len(days)),
+        'treatment': np.repeat(state['treatment'].to_numpy(), len(days)),
+        'date': np.tile(days, len(state)),
+        'control_rate': (successes_c / trials_c).ravel(),
+        'treatment_rate': (successes_t / trials_t).ravel(),
+        'difference': diff.ravel(),
+        'p_value': p_value.ravel(),
+        'stop': crossed.ravel(),
+    })
+    return state, path
+
+
+def initial_tests(daily, control="A", metrics=EXPERIMENT_METRICS):
+    treatments = sorted(set(daily['experiment_group']) - {control})
+    return pd.DataFrame(
+        [(metric, control, treatment) for metric in metrics for treatment in treatments],
+        columns=TEST_KEYS
+    )
+
+
+def sequential_path(db_path="data/loan_funnel.db", control="A", alpha=ALPHA, tau=MIXTURE_TAU,
+                    min_trials=MIN_TRIALS):
+    """Full day-by-day always-valid history, computed in memory without touching the stored state"""
+    daily = daily_arm_counts(db_path)
+    if daily.empty:
+        return None, None
+    return run_sequential(empty_state(initial_tests(daily, control)), daily, alpha, tau, min_trials)
+
+
+def update_sequential_state(db_path="data/loan_funnel.db", control="A", through_date=None, reset=False,
+                            alpha=ALPHA, tau=MIXTURE_TAU, min_trials=MIN_TRIALS):
+    """Process every complete day since the last run (the whole history on the first run or reset) and persist state
+
+    The newest day is still receiving rows, so it is folded in by a later run
+    rather than counted now and skipped when its late rows arrive.
+    """
+    state = None if reset else load_state(db_path)
+    if state is not None and not state['metric'].isin(list(EXPERIMENT_METRICS)).all():
+        # A stored metric is no longer defined (e.g. renamed): replay so every test covers the full history
+        state = None
+    after_date = None
+    if state is not None and state['last_date'].notna().any():
+        after_date = state['last_date'].dropna().max()
+
+    complete = last_complete_date(db_path)
+    if complete is None:
+        print("✅ Sequential tests are up to date.")
+        return state
+    through_date = complete if through_date is None else min(str(through_date), complete)
+
+    daily = daily_arm_counts(db_path, after_date, through_date)
+    if daily.empty:
+        print("✅ Sequential tests are up to date.")
+        return state
+
+    tests = initial_tests(daily, control)
+    if state is None:
+        state = empty_state(tests)
+    else:
+        new_tests = tests.merge(state[TEST_KEYS], on=TEST_KEYS, how='left', indicator=True)
+        new_tests = new_tests[new_tests['_merge'] == 'left_only'].drop(columns='_merge')
+        state = pd.concat([state, empty_state(new_tests)], ignore_index=True)
+
+    state, path = run_sequential(state, daily, alpha, tau, min_trials)
+    save_state(state, db_path)
+    print(f"🔹 Sequential tests updated through {state['last_date'].iloc[0]} ({path['date'].nunique()} new day(s))")
+    return state
+
+
+def format_decisions(state, alpha=ALPHA):
+    """One line per test: stopped early with its direction, or still running"""
+    lines = []
+    for test in state.itertuples(index=False):
+        label = test.metric.replace('_', ' ').capitalize()
+        arms = f"{test.treatment} vs {test.control}"
+        if test.stopped_date is not None and not pd.isna(test.stopped_date):
+            lines.append(f"✅ {label} ({arms}): stop — {test.decision} since {test.stopped_date} "
+                         f"(always-valid p={test.p_value:.4f} < {alpha})")
+        else:
+            lines.append(f"🔹 {label} ({arms}): continue — always-valid p={test.p_value:.4f}, "
+                         f"{int(test.trials_c):,} vs {int(test.trials_t):,} trials")
+    return lines
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Always-valid (mSPRT) monitoring of the A/B experiment")
+    parser.add_argument("--db-path", default="data/loan_funnel.db")
+    parser.add_argument("--control", default="A")
+    parser.add_argument("--through", default=None, help="process days up to this date (YYYY-MM-DD)")
+    parser.add_argument("--reset", action="store_true", help="discard stored state and replay the full history")
+    parser.add_argument("--alpha", type=float, default=ALPHA)
+    parser.add_argument("--tau", type=float, default=MIXTURE_TAU)
+    args = parser.parse_args()
+
+    state = update_sequential_state(args.db_path, args.control, args.through, args.reset, args.alpha, args.tau)
+    if state is not None:
+        for line in format_decisions(state, args.alpha):
+            print(line)
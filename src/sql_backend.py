@@ -0,0 +1,156 @@
+import os
+import re
+import sqlite3
+import threading
+
+import pandas as pd
+
+# Execution backend for the SQL metrics layer:
+#   sqlite          - the SQLite file, row-at-a-time (default)
+#   duckdb          - DuckDB scanning the SQLite file (needs the sqlite extension)
+#   duckdb-parquet  - DuckDB over the Parquet columnar store, other tables from SQLite
+BACKENDS = ("sqlite", "duckdb", "duckdb-parquet")
+
+PARQUET_DIR = "data/parquet"
+
+_backend = os.environ.get("LOAN_FUNNEL_SQL_BACKEND", "sqlite")
+_threads = os.environ.get("LOAN_FUNNEL_SQL_THREADS")
+_parquet_root = os.environ.get("LOAN_FUNNEL_PARQUET_DIR", PARQUET_DIR)
+
+
+def set_backend(name, threads=None, parquet_root=None):
+    """Select the engine every metrics query runs on"""
+    global _backend, _threads, _parquet_root
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown SQL backend '{name}'. Choose one of {BACKENDS}.")
+    _backend = name
+    if threads is not None:
+        _threads = threads
+    if parquet_root is not None:
+        _parquet_root = parquet_root
+
+
+def get_backend():
+    return _backend
+
+
+_STRFTIME = re.compile(r"strftime\(\s*('[^']*')\s*,\s*([^()]+?)\s*\)", re.IGNORECASE)
+_JULIANDAY = re.compile(r"julianday\(\s*([^()]+?)\s*\)", re.IGNORECASE)
+_CAST_AVG_INT = re.compile(r"cast\(\s*(avg\([^()]*\))\s+as\s+int\s*\)", re.IGNORECASE)
+
+
+def translate_to_duckdb(query):
+    """Rewrite the SQLite date functions used by the metrics queries into DuckDB equivalents"""
+    query = _STRFTIME.sub(r"strftime(CAST(\2 AS DATE), \1)", query)
+    query = _JULIANDAY.sub(r"julian(CAST(\1 AS DATE))", query)
+    # SQLite truncates when casting to int, DuckDB rounds
+    query = _CAST_AVG_INT.sub(r"CAST(trunc(\1) AS INTEGER)", query)
+    return query
+
+
+_duckdb_connections = {}
+_duckdb_lock = threading.Lock()
+
+
+def _connection_key(db_path, backend, parquet_root):
+    return os.path.abspath(db_path), backend, os.path.abspath(parquet_root)
+
+
+def _duckdb_database(db_path, backend, parquet_root):
+    """Shared (connection, search_path, sqlite_attached) for a database and backend, opened on first use"""
+    import duckdb
+
+    key = _connection_key(db_path, backend, parquet_root)
+    with _duckdb_lock:
+        if key not in _duckdb_connections:
+            con = duckdb.connect()
+            if _threads:
+                con.execute(f"SET GLOBAL threads TO {int(_threads)}")
+
+            search_path, attached = "memory.main", False
+            try:
+                con.execute(f"ATTACH '{db_path}' AS funnel (TYPE sqlite, READ_ONLY)")
+                search_path, attached = "memory.main,funnel.main", True
+            except duckdb.Error:
+                if backend == "duckdb":
+                    raise
+
+            if backend == "duckdb-parquet":
+                # Views in memory.main are found before the SQLite tables of the same name
+                con.execute(f"""
+                    Create Or Replace View memory.main.loan_applications As
+                    Select * Exclude (application_month)
+                    From read_parquet('{parquet_root}/**/*.parquet', hive_partitioning = true)
+                """)
+            _duckdb_connections[key] = (con, search_path, attached)
+        return _duckdb_connections[key]
+
+
+def _duckdb_connection(db_path, backend, parquet_root):
+    con, search_path, _ = _duckdb_database(db_path, backend, parquet_root)
+    # Cursors give each caller (thread) its own session on the shared database
+    cursor = con.cursor()
+    cursor.execute(f"SET search_path = '{search_path}'")
+    return cursor
+
+
+_TABLE_REFERENCE = re.compile(r"\b(?:From|Join)\s+([A-Za-z_]\w*)", re.IGNORECASE)
+# Tables the Parquet store holds; everything else (daily_funnel_agg, funnel_events, ...) lives only in SQLite
+PARQUET_TABLES = {'loan_applications'}
+_stale_warned = set()
+
+
+def _sqlite_tables(query, db_path):
+    """SQLite tables a query reads"""
+    conn = sqlite3.connect(db_path)
+    try:
+        tables = {row[0] for row in conn.execute("Select name From sqlite_master Where type = 'table'")}
+    finally:
+        conn.close()
+    return {name for name in _TABLE_REFERENCE.findall(query) if name in tables}
+
+
+def _parquet_can_serve(query, db_path, parquet_root, attached):
+    """duckdb-parquet answers a query only if its Parquet tables match the data version and its other tables are reachable"""
+    from src.columnar_store import columnar_store_exists
+    from src.compute_metrics import get_data_version
+
+    tables = _sqlite_tables(query, db_path)
+    if not attached and tables - PARQUET_TABLES:
+        return False
+    if tables & PARQUET_TABLES:
+        version = get_data_version(db_path)
+        if not columnar_store_exists(parquet_root, version):
+            if (parquet_root, version) not in _stale_warned:
+                _stale_warned.add((parquet_root, version))
+                print(f"⚠️ {parquet_root} does not match data version {version}; reading loan_applications from SQLite")
+            return False
+    return True
+
+
+def read_sql(query, db_path="data/loan_funnel.db", backend=None, parquet_root=None):
+    """Run a metrics query on the selected backend and return a DataFrame
+
+    duckdb-parquet falls back to SQLite when the Parquet store is stale or the
+    query needs a SQLite-only table that DuckDB could not attach.
+    """
+    backend = backend or _backend
+    parquet_root = parquet_root or _parquet_root
+    if backend == "duckdb-parquet":
+        attached = _duckdb_database(db_path, backend, parquet_root)[2]
+        if not _parquet_can_serve(query, db_path, parquet_root, attached):
+            backend = "sqlite"
+    if backend == "sqlite":
+        conn = sqlite3.connect(db_path)
+        try:
+            return pd.read_sql(query, conn)
+        finally:
+            conn.close()
+
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown SQL backend '{backend}'. Choose one of {BACKENDS}.")
+    cursor = _duckdb_connection(db_path, backend, parquet_root)
+    try:
+        return cursor.execute(translate_to_duckdb(query)).df()
+    finally:
+        cursor.close()
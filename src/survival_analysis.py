@@ -0,0 +1,229 @@
+import sqlite3
+import time
+
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+
+from src.cohorts import COHORT_BANDS, cohort_codes, code_labels
+from src.event_log import EVENT_TABLE, ensure_event_log
+
+# Outcome codes of an applicant's time in the funnel; rejection is an exit the applicant did not choose,
+# so it competes with dropping out instead of counting as one
+CENSORED, FUNDED, DROPPED, REJECTED = 0, 1, 2, 3
+OUTCOMES = ['censored', 'funded', 'dropped', 'rejected']
+EXITS = [FUNDED, DROPPED, REJECTED]
+# Undecided applicants seen this recently may still progress, so they are censored rather than dropped
+OPEN_WINDOW_DAYS = 14
+# Days after this share one hazard interval in the discrete-time model
+MAX_HAZARD_DAY = 14
+HAZARD_DIMENSIONS = ['credit_group', 'dti_group', 'employment_status']
+
+
+def load_durations(db_path="data/loan_funnel.db"):
+    """Whole days each applicant spent in the funnel and how they left it, from the stage event log
+
+    Rejection comes from the application's decision outcome and dates from the
+    applicant's last event.
+    """
+    ensure_event_log(db_path)
+    conn = sqlite3.connect(db_path)
+    try:
+        spans = pd.read_sql(f"""
+        Select e.applicant_id,
+            julianday(max(e.event_time)) - julianday(min(e.event_time)) as duration,
+            julianday(max(e.event_time)) as last_seen,
+            max(CASE WHEN e.stage = 'Funded' THEN 1 ELSE 0 END) as funded,
+            max(CASE WHEN a.decision_outcome = 'Rejected' THEN 1 ELSE 0 END) as rejected
+        From {EVENT_TABLE} e
+        Left Join loan_applications a On a.applicant_id = e.applicant_id
+        Group By e.applicant_id
+        """, conn)
+    finally:
+        conn.close()
+
+    open_since = spans['last_seen'].max() - OPEN_WINDOW_DAYS
+    outcome = np.select([spans['funded'] == 1, spans['rejected'] == 1, spans['last_seen'] > open_since],
+                        [FUNDED, REJECTED, CENSORED], DROPPED)
+    return pd.DataFrame({
+        'applicant_id': spans['applicant_id'],
+        'duration_days': np.floor(spans['duration'].to_numpy()).astype(np.int64),
+        'outcome': outcome.astype(np.int8),
+    })
+
+
+def event_counts(durations, cohort=None, n_cohorts=1):
+    """(cohorts x days x outcomes) applicant counts by day of exit and outcome"""
+    cohort = np.zeros(len(durations), dtype=np.int64) if cohort is None else np.asarray(cohort, dtype=np.int64)
+    days = durations['duration_days'].to_numpy()
+    n_days = int(days.max()) + 1 if len(days) else 1
+    cell = (cohort * n_days + days) * len(OUTCOMES) + durations['outcome'].to_numpy()
+    return np.bincount(cell, minlength=n_cohorts * n_days * len(OUTCOMES)).reshape(n_cohorts, n_days, len(OUTCOMES))
+
+
+def kaplan_meier(counts):
+    """Kaplan-Meier curves and competing-risk cumulative incidence for every cohort at once
+
+    Survival is the probability of still being in the funnel after each day
+    (any exit counts as the event), with Greenwood standard errors; the
+    cumulative incidence of funding, dropping out and rejection splits
+    1 - survival by cause from the cause-specific daily hazards.
+    """
+    exits = counts.sum(axis=2)
+    at_risk = exits[:, ::-1].cumsum(axis=1)[:, ::-1]
+    events = counts[:, :, EXITS].sum(axis=2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        hazard = np.where(at_risk > 0, events / at_risk, 0.0)
+        cause_hazard = np.where(at_risk[:, :, None] > 0, counts / at_risk[:, :, None], 0.0)
+        greenwood = np.where(at_risk > events, events / (at_risk * (at_risk - events)), 0.0).cumsum(axis=1)
+
+    survival = np.cumprod(1 - hazard, axis=1)
+    previous = np.concatenate([np.ones((len(counts), 1)), survival[:, :-1]], axis=1)
+    curves = {'at_risk': at_risk}
+    curves.update({OUTCOMES[outcome]: counts[:, :, outcome] for outcome in EXITS + [CENSORED]})
+    curves['survival'] = survival
+    curves['survival_se'] = survival * np.sqrt(greenwood)
+    for outcome in EXITS:
+        curves[f"cif_{OUTCOMES[outcome]}"] = np.cumsum(previous * cause_hazard[:, :, outcome], axis=1)
+    return curves
+
+
+def km_frame(curves, labels):
+    """Long table (cohort, day, ...) of Kaplan-Meier output, dropping days after a cohort's last applicant"""
+    n_cohorts, n_days = curves['at_risk'].shape
+    frame = pd.DataFrame({name: values.ravel() for name, values in curves.items()})
+    frame.insert(0, 'day', np.tile(np.arange(n_days), n_cohorts))
+    frame.insert(0, 'cohort', np.repeat(np.asarray(labels, dtype=object), n_days))
+    return frame[frame['at_risk'] > 0].reset_index(drop=True)
+
+
+def median_days(curves, labels):
+    """First day each cohort's survival falls to one half (NaN if it never does)"""
+    below = curves['survival'] <= 0.5
+    return pd.Series(np.where(below.any(axis=1), below.argmax(axis=1), np.nan),
+                     index=pd.Index(np.asarray(labels, dtype=object), name='cohort'), name='median_days')
+
+
+def cohort_survival(durations, df, dimension=None):
+    """Kaplan-Meier output per band of one cohort dimension (or overall), joining durations to applicants"""
+    if dimension is None:
+        curves = kaplan_meier(event_counts(durations))
+        return km_frame(curves, ['All']), median_days(curves, ['All'])
+
+    joined = durations.merge(df[['applicant_id', COHORT_BANDS[dimension]['column']]], on='applicant_id')
+    codes = cohort_codes(joined, [dimension]).iloc[:, 0].to_numpy()
+    labels = code_labels(dimension, np.arange(len(COHORT_BANDS[dimension]['labels'])))
+    curves = kaplan_meier(event_counts(joined, codes, len(labels)))
+    return km_frame(curves, labels), median_days(curves, labels)
+
+
+def person_period_counts(durations, df, dimensions=HAZARD_DIMENSIONS, event=DROPPED, max_day=MAX_HAZARD_DAY):
+    """At-risk and event counts per (cohort cell, day), the sufficient statistics of the hazard model"""
+    columns = [COHORT_BANDS[dimension]['column'] for dimension in dimensions]
+    joined = durations.merge(df[['applicant_id'] + columns], on='applicant_id')
+    codes = cohort_codes(joined, dimensions)
+    sizes = [len(COHORT_BANDS[dimension]['labels']) for dimension in dimensions]
+    cell = np.ravel_multi_index(tuple(codes.iloc[:, i].to_numpy(dtype=np.int64) for i in range(len(dimensions))), sizes)
+
+    counts = event_counts(joined, cell, int(np.prod(sizes)))
+    curves = kaplan_meier(counts)
+    at_risk, events = curves['at_risk'], counts[:, :, event]
+    # Pool the sparse tail into one interval; an applicant counts once per tail day at risk, as in person-period data
+    if at_risk.shape[1] > max_day + 1:
+        at_risk = np.concatenate([at_risk[:, :max_day], at_risk[:, max_day:].sum(axis=1, keepdims=True)], axis=1)
+        events = np.concatenate([events[:, :max_day], events[:, max_day:].sum(axis=1, keepdims=True)], axis=1)
+
+    cells, days = np.nonzero(at_risk)
+    grid = pd.DataFrame(np.array(np.unravel_index(cells, sizes)).T, columns=dimensions)
+    grid['day'] = days
+    grid['at_risk'] = at_risk[cells, days]
+    grid['events'] = events[cells, days]
+    return grid
+
+
+def discrete_hazard_model(grid, dimensions=HAZARD_DIMENSIONS, max_iter=50, tol=1e-8):
+    """Logit discrete-time hazard fitted by IRLS on grouped binomial counts
+
+    logit h(day, cohort) = day effect + one effect per band (first observed band
+    as reference); the fit only touches one row per (cohort cell, day), so its
+    cost does not grow with the number of applicants. Days without any event
+    have a zero hazard and say nothing about the band effects, so they are left out.
+    """
+    event_days = grid.groupby('day')['events'].transform('sum') > 0
+    grid = grid[event_days]
+    day_dummies = pd.get_dummies(grid['day'], prefix='day', dtype=float)
+    band_dummies = []
+    for dimension in dimensions:
+        dummies = pd.get_dummies(code_labels(dimension, grid[dimension].to_numpy()), prefix=dimension,
+                                 prefix_sep=': ', dtype=float).set_index(grid.index)
+        band_dummies.append(dummies.loc[:, dummies.sum() > 0].iloc[:, 1:])
+    design = pd.concat([day_dummies] + band_dummies, axis=1)
+    X = design.to_numpy()
+    n = grid['at_risk'].to_numpy(dtype=float)
+    y = grid['events'].to_numpy(dtype=float)
+
+    beta = np.zeros(X.shape[1])
+    for _ in range(max_iter):
+        p = 1 / (1 + np.exp(-(X @ beta)))
+        weight = np.maximum(n * p * (1 - p), 1e-10)
+        information = X.T @ (weight[:, None] * X) + 1e-8 * np.eye(X.shape[1])
+        step = np.linalg.solve(information, X.T @ (y - n * p))
+        beta += step
+        if np.abs(step).max() < tol:
+            break
+
+    se = np.sqrt(np.diag(np.linalg.inv(information)))
+    z = beta / se
+    return pd.DataFrame({
+        'term': design.columns,
+        'coefficient': beta,
+        'se': se,
+        'odds_ratio': np.exp(beta),
+        'p_value': 2 * norm.sf(np.abs(z)),
+    })
+
+
+def run_survival_analysis(df, db_path="data/loan_funnel.db", dimensions=None, hazard_dimensions=HAZARD_DIMENSIONS):
+    """Kaplan-Meier curves for every cohort dimension and a dropout hazard model, for the Risk page"""
+    start = time.perf_counter()
+    durations = load_durations(db_path)
+    dimensions = dimensions or list(COHORT_BANDS)
+
+    overall, overall_median = cohort_survival(durations, df)
+    km, medians = {}, {}
+    for dimension in dimensions:
+        km[dimension], medians[dimension] = cohort_survival(durations, df, dimension)
+
+    hazard = discrete_hazard_model(person_period_counts(durations, df, hazard_dimensions), hazard_dimensions)
+    outcome_counts = pd.Series(np.bincount(durations['outcome'], minlength=len(OUTCOMES)), index=OUTCOMES)
+    print(f"🔹 Survival analysis for {len(durations):,} applicants in {time.perf_counter() - start:.2f}s")
+    return {
+        'overall': overall,
+        'overall_median': overall_median,
+        'km': km,
+        'median_days': medians,
+        'hazard_model': hazard,
+        'outcomes': outcome_counts,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from src.dataset import load_loan_data
+
+    parser = argparse.ArgumentParser(description="Kaplan-Meier curves and discrete-time dropout hazards per cohort")
+    parser.add_argument("--db-path", default="data/loan_funnel.db")
+    parser.add_argument("--dimension", default="credit_group", choices=list(COHORT_BANDS))
+    args = parser.parse_args()
+
+    pd.set_option('display.width', 200)
+    columns = ['applicant_id'] + [band['column'] for band in COHORT_BANDS.values()]
+    results = run_survival_analysis(load_loan_data(columns, args.db_path), args.db_path, [args.dimension])
+    print("🔹 Outcomes:", results['outcomes'].to_dict())
+    print(f"🔹 Median days in funnel by {args.dimension}:")
+    print(results['median_days'][args.dimension].to_string())
+    curves = results['km'][args.dimension]
+    print(curves[curves['day'].isin([0, 1, 3, 7, 14])].round(3).to_string(index=False))
+    print("🔹 Dropout hazard model (odds ratios vs the reference band):")
+    print(results['hazard_model'].round(3).to_string(index=False))
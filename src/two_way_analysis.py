@@ -1,6 +1,7 @@
-import sqlite3
 import pandas as pd
 
+from src.sql_backend import read_sql
+
 
 def two_interaction(db_path="data/loan_funnel.db", group1=None, group2=None):
     """
@@ -13,7 +14,6 @@ def two_interaction(db_path="data/loan_funnel.db", group1=None, group2=None):
     
     If group1 and group2 are None, returns all possible two-way interactions
     """
-    conn = sqlite3.connect(db_path)
     
     # Base query that creates all cohort data
     base_query = """
@@ -75,8 +75,7 @@ def two_interaction(db_path="data/loan_funnel.db", group1=None, group2=None):
         GROUP BY {group1}, {group2}
         ORDER BY approval_rate DESC;
         """
-        result = pd.read_sql(query, conn)
-        conn.close()
+        result = read_sql(query, db_path)
         return result
     
     # If no specific groups provided, return all key two-way interactions
@@ -112,9 +111,8 @@ def two_interaction(db_path="data/loan_funnel.db", group1=None, group2=None):
             GROUP BY {var1}, {var2}
             ORDER BY approval_rate DESC;
             """
-            results[interaction_name] = pd.read_sql(query, conn)
+            results[interaction_name] = read_sql(query, db_path)
         
-        conn.close()
         return results
 
 def visualize_interaction(interaction_df, var1_name, var2_name):
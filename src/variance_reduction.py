@@ -0,0 +1,148 @@
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+
+from src.cohorts import CODE_COLUMNS, band_code_sql
+from src.sql_backend import read_sql
+
+# metric -> (outcome, population) SQL conditions on loan_applications. Populations
+# must be fixed before assignment: funded applicants depend on the arm's policy, so
+# adjusting a per-funded default rate for credit and DTI would remove the policy
+# effect itself. Defaults are measured per decided applicant instead.
+VR_METRICS = {
+    'approval_rate': ("decision_outcome = 'Approved'",
+                      "funnel_stage In ('Underwriting Review', 'Approved', 'Funded')"),
+    'default_per_decided': ("defaulted = 1",
+                            "funnel_stage In ('Underwriting Review', 'Approved', 'Funded')"),
+}
+# Pre-assignment covariates for the regression adjustment
+COVARIATES = ['credit_score', 'dti_ratio']
+
+# Strata codes, the credit_group / dti_group cohort band codes
+STRATA_SQL = {CODE_COLUMNS[dimension]: band_code_sql(dimension) for dimension in ['credit_group', 'dti_group']}
+
+
+def _moment_columns(metric, outcome, population):
+    """Sum expressions for n, y, x, x x' and x y over one metric's population"""
+    def total(expression, name):
+        return f"Sum(CASE WHEN {population} THEN {expression} ELSE 0 END) as {metric}__{name}"
+
+    columns = [total("1", "n"), total(f"CASE WHEN {outcome} THEN 1 ELSE 0 END", "y")]
+    for i, x in enumerate(COVARIATES):
+        columns.append(total(x, f"x{i}"))
+        columns.append(total(f"CASE WHEN {outcome} THEN {x} ELSE 0 END", f"x{i}y"))
+        for j in range(i, len(COVARIATES)):
+            columns.append(total(f"{x} * {COVARIATES[j]}", f"x{i}x{j}"))
+    return columns
+
+
+def load_sufficient_stats(db_path="data/loan_funnel.db", metrics=VR_METRICS):
+    """Per (arm, credit band, DTI band) moments for every metric, from a single scan of loan_applications"""
+    columns = [column for metric, (outcome, population) in metrics.items()
+               for column in _moment_columns(metric, outcome, population)]
+    strata = ", ".join(f"{expression} as {code}" for code, expression in STRATA_SQL.items())
+    return read_sql(f"""
+    Select experiment_group, {strata},
+        {', '.join(columns)}
+    From loan_applications
+    Group By experiment_group, {', '.join(STRATA_SQL)}
+    """, db_path)
+
+
+def _metric_moments(stats, metric):
+    """Arrays of n, sum y, sum x (k), sum xx' (k x k) and sum xy (k) for each row of stats"""
+    k = len(COVARIATES)
+    n = stats[f"{metric}__n"].to_numpy(dtype=float)
+    y = stats[f"{metric}__y"].to_numpy(dtype=float)
+    x = np.column_stack([stats[f"{metric}__x{i}"] for i in range(k)]).astype(float)
+    xy = np.column_stack([stats[f"{metric}__x{i}y"] for i in range(k)]).astype(float)
+    xx = np.empty((len(stats), k, k))
+    for i in range(k):
+        for j in range(i, k):
+            xx[:, i, j] = xx[:, j, i] = stats[f"{metric}__x{i}x{j}"].to_numpy(dtype=float)
+    return n, y, x, xx, xy
+
+
+def _result(method, estimate, se, baseline_se, alpha):
+    z = estimate / se
+    z_crit = norm.ppf(1 - alpha / 2)
+    variance_ratio = (se / baseline_se) ** 2
+    return {
+        'method': method,
+        'difference': estimate,
+        'se': se,
+        'ci_lower': estimate - z_crit * se,
+        'ci_upper': estimate + z_crit * se,
+        'p_value': 2 * norm.sf(abs(z)),
+        'variance_reduction': 1 - variance_ratio,
+        # Applicants needed for the same precision, relative to the unadjusted test
+        'sample_size_factor': variance_ratio,
+    }
+
+
+def reduced_variance_tests(stats, metric, control="A", treatment="B", alpha=0.05):
+    """Unadjusted, post-stratified and CUPED estimates of the treatment - control difference"""
+    stats = stats[stats['experiment_group'].isin([control, treatment])]
+    n, y, x, xx, xy = _metric_moments(stats, metric)
+    is_treatment = (stats['experiment_group'] == treatment).to_numpy()
+
+    # Arm totals: collapse the strata by summing moments
+    arms = [~is_treatment, is_treatment]
+    arm_n = np.array([n[a].sum() for a in arms])
+    arm_y = np.array([y[a].sum() for a in arms])
+    arm_x = np.array([x[a].sum(axis=0) for a in arms])
+    arm_xx = np.array([xx[a].sum(axis=0) for a in arms])
+    arm_xy = np.array([xy[a].sum(axis=0) for a in arms])
+
+    mean_y = arm_y / arm_n
+    var_y = (arm_y - arm_y * mean_y) / (arm_n - 1)  # outcome is 0/1, so sum y^2 = sum y
+    unadjusted = mean_y[1] - mean_y[0]
+    unadjusted_se = np.sqrt((var_y / arm_n).sum())
+    results = [_result('unadjusted', unadjusted, unadjusted_se, unadjusted_se, alpha)]
+
+    # Post-stratification on credit x DTI bands, weights from both arms combined
+    keys = ['credit_code', 'dti_code']
+    cells = stats[keys].reset_index(drop=True).assign(n=n, y=y, arm=is_treatment.astype(int))
+    wide = cells.pivot_table(index=keys, columns='arm', values=['n', 'y'], aggfunc='sum', fill_value=0)
+    stratum_n = wide['n'].to_numpy(dtype=float)
+    stratum_y = wide['y'].to_numpy(dtype=float)
+    both = (stratum_n > 0).all(axis=1)
+    stratum_n, stratum_y = stratum_n[both], stratum_y[both]
+    weight = stratum_n.sum(axis=1) / stratum_n.sum()
+    rate = stratum_y / stratum_n
+    stratified = (weight * (rate[:, 1] - rate[:, 0])).sum()
+    stratified_se = np.sqrt((weight ** 2 * (rate * (1 - rate) / stratum_n).sum(axis=1)).sum())
+    results.append(_result('stratified', stratified, stratified_se, unadjusted_se, alpha))
+
+    # CUPED: regress the outcome on the covariates with the within-arm pooled covariance
+    mean_x = arm_x / arm_n[:, None]
+    cov_xx = arm_xx - arm_n[:, None, None] * mean_x[:, :, None] * mean_x[:, None, :]
+    cov_xy = arm_xy - arm_n[:, None] * mean_x * mean_y[:, None]
+    theta = np.linalg.solve(cov_xx.sum(axis=0), cov_xy.sum(axis=0))
+    overall_x = arm_x.sum(axis=0) / arm_n.sum()
+    adjusted = mean_y - (mean_x - overall_x) @ theta
+    residual_var = (var_y * (arm_n - 1) - 2 * cov_xy @ theta
+                    + np.einsum('i,aij,j->a', theta, cov_xx, theta)) / (arm_n - 1)
+    cuped = adjusted[1] - adjusted[0]
+    cuped_se = np.sqrt((residual_var / arm_n).sum())
+    results.append(_result('cuped', cuped, cuped_se, unadjusted_se, alpha))
+
+    frame = pd.DataFrame(results)
+    frame.insert(0, 'metric', metric)
+    return frame
+
+
+def analyze_with_variance_reduction(db_path="data/loan_funnel.db", control="A", treatment="B", alpha=0.05,
+                                    metrics=VR_METRICS):
+    """Variance-reduced A/B results for every metric from one sufficient-statistics query"""
+    stats = load_sufficient_stats(db_path, metrics)
+    results = pd.concat([reduced_variance_tests(stats, metric, control, treatment, alpha) for metric in metrics],
+                        ignore_index=True)
+    print("🔹 Variance-Reduced A/B Tests:")
+    print(results[['metric', 'method', 'difference', 'se', 'p_value', 'variance_reduction']].round(4).to_string(index=False))
+    return results
+
+
+if __name__ == "__main__":
+    pd.set_option('display.width', 200)
+    analyze_with_variance_reduction()
@@ -0,0 +1,34 @@
+import pandas as pd
+import pytest
+
+from src.compute_metrics import load_data_to_sqlite
+from src.generate_data import generate_applications
+
+
+@pytest.fixture
+def applications(tmp_path):
+    """Synthetic applications in the shape the CSV ingest produces"""
+    csv_path = tmp_path / "applications.csv"
+    generate_applications(n=6000, seed=11, start_date='-60d').to_csv(csv_path, index=False)
+    return pd.read_csv(csv_path)
+
+
+@pytest.fixture
+def load_db(tmp_path):
+    """Load application rows into a fresh database under tmp_path and return its path"""
+    def load(df, name):
+        csv_path = tmp_path / f"{name}.csv"
+        df.to_csv(csv_path, index=False)
+        db_path = str(tmp_path / f"{name}.db")
+        load_data_to_sqlite(str(csv_path), db_path, parquet_root=None, events_csv_path=None)
+        return db_path
+    return load
+
+
+def split_partial_day(df):
+    """Rows through half of a middle day, and the rest"""
+    dates = sorted(df['application_date'].unique())
+    split_day = dates[len(dates) // 2]
+    on_split_day = df.index[df['application_date'] == split_day]
+    first = (df['application_date'] < split_day) | df.index.isin(on_split_day[:len(on_split_day) // 2])
+    return df[first], df[~first], split_day
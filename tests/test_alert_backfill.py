@@ -0,0 +1,23 @@
+import pandas as pd
+import pandas.testing as pdt
+
+from src.alert_backfill import backfill_rule_results
+from src.alert_rules import evaluate_rules
+
+KEYS = ['as_of', 'rule_id', 'segment']
+COMPARED = KEYS + ['value', 'samples', 'baseline_value', 'limit']
+
+
+def test_backfill_matches_evaluating_each_day(applications, load_db):
+    db_path = load_db(applications, "applications")
+
+    backfill = backfill_rule_results(db_path=db_path)
+
+    days = sorted(applications['application_date'].unique())
+    fired = [evaluate_rules(db_path=db_path, as_of=day) for day in days]
+    expected = pd.concat([results[results['fired']] for results in fired], ignore_index=True)
+
+    assert len(expected) > 0
+    pdt.assert_frame_equal(backfill[COMPARED].sort_values(KEYS).reset_index(drop=True),
+                           expected[COMPARED].sort_values(KEYS).reset_index(drop=True),
+                           check_dtype=False)
@@ -0,0 +1,32 @@
+import pandas as pd
+import pandas.testing as pdt
+
+from src.anomaly_detection import SERIES_KEYS, load_state, update_anomaly_state
+from src.compute_metrics import append_applications
+from tests.conftest import split_partial_day
+
+
+def test_late_rows_of_a_partial_day_match_a_full_backfill(applications, load_db):
+    first, rest, split_day = split_partial_day(applications)
+
+    # Ingest through half of split_day, update, then ingest the rest and update again
+    incremental_db = load_db(first, "incremental")
+    early = update_anomaly_state(incremental_db)
+    assert load_state(incremental_db)['last_date'].max() < split_day
+    append_applications(rest, incremental_db, parquet_root=None)
+    late = update_anomaly_state(incremental_db)
+
+    backfill_db = load_db(applications, "backfill")
+    backfill = update_anomaly_state(backfill_db)
+
+    pdt.assert_frame_equal(load_state(incremental_db).sort_values(SERIES_KEYS).reset_index(drop=True),
+                           load_state(backfill_db).sort_values(SERIES_KEYS).reset_index(drop=True))
+    combined = pd.concat([early, late], ignore_index=True).sort_values(['date'] + SERIES_KEYS).reset_index(drop=True)
+    pdt.assert_frame_equal(combined, backfill, check_dtype=False)
+
+
+def test_newest_day_is_left_for_a_later_run(applications, load_db):
+    db_path = load_db(applications, "applications")
+    update_anomaly_state(db_path)
+    newest = applications['application_date'].max()
+    assert load_state(db_path)['last_date'].max() == (pd.Timestamp(newest) - pd.Timedelta(days=1)).strftime('%Y-%m-%d')
@@ -0,0 +1,51 @@
+import pyarrow.dataset as ds
+
+from src.columnar_store import (
+    PARTITION_COLUMN,
+    append_columnar_store,
+    columnar_store_exists,
+    list_partitions,
+    open_columnar_store,
+    read_columnar_store,
+    write_columnar_store,
+)
+from tests.conftest import split_partial_day
+
+
+def months(df):
+    return df['application_date'].str[:7]
+
+
+def test_month_filters_prune_partitions(applications, tmp_path):
+    root = str(tmp_path / "parquet")
+    write_columnar_store(applications, root, version="v1")
+
+    partitions = list_partitions(root)
+    assert partitions == sorted(months(applications).unique())
+    assert len(partitions) >= 2
+    month = partitions[1]
+
+    # Only that month's files are scanned, not the first month's
+    expression = (ds.field(PARTITION_COLUMN) >= month) & (ds.field(PARTITION_COLUMN) <= month)
+    fragments = list(open_columnar_store(root).get_fragments(filter=expression))
+    assert fragments and all(f"{PARTITION_COLUMN}={month}" in fragment.path for fragment in fragments)
+
+    df = read_columnar_store(['applicant_id', 'credit_score'], start_month=month, end_month=month, root=root)
+    assert list(df.columns) == ['applicant_id', 'credit_score']
+    assert sorted(df['applicant_id']) == sorted(applications.loc[months(applications) == month, 'applicant_id'])
+
+    later = read_columnar_store(['applicant_id'], start_month=month, root=root)
+    assert len(later) == (months(applications) >= month).sum()
+
+
+def test_appended_rows_land_in_their_month_partitions(applications, tmp_path):
+    root = str(tmp_path / "parquet")
+    first, rest, split_day = split_partial_day(applications)
+    write_columnar_store(first, root, version="v1")
+    append_columnar_store(rest, root, version="v2")
+
+    assert columnar_store_exists(root, "v2") and not columnar_store_exists(root, "v1")
+    assert list_partitions(root) == sorted(months(applications).unique())
+    month = split_day[:7]
+    df = read_columnar_store(['applicant_id'], start_month=month, end_month=month, root=root)
+    assert sorted(df['applicant_id']) == sorted(applications.loc[months(applications) == month, 'applicant_id'])
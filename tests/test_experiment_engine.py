@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+from statsmodels.stats.proportion import proportions_ztest
+
+from src.experiment_engine import EXPERIMENT_METRICS, analyze_experiment, overall_results
+
+
+def arm_counts(df):
+    """Experiment measures per arm counted applicant by applicant"""
+    counted = pd.DataFrame({
+        'experiment_group': df['experiment_group'],
+        'applications': 1,
+        'decided': df['funnel_stage'].isin(['Underwriting Review', 'Approved', 'Funded']),
+        'approvals': df['decision_outcome'] == 'Approved',
+        'fundings': df['funding_status'] == 'Funded',
+        'defaults': pd.to_numeric(df['defaulted']) == 1,
+    })
+    return counted.groupby('experiment_group').sum()
+
+
+def benjamini_hochberg(p_values):
+    """Step-up adjusted p-values: min over larger ranks of p * m / rank, capped at 1"""
+    order = np.argsort(p_values)
+    ranked = p_values[order] * len(p_values) / np.arange(1, len(p_values) + 1)
+    adjusted = np.empty_like(ranked)
+    adjusted[order] = np.minimum(np.minimum.accumulate(ranked[::-1])[::-1], 1)
+    return adjusted
+
+
+def test_overall_z_tests_match_statsmodels(applications, load_db):
+    results = analyze_experiment(load_db(applications, "applications"))
+    overall = overall_results(results)
+    counts = arm_counts(applications)
+
+    for metric, (successes, trials) in EXPERIMENT_METRICS.items():
+        z, p_value = proportions_ztest(counts.loc[['B', 'A'], successes], counts.loc[['B', 'A'], trials])
+        assert overall.at[metric, 'control_trials'] == counts.at['A', trials]
+        assert overall.at[metric, 'treatment_trials'] == counts.at['B', trials]
+        assert np.isclose(overall.at[metric, 'z_stat'], z)
+        assert np.isclose(overall.at[metric, 'p_value'], p_value)
+
+
+def test_segment_p_values_are_benjamini_hochberg_adjusted(applications, load_db):
+    results = analyze_experiment(load_db(applications, "applications"), min_trials=30)
+
+    testable = results['p_adjusted'].notna()
+    assert testable.sum() > len(EXPERIMENT_METRICS)
+    assert not (testable & ((results['control_trials'] < 30) | (results['treatment_trials'] < 30))).any()
+
+    adjusted = benjamini_hochberg(results.loc[testable, 'p_value'].to_numpy())
+    np.testing.assert_allclose(results.loc[testable, 'p_adjusted'], adjusted)
+    assert (results.loc[testable, 'significant'] == (adjusted <= 0.05)).all()
+    assert not results.loc[~testable, 'significant'].any()
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas.testing as pdt
+
+from src.compute_metrics import append_applications
+from src.daily_agg import application_delays
+from src.latency_sketch import RELATIVE_ACCURACY, bucket_index, latency_quantiles, sketch_quantiles
+from tests.conftest import split_partial_day
+
+QUANTILES = (0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99, 0.999)
+
+
+def assert_within_relative_accuracy(estimates, values, quantiles=QUANTILES):
+    # The sketch answers rank q * (n - 1) rounded down, i.e. the 'lower' quantile
+    exact = np.quantile(values, quantiles, method='lower')
+    assert np.all(np.abs(estimates - exact) <= RELATIVE_ACCURACY * exact + 1e-12)
+
+
+def test_sketch_quantiles_are_within_relative_accuracy():
+    rng = np.random.default_rng(3)
+    values = np.concatenate([rng.lognormal(1, 1.5, 50000), np.zeros(500)])
+
+    buckets, counts = np.unique(bucket_index(values), return_counts=True)
+    assert_within_relative_accuracy(sketch_quantiles(buckets, counts, QUANTILES), values)
+
+
+def test_stored_sketches_answer_segment_quantiles(applications, load_db):
+    first, rest, split_day = split_partial_day(applications)
+    db_path = load_db(first, "incremental")
+    append_applications(rest, db_path, parquet_root=None)
+
+    result = latency_quantiles("approval_delay", QUANTILES, end_date=split_day, segment={'experiment_group': 'B'},
+                               db_path=db_path)
+    selected = applications[(applications['application_date'] <= split_day)
+                            & (applications['experiment_group'] == 'B')]
+    approval_delay, _ = application_delays(selected)
+    delays = approval_delay.dropna().to_numpy()
+    assert result.at[0, 'count'] == len(delays)
+    assert_within_relative_accuracy(result.iloc[0, 1:].to_numpy(dtype=float), delays)
+
+    # Sketches merged across two ingests equal the sketch of one full load
+    backfill = latency_quantiles("funding_delay", QUANTILES, by=['credit_group'],
+                                 db_path=load_db(applications, "backfill"))
+    pdt.assert_frame_equal(latency_quantiles("funding_delay", QUANTILES, by=['credit_group'], db_path=db_path),
+                           backfill)
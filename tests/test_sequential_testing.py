@@ -0,0 +1,21 @@
+import pandas.testing as pdt
+
+from src.compute_metrics import append_applications
+from src.sequential_testing import TEST_KEYS, load_state, update_sequential_state
+from tests.conftest import split_partial_day
+
+
+def test_late_rows_of_a_partial_day_match_a_full_backfill(applications, load_db):
+    first, rest, split_day = split_partial_day(applications)
+
+    incremental_db = load_db(first, "incremental")
+    update_sequential_state(incremental_db)
+    assert load_state(incremental_db)['last_date'].max() < split_day
+    append_applications(rest, incremental_db, parquet_root=None)
+    update_sequential_state(incremental_db)
+
+    backfill_db = load_db(applications, "backfill")
+    update_sequential_state(backfill_db)
+
+    pdt.assert_frame_equal(load_state(incremental_db).sort_values(TEST_KEYS).reset_index(drop=True),
+                           load_state(backfill_db).sort_values(TEST_KEYS).reset_index(drop=True))
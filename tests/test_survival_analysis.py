@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+import statsmodels.api as sm
+
+from src.cohorts import COHORT_BANDS, code_labels, cohort_codes
+from src.compute_metrics import load_data_to_sqlite
+from src.event_log import generate_event_log
+from src.survival_analysis import (
+    DROPPED,
+    EXITS,
+    HAZARD_DIMENSIONS,
+    MAX_HAZARD_DAY,
+    OUTCOMES,
+    REJECTED,
+    cohort_survival,
+    discrete_hazard_model,
+    load_durations,
+    person_period_counts,
+)
+
+
+def load_with_event_log(df, tmp_path):
+    """Database whose stage events carry the generator's timestamps, so exits spread over days"""
+    csv_path, events_path, db_path = tmp_path / "survival.csv", tmp_path / "events.csv", str(tmp_path / "survival.db")
+    df.to_csv(csv_path, index=False)
+    generate_event_log(df).to_csv(events_path, index=False)
+    load_data_to_sqlite(str(csv_path), db_path, parquet_root=None, events_csv_path=str(events_path))
+    return db_path
+
+
+def reference_curves(durations):
+    """Kaplan-Meier survival and cause-specific cumulative incidence, applicant by applicant"""
+    days = durations['duration_days'].to_numpy()
+    outcome = durations['outcome'].to_numpy()
+    survival, incidence, rows = 1.0, dict.fromkeys(EXITS, 0.0), []
+    for day in range(days.max() + 1):
+        at_risk = (days >= day).sum()
+        if at_risk == 0:
+            continue
+        exited = days == day
+        for cause in EXITS:
+            incidence[cause] += survival * (exited & (outcome == cause)).sum() / at_risk
+        survival *= 1 - (exited & np.isin(outcome, EXITS)).sum() / at_risk
+        rows.append({'day': day, 'at_risk': at_risk, 'survival': survival,
+                     **{f"cif_{OUTCOMES[cause]}": incidence[cause] for cause in EXITS}})
+    return pd.DataFrame(rows)
+
+
+def person_period_rows(durations, df, dimensions=HAZARD_DIMENSIONS, max_day=MAX_HAZARD_DAY):
+    """One row per applicant and day at risk, with the tail days sharing the last interval"""
+    columns = [COHORT_BANDS[dimension]['column'] for dimension in dimensions]
+    joined = durations.merge(df[['applicant_id'] + columns], on='applicant_id')
+    codes = cohort_codes(joined, dimensions).to_numpy()
+    rows = []
+    for applicant, (days, outcome) in enumerate(zip(joined['duration_days'], joined['outcome'])):
+        for day in range(days + 1):
+            rows.append((*codes[applicant], min(day, max_day), int(day == days and outcome == DROPPED)))
+    return pd.DataFrame(rows, columns=dimensions + ['day', 'event'])
+
+
+def test_rejections_are_their_own_exit(applications, tmp_path):
+    durations = load_durations(load_with_event_log(applications, tmp_path))
+
+    rejected = durations.merge(applications[['applicant_id', 'decision_outcome']], on='applicant_id')
+    assert ((rejected['outcome'] == REJECTED) == (rejected['decision_outcome'] == 'Rejected')).all()
+
+
+def test_grouped_kaplan_meier_matches_per_applicant_reference(applications, tmp_path):
+    durations = load_durations(load_with_event_log(applications, tmp_path))
+
+    curves, _ = cohort_survival(durations, applications)
+    expected = reference_curves(durations)
+    pdt.assert_frame_equal(curves[expected.columns].reset_index(drop=True), expected, check_dtype=False)
+
+
+def test_grouped_hazard_fit_matches_person_period_logit(applications, tmp_path):
+    durations = load_durations(load_with_event_log(applications, tmp_path))
+
+    fit = discrete_hazard_model(person_period_counts(durations, applications))
+
+    rows = person_period_rows(durations, applications)
+    day_terms = {term: int(term[len('day_'):]) for term in fit['term'] if term.startswith('day_')}
+    rows = rows[rows['day'].isin(day_terms.values())]
+    design = pd.DataFrame(index=rows.index)
+    for term in fit['term']:
+        if term in day_terms:
+            design[term] = rows['day'] == day_terms[term]
+        else:
+            dimension, label = term.split(': ', 1)
+            design[term] = code_labels(dimension, rows[dimension].to_numpy()) == label
+    reference = sm.Logit(rows['event'], design.astype(float)).fit(disp=0)
+
+    np.testing.assert_allclose(fit['coefficient'], reference.params, rtol=1e-5, atol=1e-6)
+    np.testing.assert_allclose(fit['se'], reference.bse, rtol=1e-4)